@@ -1,39 +1,634 @@
-from flask import Flask, request, jsonify, render_template, session
-from flask_socketio import SocketIO, emit
+from flask import Flask, request, jsonify, render_template, session, send_file, Response, stream_with_context
+from flask_socketio import SocketIO, emit, join_room
 from flask_sqlalchemy import SQLAlchemy
+from flask_migrate import Migrate, upgrade
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import selectinload
 from datetime import datetime, timedelta
 import threading
 import time
+import heapq
+import math
+import itertools
+from collections import Counter, OrderedDict, deque
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import requests
 import json
 import os
+import base64
+import csv
+import io
 from werkzeug.security import generate_password_hash, check_password_hash
 import google.generativeai as genai
 from google.cloud import texttospeech
-import base64
+import hashlib
 import re
 import random
 import secrets
+import socket
+import click
+import sqlite3
+import pytz
 
 your_secret_key_here=secrets.token_hex(16)
 
+# Database
+DATABASE_URL = os.environ.get('DATABASE_URL', 'sqlite:///medical_assistant.db')
+if DATABASE_URL.startswith('postgres://'):
+    DATABASE_URL = 'postgresql://' + DATABASE_URL[len('postgres://'):]  # SQLAlchemy only accepts postgresql://
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 10))
+DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 20))
+DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 1800))  # Seconds
+SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000))
+SQLITE_MMAP_SIZE = int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))  # Bytes
+SQLITE_CACHE_SIZE_KB = int(os.environ.get('SQLITE_CACHE_SIZE_KB', 64 * 1024))
+
+def database_engine_options(url):
+    """Return the SQLAlchemy engine options for the configured backend"""
+    if url in ('sqlite://', 'sqlite:///:memory:'):
+        return {}  # Single shared in-memory connection; nothing to pool
+    
+    if url.startswith('sqlite'):
+        return {
+            'pool_size': DB_POOL_SIZE,
+            'max_overflow': DB_MAX_OVERFLOW,
+            'connect_args': {'check_same_thread': False, 'timeout': SQLITE_BUSY_TIMEOUT_MS / 1000}
+        }
+    
+    return {
+        'pool_size': DB_POOL_SIZE,
+        'max_overflow': DB_MAX_OVERFLOW,
+        'pool_recycle': DB_POOL_RECYCLE,
+        'pool_pre_ping': True
+    }
+
+@event.listens_for(Engine, 'connect')
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    """Tune every new SQLite connection for concurrent readers and writers.
+    
+    WAL lets the reminder thread and request handlers read while another
+    connection writes, and busy_timeout makes writers wait for the lock
+    instead of failing with "database is locked".
+    """
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA journal_mode=WAL')
+    cursor.execute('PRAGMA synchronous=NORMAL')
+    cursor.execute(f'PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}')
+    cursor.execute(f'PRAGMA mmap_size={SQLITE_MMAP_SIZE}')
+    cursor.execute(f'PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}')
+    cursor.close()
+
 app = Flask(__name__)
 app.config['SECRET_KEY'] = your_secret_key_here
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///medical_assistant.db'
+app.config['SQLALCHEMY_DATABASE_URI'] = DATABASE_URL
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = database_engine_options(DATABASE_URL)
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
 db = SQLAlchemy(app)
-socketio = SocketIO(app, cors_allowed_origins="*")
+
+# Schema changes are managed with Alembic: `flask --app app db upgrade`
+# (render_as_batch lets SQLite alter tables by copying them)
+# Objects autogenerate cannot compare, written into migrations by hand: DESC indexes,
+# the conversation full-text index (SQLite FTS5 tables, Postgres tsvector column)
+MANUAL_MIGRATION_OBJECTS = {'ix_health_insight_user_feed', 'search_vector', 'ix_conversation_search_vector'}
+
+def include_migration_object(obj, name, type_, reflected, compare_to):
+    """Leave objects that are written into migrations by hand out of autogenerate"""
+    return not (name in MANUAL_MIGRATION_OBJECTS or (type_ == 'table' and name.startswith('conversation_fts')))
+
+migrate = Migrate(
+    app, db, directory=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations'),
+    render_as_batch=True, include_object=include_migration_object
+)
+
+# Set to e.g. redis://localhost:6379/0 so several server processes share Socket.IO rooms
+SOCKETIO_MESSAGE_QUEUE = os.environ.get('SOCKETIO_MESSAGE_QUEUE')
+socketio = SocketIO(app, cors_allowed_origins="*", message_queue=SOCKETIO_MESSAGE_QUEUE)
+
+def user_room(user_id):
+    """Socket.IO room that all of a user's connections join"""
+    return f'user:{user_id}'
 
 # Configure Google Gemini API
 GEMINI_API_KEY = os.environ.get('GEMINI_API_KEY', 'your_gemini_api_key_here')
 genai.configure(api_key=GEMINI_API_KEY)
 
+# Monitoring may read /metrics with this bearer token; without one it needs a logged-in session
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
+# Model names used by the app
+GEMINI_CHAT_MODEL = os.environ.get('GEMINI_CHAT_MODEL', 'gemini-1.5-pro-latest')
+GEMINI_INSIGHT_MODEL = os.environ.get('GEMINI_INSIGHT_MODEL', 'gemini-pro')
+
+# Chat generation runs on a bounded worker pool so slow model calls never hold request workers
+CHAT_MAX_WORKERS = int(os.environ.get('CHAT_MAX_WORKERS', 4))
+CHAT_MAX_PENDING = int(os.environ.get('CHAT_MAX_PENDING', 32))  # Running + queued jobs across all users
+CHAT_MAX_PER_USER = int(os.environ.get('CHAT_MAX_PER_USER', 2))
+
+# Daily health insight job
+INSIGHT_WORKERS = int(os.environ.get('INSIGHT_WORKERS', 8))
+INSIGHT_RATE_PER_SECOND = float(os.environ.get('INSIGHT_RATE_PER_SECOND', 5))  # Model calls per second
+INSIGHT_CHUNK_SIZE = int(os.environ.get('INSIGHT_CHUNK_SIZE', 200))  # Users loaded per page
+INSIGHT_DELIVERY_HOUR = int(os.environ.get('INSIGHT_DELIVERY_HOUR', 8))  # Local hour of the user's timezone
+INSIGHT_GENERATION_WINDOW = timedelta(minutes=int(os.environ.get('INSIGHT_GENERATION_WINDOW_MINUTES', 120)))  # Spread ahead of delivery
+INSIGHT_RETRY_DELAY = timedelta(minutes=int(os.environ.get('INSIGHT_RETRY_DELAY_MINUTES', 10)))
+
+# Reminder scheduler; runs as its own process (`flask --app app scheduler`), possibly several side by side
+SCHEDULER_ID = f'{socket.gethostname()}:{os.getpid()}:{secrets.token_hex(4)}'  # Owner of claimed rows
+SCHEDULER_CLAIM_TIMEOUT = timedelta(seconds=int(os.environ.get('SCHEDULER_CLAIM_TIMEOUT', 60)))  # Then another process takes over
+SCHEDULER_RESYNC_SECONDS = float(os.environ.get('SCHEDULER_RESYNC_SECONDS', 5))  # Picks up rows created by web workers
+
+# List endpoints return pages of at most LIST_MAX_LIMIT rows (?limit=&after=<cursor>)
+LIST_DEFAULT_LIMIT = int(os.environ.get('LIST_DEFAULT_LIMIT', 100))
+LIST_MAX_LIMIT = int(os.environ.get('LIST_MAX_LIMIT', 500))
+INSIGHT_FEED_LIMIT = 10  # Insights shown on the dashboard
+
 # Configure Google Cloud TTS
 os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = r"path_to_your_google_cloud_credentials.json"
 
+# Shared API clients
+class ClientRegistry:
+    """Creates the Gemini models and the TTS client once per process and shares them.
+    
+    Clients are built lazily under a lock, so concurrent requests never pay for
+    channel setup or credential loading twice. A forked child (e.g. gunicorn
+    --preload) drops the inherited clients and builds its own, since gRPC
+    channels must not be shared across processes.
+    """
+    
+    def __init__(self, latency_samples=1000):
+        self.latency_samples = latency_samples
+        self._reset()
+        
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._reset)
+    
+    def _reset(self):
+        self._lock = threading.Lock()
+        self._models = {}
+        self._tts_client = None
+        self._calls = {}  # client name -> call statistics
+    
+    def model(self, name):
+        """Return the shared GenerativeModel for name"""
+        model = self._models.get(name)
+        if model is None:
+            with self._lock:
+                model = self._models.get(name)
+                if model is None:
+                    model = genai.GenerativeModel(name)
+                    self._models[name] = model
+        return model
+    
+    def tts_client(self):
+        """Return the shared TextToSpeechClient"""
+        if self._tts_client is None:
+            with self._lock:
+                if self._tts_client is None:
+                    self._tts_client = texttospeech.TextToSpeechClient()
+        return self._tts_client
+    
+    @contextmanager
+    def track(self, name):
+        """Record in-flight count, latency and errors of one call to a client"""
+        with self._lock:
+            calls = self._calls.setdefault(name, {
+                'in_flight': 0,
+                'total': 0,
+                'errors': 0,
+                'last_error': None,
+                'latencies': deque(maxlen=self.latency_samples)
+            })
+            calls['in_flight'] += 1
+        
+        started = time.monotonic()
+        try:
+            yield
+        except Exception as e:
+            with self._lock:
+                calls['errors'] += 1
+                calls['last_error'] = str(e)
+            raise
+        finally:
+            with self._lock:
+                calls['in_flight'] -= 1
+                calls['total'] += 1
+                calls['latencies'].append(time.monotonic() - started)
+    
+    def stats(self):
+        with self._lock:
+            result = {
+                'pid': os.getpid(),
+                'models': sorted(self._models),
+                'tts_client': self._tts_client is not None,
+                'calls': {}
+            }
+            for name, calls in self._calls.items():
+                latencies = sorted(calls['latencies'])
+                result['calls'][name] = {
+                    'in_flight': calls['in_flight'],
+                    'total': calls['total'],
+                    'errors': calls['errors'],
+                    'last_error': calls['last_error'],
+                    'p50_ms': round(latencies[len(latencies) // 2] * 1000, 1) if latencies else None,
+                    'p99_ms': round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000, 1) if latencies else None
+                }
+            return result
+
+clients = ClientRegistry()
+
+# Synthesized speech cache
+TTS_CACHE_DIR = os.environ.get('TTS_CACHE_DIR', os.path.join(app.instance_path, 'tts_cache'))
+TTS_CACHE_MAX_BYTES = int(os.environ.get('TTS_CACHE_MAX_BYTES', 200 * 1024 * 1024))
+TTS_MEMORY_CACHE_ITEMS = int(os.environ.get('TTS_MEMORY_CACHE_ITEMS', 256))
+
+class AudioCache:
+    """Content-addressed cache of synthesized speech.
+    
+    Audio is keyed by a SHA-256 of the text and voice parameters. A small
+    in-memory LRU sits in front of a size-bounded directory of MP3 files; the
+    oldest files (by last use) are evicted once the directory exceeds max_bytes.
+    """
+    
+    def __init__(self, directory, max_bytes, max_memory_items):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_memory_items = max_memory_items
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_bytes = None  # Computed on first write
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+    
+    @staticmethod
+    def key(text, language_code, ssml_gender, audio_encoding):
+        payload = json.dumps([text, language_code, str(ssml_gender), str(audio_encoding)])
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    
+    def path(self, key):
+        return os.path.join(self.directory, f'{key}.mp3')
+    
+    def get(self, key):
+        """Return cached audio bytes for key, or None"""
+        with self._lock:
+            audio = self._memory.get(key)
+            if audio is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return audio
+        
+        try:
+            with open(self.path(key), 'rb') as f:
+                audio = f.read()
+            os.utime(self.path(key))  # Mark as recently used for eviction
+        except OSError:
+            with self._lock:
+                self.misses += 1
+            return None
+        
+        with self._lock:
+            self.disk_hits += 1
+            self._remember(key, audio)
+        return audio
+    
+    def put(self, key, audio):
+        with self._lock:
+            self._remember(key, audio)
+        self._write(key, audio)
+    
+    def ensure_on_disk(self, key):
+        """Return the file path of key, writing it back from memory if it was evicted from disk"""
+        path = self.path(key)
+        if os.path.exists(path):
+            return path
+        
+        with self._lock:
+            audio = self._memory.get(key)
+        if audio is None:
+            return None
+        
+        self._write(key, audio)
+        return path
+    
+    def stats(self):
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                'memory_items': len(self._memory),
+                'disk_bytes': self._disk_bytes,
+                'memory_hits': self.memory_hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_rate': round((self.memory_hits + self.disk_hits) / lookups, 3) if lookups else None
+            }
+    
+    def _remember(self, key, audio):
+        # Caller holds the lock
+        self._memory[key] = audio
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_items:
+            self._memory.popitem(last=False)
+    
+    def _write(self, key, audio):
+        os.makedirs(self.directory, exist_ok=True)
+        
+        # Write atomically so a concurrent reader never sees a partial file
+        tmp_path = f'{self.path(key)}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(audio)
+        os.replace(tmp_path, self.path(key))
+        
+        with self._lock:
+            if self._disk_bytes is None:
+                self._disk_bytes = sum(entry.stat().st_size for entry in os.scandir(self.directory) if entry.name.endswith('.mp3'))
+            else:
+                self._disk_bytes += len(audio)
+            
+            if self._disk_bytes > self.max_bytes:
+                self._evict()
+    
+    def _evict(self):
+        # Caller holds the lock; drop least recently used files down to 90% of the limit
+        entries = sorted(
+            (entry for entry in os.scandir(self.directory) if entry.name.endswith('.mp3')),
+            key=lambda entry: entry.stat().st_mtime
+        )
+        total = sum(entry.stat().st_size for entry in entries)
+        for entry in entries:
+            if total <= self.max_bytes * 0.9:
+                break
+            try:
+                size = entry.stat().st_size
+                os.remove(entry.path)
+                total -= size
+            except OSError:
+                pass
+        self._disk_bytes = total
+
+audio_cache = AudioCache(TTS_CACHE_DIR, TTS_CACHE_MAX_BYTES, TTS_MEMORY_CACHE_ITEMS)
+
+# Conversation memory for chat prompts
+CHAT_HISTORY_TURNS = int(os.environ.get('CHAT_HISTORY_TURNS', 6))  # Recent turns sent verbatim
+CHAT_HISTORY_TOKEN_BUDGET = int(os.environ.get('CHAT_HISTORY_TOKEN_BUDGET', 1500))  # Summary + recent turns
+CHAT_SUMMARY_TOKEN_BUDGET = int(os.environ.get('CHAT_SUMMARY_TOKEN_BUDGET', 400))
+
+def estimate_tokens(text):
+    """Cheap token estimate (~4 characters per token) used for prompt budgeting"""
+    return len(text) // 4 + 1
+
+class ChatContextBuilder:
+    """Builds the conversation part of chat prompts at a bounded size.
+    
+    The last `turns` conversations are loaded with one query on the
+    (user_id, timestamp) index. Turns that have dropped out of that window are
+    folded incrementally into a per-user extractive summary (no model call),
+    which is trimmed from the oldest end to summary_budget. Summary and recent
+    turns together never exceed token_budget, so prompt size stays constant
+    however long the conversation gets.
+    """
+    
+    def __init__(self, turns, token_budget, summary_budget, fold_batch=50):
+        self.turns = turns
+        self.token_budget = token_budget
+        self.summary_budget = summary_budget
+        self.fold_batch = fold_batch
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.total_prompt_tokens = 0
+        self.max_prompt_tokens = 0
+    
+    @staticmethod
+    def summarize_turn(conversation):
+        """One summary line per turn: the question and the first sentence of the answer"""
+        question = ' '.join(conversation.message.split())[:120]
+        answer = ' '.join(conversation.response.split())
+        answer = re.split(r'(?<=[.!?])\s', answer, maxsplit=1)[0][:160]
+        return f"- User asked: {question} / Assistant: {answer}"
+    
+    def _trim_summary(self, lines):
+        while lines and estimate_tokens('\n'.join(lines)) > self.summary_budget:
+            lines.pop(0)
+        return lines
+    
+    def build(self, user_id):
+        """Return the conversation context block for the next prompt of user_id"""
+        recent = Conversation.query.filter_by(user_id=user_id).order_by(
+            Conversation.timestamp.desc(), Conversation.id.desc()
+        ).limit(self.turns).all()
+        
+        summary = ConversationSummary.query.get(user_id)
+        summary_lines = summary.summary.splitlines() if summary and summary.summary else []
+        
+        # Fold turns that left the recent window since the last refresh
+        if recent and len(recent) == self.turns:
+            summarized_until_id = summary.summarized_until_id if summary else 0
+            older = Conversation.query.filter(
+                Conversation.user_id == user_id,
+                Conversation.id > summarized_until_id,
+                Conversation.id < min(c.id for c in recent)
+            ).order_by(Conversation.id).limit(self.fold_batch).all()
+            
+            if older:
+                summary_lines = self._trim_summary(summary_lines + [self.summarize_turn(c) for c in older])
+                if not summary:
+                    summary = ConversationSummary(user_id=user_id)
+                    db.session.add(summary)
+                summary.summary = '\n'.join(summary_lines)
+                summary.summarized_until_id = older[-1].id
+        
+        remaining = self.token_budget
+        sections = []
+        
+        if summary_lines:
+            summary_text = 'Summary of earlier conversation:\n' + '\n'.join(summary_lines)
+            remaining -= estimate_tokens(summary_text)
+            sections.append(summary_text)
+        
+        # Newest turns first until the budget runs out
+        turn_texts = []
+        for conversation in recent:
+            turn_text = f"User: {conversation.message}\nAssistant: {conversation.response}"
+            cost = estimate_tokens(turn_text)
+            if cost > remaining:
+                break
+            remaining -= cost
+            turn_texts.append(turn_text)
+        
+        if turn_texts:
+            sections.append('Recent conversation:\n' + '\n\n'.join(reversed(turn_texts)))
+        
+        return '\n\n'.join(sections)
+    
+    def record(self, prompt_tokens):
+        with self._lock:
+            self.requests += 1
+            self.total_prompt_tokens += prompt_tokens
+            self.max_prompt_tokens = max(self.max_prompt_tokens, prompt_tokens)
+    
+    def stats(self):
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'avg_prompt_tokens': round(self.total_prompt_tokens / self.requests, 1) if self.requests else None,
+                'max_prompt_tokens': self.max_prompt_tokens
+            }
+
+chat_context = ChatContextBuilder(CHAT_HISTORY_TURNS, CHAT_HISTORY_TOKEN_BUDGET, CHAT_SUMMARY_TOKEN_BUDGET)
+
+# Chat response cache (opt-in)
+CHAT_CACHE_ENABLED = os.environ.get('CHAT_CACHE_ENABLED', '0') == '1'
+CHAT_CACHE_THRESHOLD = float(os.environ.get('CHAT_CACHE_THRESHOLD', 0.9))  # Cosine similarity needed for a hit
+CHAT_CACHE_TTL = int(os.environ.get('CHAT_CACHE_TTL', 24 * 3600))  # Seconds
+CHAT_CACHE_MAX_ITEMS = int(os.environ.get('CHAT_CACHE_MAX_ITEMS', 5000))
+CHAT_CACHE_STOPWORDS = frozenset(
+    'a an the of for is are was what whats which do does did i im my me to and or in on at with about '
+    'can could should would will tell please any some'.split()
+)
+
+class ResponseCache:
+    """Answers near-duplicate chat questions with a previously generated response.
+    
+    Queries are normalized (lowercase, no punctuation or stopwords, crude
+    singular form) and compared by cosine similarity of their word and
+    character-trigram counts, so "what are side effects of metformin" and
+    "metformin side effects?" match. Entries live in separate scopes so an
+    answer is only reused for profiles whose relevant fields are identical,
+    and expire after ttl seconds or when max_items is exceeded (oldest first).
+    """
+    
+    def __init__(self, threshold, ttl, max_items):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_items = max_items
+        self._entries = OrderedDict()  # entry_id -> (scope, vector, norm, response, expires_at)
+        self._index = {}  # (scope, word) -> entry ids, to find candidates without a full scan
+        self._lock = threading.Lock()
+        self._next_id = 0
+        self.hits = 0
+        self.misses = 0
+    
+    @staticmethod
+    def normalize(text):
+        words = []
+        for word in re.findall(r'[a-z0-9]+', text.lower()):
+            if word in CHAT_CACHE_STOPWORDS:
+                continue
+            if len(word) > 3 and word.endswith('s') and not word.endswith('ss'):
+                word = word[:-1]
+            words.append(word)
+        return words
+    
+    @classmethod
+    def vectorize(cls, text):
+        vector = Counter()
+        for word in cls.normalize(text):
+            vector[('w', word)] += 1
+            padded = f'#{word}#'
+            for i in range(len(padded) - 2):
+                vector[('t', padded[i:i + 3])] += 1
+        return vector
+    
+    def lookup(self, scope, query):
+        """Return the cached response most similar to query within scope, or None"""
+        vector = self.vectorize(query)
+        if not vector:
+            return None
+        norm = math.sqrt(sum(count * count for count in vector.values()))
+        now = time.monotonic()
+        
+        with self._lock:
+            candidates = set()
+            for feature in vector:
+                if feature[0] == 'w':
+                    candidates.update(self._index.get((scope, feature[1]), ()))
+            
+            best_similarity, best_id = 0, None
+            for entry_id in candidates:
+                _, entry_vector, entry_norm, _, expires_at = self._entries[entry_id]
+                if expires_at <= now:
+                    self._remove(entry_id)
+                    continue
+                
+                dot = sum(count * entry_vector.get(feature, 0) for feature, count in vector.items())
+                similarity = dot / (norm * entry_norm)
+                if similarity >= self.threshold and similarity > best_similarity:
+                    best_similarity, best_id = similarity, entry_id
+            
+            if best_id is None:
+                self.misses += 1
+                return None
+            
+            self.hits += 1
+            self._entries.move_to_end(best_id)
+            return self._entries[best_id][3]
+    
+    def store(self, scope, query, response):
+        vector = self.vectorize(query)
+        if not vector:
+            return
+        norm = math.sqrt(sum(count * count for count in vector.values()))
+        
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = (scope, vector, norm, response, time.monotonic() + self.ttl)
+            for feature in vector:
+                if feature[0] == 'w':
+                    self._index.setdefault((scope, feature[1]), set()).add(entry_id)
+            
+            while len(self._entries) > self.max_items:
+                self._remove(next(iter(self._entries)))
+    
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'enabled': CHAT_CACHE_ENABLED,
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else None
+            }
+    
+    def _remove(self, entry_id):
+        # Caller holds the lock
+        scope, vector, _, _, _ = self._entries.pop(entry_id)
+        for feature in vector:
+            if feature[0] == 'w':
+                ids = self._index.get((scope, feature[1]))
+                if ids is not None:
+                    ids.discard(entry_id)
+                    if not ids:
+                        del self._index[(scope, feature[1])]
+
+response_cache = ResponseCache(CHAT_CACHE_THRESHOLD, CHAT_CACHE_TTL, CHAT_CACHE_MAX_ITEMS)
+
+def is_follow_up(text):
+    """Whether a query refers back to the conversation (and so must not be answered from the cache)"""
+    return re.search(r"\b(it|its|that|this|these|those|they|them|he|she|above|previous|again)\b", text.lower()) is not None
+
+def chat_cache_scope(user):
+    """Cache scope of a user: answers are only shared between identical allergies and conditions"""
+    fields = [
+        GEMINI_CHAT_MODEL,
+        (user.allergies or '').strip().lower(),
+        (user.medical_conditions or '').strip().lower()
+    ]
+    return hashlib.sha256(json.dumps(fields).encode('utf-8')).hexdigest()
+
 # Database Models
 class User(db.Model):
+    __table_args__ = (
+        db.Index('ix_user_next_insight_at', 'next_insight_at'),
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False)
     password_hash = db.Column(db.String(128), nullable=False)
@@ -48,6 +643,9 @@ class User(db.Model):
     medical_conditions = db.Column(db.Text)
     emergency_contact = db.Column(db.String(100))
     preferred_language = db.Column(db.String(50), default='en')
+    timezone = db.Column(db.String(64), default='UTC')  # IANA name, e.g. Europe/Berlin
+    next_insight_at = db.Column(db.DateTime, nullable=True)  # UTC time the next daily insight is generated
+    revision = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # Bumped by every change to the user's lists
 
     medications = db.relationship('Medication', backref='user', lazy=True)
     appointments = db.relationship('Appointment', backref='user', lazy=True)
@@ -60,6 +658,12 @@ class User(db.Model):
         return check_password_hash(self.password_hash, password)
 
 class Medication(db.Model):
+    __table_args__ = (
+        db.Index('ix_medication_materialized_until', 'materialized_until'),
+        db.Index('ix_medication_user_revision', 'user_id', 'revision'),
+        db.Index('ix_medication_user_id', 'user_id', 'id'),
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     name = db.Column(db.String(100), nullable=False)
@@ -70,18 +674,34 @@ class Medication(db.Model):
     end_date = db.Column(db.DateTime, nullable=True)
     status = db.Column(db.String(20), default='Pending')  # Taken, Pending, Missed
     notes = db.Column(db.Text, nullable=True)
+    materialized_until = db.Column(db.DateTime, nullable=True)  # Reminders exist up to this time
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    revision = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # User.revision of the last change
     
     reminders = db.relationship('MedicationReminder', backref='medication', lazy=True)
 
 class MedicationReminder(db.Model):
+    __table_args__ = (
+        db.Index('ix_medication_reminder_due', 'is_sent', 'scheduled_time'),
+        db.Index('ix_medication_reminder_medication', 'medication_id', 'scheduled_time'),
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
     medication_id = db.Column(db.Integer, db.ForeignKey('medication.id'), nullable=False)
     scheduled_time = db.Column(db.DateTime, nullable=False)
     is_sent = db.Column(db.Boolean, default=False)
     is_acknowledged = db.Column(db.Boolean, default=False)
     status = db.Column(db.String(20), default='Pending')  # Sent, Acknowledged, Dismissed
+    claimed_by = db.Column(db.String(64), nullable=True)  # Scheduler process dispatching it
+    claimed_at = db.Column(db.DateTime, nullable=True)
 
 class Appointment(db.Model):
+    __table_args__ = (
+        db.Index('ix_appointment_user_revision', 'user_id', 'revision'),
+        db.Index('ix_appointment_user_date_time', 'user_id', 'date_time', 'id'),
+        db.Index('ix_appointment_user_status_date_time', 'user_id', 'status', 'date_time', 'id'),
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     doctor_name = db.Column(db.String(100), nullable=False)
@@ -91,26 +711,51 @@ class Appointment(db.Model):
     purpose = db.Column(db.String(200), nullable=True)
     notes = db.Column(db.Text, nullable=True)
     status = db.Column(db.String(50), default='Scheduled')  # Scheduled, Completed, Cancelled, Rescheduled
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    revision = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # User.revision of the last change
     
     reminders = db.relationship('AppointmentReminder', backref='appointment', lazy=True)
 
 class AppointmentReminder(db.Model):
+    __table_args__ = (
+        db.Index('ix_appointment_reminder_due', 'is_sent', 'reminder_time'),
+        db.Index('ix_appointment_reminder_appointment', 'appointment_id', 'reminder_time'),
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
     appointment_id = db.Column(db.Integer, db.ForeignKey('appointment.id'), nullable=False)
     reminder_time = db.Column(db.DateTime, nullable=False)
     is_sent = db.Column(db.Boolean, default=False)
+    claimed_by = db.Column(db.String(64), nullable=True)  # Scheduler process dispatching it
+    claimed_at = db.Column(db.DateTime, nullable=True)
 
 class Timer(db.Model):
+    __table_args__ = (
+        db.Index('ix_timer_due', 'status', 'end_time'),
+        db.Index('ix_timer_user_revision', 'user_id', 'revision'),
+        db.Index('ix_timer_user_created_at', 'user_id', 'created_at', 'id'),
+        db.Index('ix_timer_user_status_created_at', 'user_id', 'status', 'created_at', 'id'),
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     name = db.Column(db.String(100), nullable=False)
     duration = db.Column(db.Integer, nullable=False)  # Duration in seconds
     start_time = db.Column(db.DateTime, nullable=True)
     end_time = db.Column(db.DateTime, nullable=True)
+    elapsed = db.Column(db.Float, nullable=False, default=0, server_default='0')  # Seconds run before start_time (across pauses)
     status = db.Column(db.String(20), default='Ready')  # Ready, Running, Paused, Completed
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    claimed_by = db.Column(db.String(64), nullable=True)  # Scheduler process dispatching it
+    claimed_at = db.Column(db.DateTime, nullable=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    revision = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # User.revision of the last change
 
 class Conversation(db.Model):
+    __table_args__ = (
+        db.Index('ix_conversation_user_timestamp', 'user_id', 'timestamp'),
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     message = db.Column(db.Text, nullable=False)
@@ -118,244 +763,2566 @@ class Conversation(db.Model):
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
     interaction_type = db.Column(db.String(10), default='chat')  # chat or voice
 
+class ConversationSummary(db.Model):
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    summary = db.Column(db.Text, nullable=False, default='')
+    summarized_until_id = db.Column(db.Integer, nullable=False, default=0)  # Last Conversation.id folded in
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
 class HealthInsight(db.Model):
+    __table_args__ = (
+        db.Index('ix_health_insight_delivery', 'is_delivered', 'deliver_at'),
+        db.Index('ix_health_insight_user_revision', 'user_id', 'revision'),
+        # Matches the feed order (unread first, newest first), so the feed is read straight off the index
+        db.Index('ix_health_insight_user_feed', 'user_id', 'is_read', db.text('generated_at DESC'), db.text('id DESC')),
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     insight_type = db.Column(db.String(50), nullable=False)  # hydration, exercise, mental, medication, etc.
     content = db.Column(db.Text, nullable=False)
     generated_at = db.Column(db.DateTime, default=datetime.utcnow)
+    deliver_at = db.Column(db.DateTime, default=datetime.utcnow)  # Precomputed insights stay hidden until then
+    is_delivered = db.Column(db.Boolean, default=True)
     is_read = db.Column(db.Boolean, default=False)
+    claimed_by = db.Column(db.String(64), nullable=True)  # Scheduler process dispatching it
+    claimed_at = db.Column(db.DateTime, nullable=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    revision = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # User.revision of the last change
 
-with app.app_context():
-    db.create_all()
+class InsightRun(db.Model):
+    # One row per user and day once the daily insight is stored; makes the job exactly-once and resumable
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'run_date', name='uq_insight_run_user_date'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    run_date = db.Column(db.Date, nullable=False)
+    insight_id = db.Column(db.Integer, db.ForeignKey('health_insight.id'), nullable=True)
+    completed_at = db.Column(db.DateTime, default=datetime.utcnow)
 
-# Background task for checking reminders
-def check_reminders():
-    with app.app_context():
-        while True:
-            current_time = datetime.utcnow()
-            
-            # Check medication reminders
-            medication_reminders = MedicationReminder.query.filter_by(is_sent=False).all()
-            for reminder in medication_reminders:
-                if reminder.scheduled_time <= current_time:
-                    medication = Medication.query.get(reminder.medication_id)
-                    user = User.query.get(medication.user_id)
-                    
-                    notification = {
-                        'type': 'medication_reminder',
-                        'user_id': user.id,
-                        'title': 'Medication Reminder',
-                        'message': f"Time to take your {medication.name} ({medication.dosage})",
-                        'medication_id': medication.id,
-                        'reminder_id': reminder.id
-                    }
-                    
-                    socketio.emit(f'notification_{user.id}', notification)
-                    reminder.is_sent = True
-                    db.session.commit()
-            
-            # Check appointment reminders
-            appointment_reminders = AppointmentReminder.query.filter_by(is_sent=False).all()
-            for reminder in appointment_reminders:
-                if reminder.reminder_time <= current_time:
-                    appointment = Appointment.query.get(reminder.appointment_id)
-                    user = User.query.get(appointment.user_id)
-                    
-                    notification = {
-                        'type': 'appointment_reminder',
-                        'user_id': user.id,
-                        'title': 'Appointment Reminder',
-                        'message': f"You have an appointment with Dr. {appointment.doctor_name} at {appointment.date_time.strftime('%I:%M %p')} for {appointment.purpose}",
-                        'appointment_id': appointment.id,
-                        'reminder_id': reminder.id
-                    }
-                    
-                    socketio.emit(f'notification_{user.id}', notification)
-                    reminder.is_sent = True
-                    db.session.commit()
-            
-            # Check active timers
-            active_timers = Timer.query.filter_by(status='Running').all()
-            for timer in active_timers:
-                if timer.start_time and timer.end_time and timer.end_time <= current_time:
-                    user = User.query.get(timer.user_id)
-                    
-                    notification = {
-                        'type': 'timer_completed',
-                        'user_id': user.id,
-                        'title': 'Timer Completed',
-                        'message': f"Your timer for {timer.name} has completed",
-                        'timer_id': timer.id
-                    }
-                    
-                    socketio.emit(f'notification_{user.id}', notification)
-                    timer.status = 'Completed'
-                    db.session.commit()
-            
-            # Generate daily health insights (once per day)
-            if current_time.hour == 8 and current_time.minute == 0:  # At 8:00 AM
-                users = User.query.all()
-                for user in users:
-                    generate_health_insights(user.id)
-            
-            time.sleep(30)  # Check every 30 seconds
+class Tombstone(db.Model):
+    # One row per deleted medication/appointment/timer/insight, so ?since= deltas can report deletions
+    __table_args__ = (
+        db.Index('ix_tombstone_user_revision', 'user_id', 'revision'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    table_name = db.Column(db.String(50), nullable=False)
+    row_id = db.Column(db.Integer, nullable=False)
+    revision = db.Column(db.Integer, nullable=False)
+    deleted_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class SyncMutation(db.Model):
+    # One row per offline mutation applied by /sync, so a replayed batch is not applied twice
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'key', name='uq_sync_mutation_user_key'),
+        db.Index('ix_sync_mutation_applied_at', 'applied_at'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    key = db.Column(db.String(64), nullable=False)  # Idempotency key chosen by the client
+    result = db.Column(db.Text, nullable=False)  # JSON result returned for the mutation
+    applied_at = db.Column(db.DateTime, default=datetime.utcnow)
 
-# Start the background task for checking reminders
-reminder_thread = threading.Thread(target=check_reminders)
-reminder_thread.daemon = True
-reminder_thread.start()
+# Change tracking
+# Every write to a user's medications, appointments, timers or insights bumps
+# User.revision and stamps the changed rows with the new value, so list
+# endpoints can answer If-None-Match and ?since=<revision> cheaply.
+VERSIONED_MODELS = (Medication, Appointment, Timer, HealthInsight)
+PROFILE_FIELDS = (
+    'height', 'weight', 'blood_type', 'allergies', 'medical_conditions',
+    'emergency_contact', 'preferred_language', 'timezone'
+)
 
-# Helper functions
-def generate_ai_response(prompt, user_id):
-    """Generate response using Gemini API with user context"""
+def bump_user_revisions(user_ids):
+    """Advance the revision of each user and return {user_id: new revision}.
+    
+    The UPDATE holds the user row until commit, so concurrent writers of the
+    same user get increasing revisions in commit order.
+    """
+    user_ids = sorted(set(user_ids))
+    if not user_ids:
+        return {}
+    
+    db.session.execute(
+        db.update(User).where(User.id.in_(user_ids)).values(revision=User.revision + 1),
+        execution_options={'synchronize_session': False}
+    )
+    return dict(db.session.query(User.id, User.revision).filter(User.id.in_(user_ids)).all())
+
+def touch_rows(model, ids):
+    """Stamp rows changed by a bulk UPDATE, which bypasses the flush hook, with a new revision"""
+    if not ids:
+        return
+    
+    rows_by_user = {}
+    for row_id, user_id in db.session.query(model.id, model.user_id).filter(model.id.in_(ids)).all():
+        rows_by_user.setdefault(user_id, []).append(row_id)
+    
+    revisions = bump_user_revisions(rows_by_user)
+    current_time = datetime.utcnow()
+    for user_id, row_ids in rows_by_user.items():
+        model.query.filter(model.id.in_(row_ids)).update(
+            {model.revision: revisions[user_id], model.updated_at: current_time}, synchronize_session=False
+        )
+
+@event.listens_for(db.session, 'before_flush')
+def stamp_revisions(session, flush_context, instances):
+    """Give rows changed through the ORM a new revision of their user and tombstone deleted ones"""
+    changed = {obj for obj in session.new if isinstance(obj, VERSIONED_MODELS)}
+    changed.update(
+        obj for obj in session.dirty
+        if isinstance(obj, VERSIONED_MODELS) and session.is_modified(obj, include_collections=False)
+    )
+    deleted = {obj for obj in session.deleted if isinstance(obj, VERSIONED_MODELS)}
+    
+    # Profile edits bump the revision too, which invalidates cached prompt contexts in every process
+    profile_user_ids = {
+        obj.id for obj in session.dirty
+        if isinstance(obj, User) and any(db.inspect(obj).attrs[field].history.has_changes() for field in PROFILE_FIELDS)
+    }
+    
+    # Acknowledging a dose changes the medication's reminder_stats
+    for reminder in list(session.dirty) + list(session.deleted):
+        if isinstance(reminder, MedicationReminder) and reminder.medication_id:
+            medication = session.get(Medication, reminder.medication_id)
+            if medication is not None and medication not in deleted:
+                changed.add(medication)
+    
+    changed -= deleted
+    if not (changed or deleted or profile_user_ids):
+        return
+    
+    revisions = bump_user_revisions([obj.user_id for obj in changed | deleted] + list(profile_user_ids))
+    for obj in changed:
+        obj.revision = revisions[obj.user_id]
+    for obj in deleted:
+        session.add(Tombstone(
+            user_id=obj.user_id,
+            table_name=obj.__tablename__,
+            row_id=obj.id,
+            revision=revisions[obj.user_id]
+        ))
+
+# Prompt context cache
+# The profile, medication and appointment part of chat and insight prompts is
+# rendered once per user and reused until one of them changes.
+PROMPT_CONTEXT_CACHE_ITEMS = int(os.environ.get('PROMPT_CONTEXT_CACHE_ITEMS', 1000))
+
+class PromptContextCache:
+    """LRU cache of each user's rendered prompt context.
+    
+    Commits that change a user's profile, medications or appointments drop the
+    user's entry in this process (write-through invalidation). Each entry also
+    records User.revision, which those writes bump, and a lookup checks it with
+    one primary-key read, so writes made by other processes are never served
+    stale either.
+    """
+    
+    def __init__(self, max_items):
+        self.max_items = max_items
+        self._entries = OrderedDict()  # user_id -> context dict
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+    
+    def get(self, user_id):
+        """Return {'revision', 'profile', 'insight', 'cache_scope', 'language'} for a user"""
+        revision = user_revision(user_id)
+        
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry['revision'] == revision:
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                return entry
+            self.misses += 1
+        
+        # Labelled with the revision read before loading: a concurrent write makes it miss next time
+        entry = load_prompt_context(user_id, revision)
+        
+        with self._lock:
+            self._entries[user_id] = entry
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_items:
+                self._entries.popitem(last=False)
+        return entry
+    
+    def invalidate(self, user_ids):
+        with self._lock:
+            for user_id in user_ids:
+                if self._entries.pop(user_id, None) is not None:
+                    self.invalidations += 1
+    
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'invalidations': self.invalidations,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else None
+            }
+
+prompt_context_cache = PromptContextCache(PROMPT_CONTEXT_CACHE_ITEMS)
+
+def load_prompt_context(user_id, revision):
+    """Render the prompt context of a user from the database"""
+    user = db.session.get(User, user_id)
+    recent_medications = Medication.query.filter_by(user_id=user_id).order_by(Medication.id.desc()).limit(5).all()
+    upcoming_appointments = Appointment.query.filter_by(user_id=user_id, status='Scheduled').order_by(Appointment.date_time).limit(3).all()
+    
+    return {
+        'revision': revision,
+        'profile': build_profile_context(user),
+        'insight': build_insight_prompt(user, recent_medications, upcoming_appointments),
+        'cache_scope': chat_cache_scope(user),
+        'language': user.preferred_language if user.preferred_language else 'en-US'
+    }
+
+@event.listens_for(db.session, 'after_flush')
+def collect_prompt_context_changes(session, flush_context):
+    """Remember which users' prompt context the flushed changes affect"""
+    user_ids = session.info.setdefault('prompt_context_user_ids', set())
+    for obj in itertools.chain(session.new, session.dirty, session.deleted):
+        if isinstance(obj, (Medication, Appointment)):
+            user_ids.add(obj.user_id)
+        elif isinstance(obj, User):
+            user_ids.add(obj.id)
+
+@event.listens_for(db.session, 'after_commit')
+def invalidate_prompt_contexts(session):
+    user_ids = session.info.pop('prompt_context_user_ids', None)
+    if user_ids:
+        prompt_context_cache.invalidate(user_ids)
+
+@event.listens_for(db.session, 'after_rollback')
+def discard_prompt_context_changes(session):
+    session.info.pop('prompt_context_user_ids', None)
+
+# Timezones
+# Times are stored as naive UTC; user-facing clock times (dose times, insight
+# delivery) are interpreted in the user's timezone.
+def user_timezone(user):
+    """Return the pytz timezone of a user, falling back to UTC"""
     try:
-        # Get user medical profile for context
-        user = User.query.get(user_id)
+        return pytz.timezone(user.timezone or 'UTC')
+    except pytz.UnknownTimeZoneError:
+        return pytz.utc
+
+def local_to_utc(local_time, tz):
+    """Convert a naive local time in tz to naive UTC"""
+    return tz.localize(local_time).astimezone(pytz.utc).replace(tzinfo=None)
+
+def utc_to_local(utc_time, tz):
+    """Convert a naive UTC time to naive local time in tz"""
+    return pytz.utc.localize(utc_time).astimezone(tz).replace(tzinfo=None)
+
+def parse_iso_datetime(value):
+    """Parse an ISO 8601 timestamp to naive UTC. A UTC offset ("Z", "+02:00") is applied; naive values are taken as UTC."""
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(pytz.utc).replace(tzinfo=None)
+    return parsed
+
+def next_insight_delivery(user, after):
+    """Return the local date and UTC time of the user's first insight delivery after `after`"""
+    tz = user_timezone(user)
+    day = utc_to_local(after, tz).date()
+    while True:
+        deliver_at = local_to_utc(datetime.combine(day, datetime.min.time()) + timedelta(hours=INSIGHT_DELIVERY_HOUR), tz)
+        if deliver_at > after:
+            return day, deliver_at
+        day += timedelta(days=1)
+
+def insight_generation_time(user_id, delivery_date, deliver_at):
+    """Pick a stable, per-user and per-day jittered generation time in the window before delivery"""
+    window = int(INSIGHT_GENERATION_WINDOW.total_seconds())
+    if window <= 0:
+        return deliver_at
+    
+    digest = hashlib.sha256(f'{user_id}:{delivery_date.isoformat()}'.encode('utf-8')).digest()
+    jitter = int.from_bytes(digest[:8], 'big') % window
+    return deliver_at - INSIGHT_GENERATION_WINDOW + timedelta(seconds=jitter)
+
+def schedule_next_insight(user, after):
+    """Set the generation time of the user's next insight delivered after `after`"""
+    delivery_date, deliver_at = next_insight_delivery(user, after)
+    user.next_insight_at = insight_generation_time(user.id, delivery_date, deliver_at)
+    return user.next_insight_at
+
+# Reminder materialization
+# Only the next REMINDER_HORIZON of doses is stored as MedicationReminder rows;
+# the scheduler extends it every REMINDER_REFRESH_INTERVAL.
+WEEKDAY_NAMES = ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday')
+WEEKDAY_ALIASES = {
+    'monday': 0, 'mon': 0, 'tuesday': 1, 'tues': 1, 'tue': 1, 'wednesday': 2, 'wed': 2,
+    'thursday': 3, 'thurs': 3, 'thur': 3, 'thu': 3, 'friday': 4, 'fri': 4,
+    'saturday': 5, 'sat': 5, 'sunday': 6, 'sun': 6
+}
+MONTH_ALIASES = {
+    'january': 1, 'jan': 1, 'february': 2, 'feb': 2, 'march': 3, 'mar': 3, 'april': 4, 'apr': 4,
+    'may': 5, 'june': 6, 'jun': 6, 'july': 7, 'jul': 7, 'august': 8, 'aug': 8,
+    'september': 9, 'sept': 9, 'sep': 9, 'october': 10, 'oct': 10, 'november': 11, 'nov': 11,
+    'december': 12, 'dec': 12
+}
+NUMBER_WORDS = {
+    'a': 1, 'an': 1, 'one': 1, 'two': 2, 'three': 3, 'four': 4, 'five': 5, 'six': 6,
+    'seven': 7, 'eight': 8, 'nine': 9, 'ten': 10, 'eleven': 11, 'twelve': 12
+}
+NAMED_TIMES = {'noon': (12, 0), 'midnight': (0, 0), 'morning': (8, 0), 'afternoon': (14, 0), 'evening': (18, 0), 'night': (21, 0)}
+
+def _alternation(words):
+    # Longest first, so "tues" is not matched as "tue"
+    return '|'.join(sorted(words, key=len, reverse=True))
+
+_WEEKDAY = _alternation(WEEKDAY_ALIASES)
+WEEKDAY_NAME_PATTERN = re.compile(rf'\b({_WEEKDAY})s?\b')
+_MONTH = _alternation(MONTH_ALIASES)
+
+REMINDER_HORIZON = timedelta(hours=24)
+# Every frequency medication_occurrences schedules contains one of these (all weekday aliases start with a three-letter name)
+SCHEDULED_FREQUENCY_WORDS = ('daily', 'mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun')
+REMINDER_REFRESH_INTERVAL = timedelta(hours=1)
+
+def parse_dose_times(time_of_day):
+    """Parse a time_of_day string like "8:00 AM, 8:00 PM" into sorted (hour, minute) tuples"""
+    dose_times = []
+    for time_str in time_of_day.split(','):
+        time_str = time_str.strip()
+        if not time_str:
+            continue
         
-        # Add medical context to prompt
-        context = f"""
-        User Medical Profile:
-        - Height: {user.height}cm
-        - Weight: {user.weight}kg
-        - Blood Type: {user.blood_type}
-        - Allergies: {user.allergies}
-        - Medical Conditions: {user.medical_conditions}
+        # Parse time (format like "8:00 AM")
+        try:
+            hour, minute = time_str.split(':')
+            hour = int(hour)
+            minute = int(minute.split()[0])
+            am_pm = time_str.split()[1].upper() if len(time_str.split()) > 1 else ''
+            
+            if am_pm == 'PM' and hour < 12:
+                hour += 12
+            elif am_pm == 'AM' and hour == 12:
+                hour = 0
+            
+            dose_times.append((hour, minute))
+        except Exception as e:
+            print(f"Error parsing time: {e}")
+    
+    return sorted(set(dose_times))
+
+def medication_occurrences(medication, after, until, tz=None):
+    """Yield the scheduled dose times (UTC) of a medication in the window (after, until].
+    
+    Dose times are clock times in the user's timezone (tz, or the timezone of
+    medication.user). A "daily" frequency doses every day; one naming weekdays
+    ("weekly on Monday, Thursday") only on those.
+    """
+    frequency = medication.frequency.lower()
+    weekdays = {WEEKDAY_ALIASES[name] for name in WEEKDAY_NAME_PATTERN.findall(frequency)}
+    if 'daily' not in frequency and not weekdays:
+        return
+    
+    dose_times = parse_dose_times(medication.time_of_day)
+    if not dose_times:
+        return
+    
+    start_date = medication.start_date or after
+    if medication.end_date:
+        until = min(until, medication.end_date)
+    
+    tz = tz or user_timezone(medication.user)
+    day = utc_to_local(max(after, start_date), tz).date()
+    while True:
+        if weekdays and day.weekday() not in weekdays:
+            day += timedelta(days=1)
+            continue
+        for hour, minute in dose_times:
+            occurrence = local_to_utc(datetime.combine(day, datetime.min.time()) + timedelta(hours=hour, minutes=minute), tz)
+            if occurrence > until:
+                return
+            if occurrence > after and occurrence >= start_date:
+                yield occurrence
+        day += timedelta(days=1)
+
+def materialize_medication_reminders(medication, until):
+    """Create the reminder rows of a medication up to until and return their times"""
+    now = datetime.utcnow()
+    
+    if medication.materialized_until:
+        # Never backfill more than one horizon of doses missed while the scheduler was down
+        after = max(medication.materialized_until, now - REMINDER_HORIZON)
+    else:
+        # Continue after any rows created before the schedule was tracked on the medication
+        latest = db.session.query(db.func.max(MedicationReminder.scheduled_time)).filter(
+            MedicationReminder.medication_id == medication.id
+        ).scalar()
+        after = max(latest or now, now)
+    
+    reminder_times = list(medication_occurrences(medication, after, until))
+    if reminder_times:
+        db.session.bulk_insert_mappings(MedicationReminder, [
+            {'medication_id': medication.id, 'scheduled_time': reminder_time}
+            for reminder_time in reminder_times
+        ])
+    
+    medication.materialized_until = until
+    return reminder_times
+
+def rematerialize_medication_reminders(medication):
+    """Replace the unsent reminders of a medication after its schedule changed"""
+    MedicationReminder.query.filter_by(medication_id=medication.id, is_sent=False).delete()
+    medication.materialized_until = None
+    return materialize_medication_reminders(medication, datetime.utcnow() + REMINDER_HORIZON)
+
+def materialize_reminders(current_time, batch_size=500):
+    """Extend the rolling reminder horizon of every active medication"""
+    until = current_time + REMINDER_HORIZON
+    last_id = 0
+    
+    while True:
+        batch = Medication.query.options(selectinload(Medication.user)).filter(
+            Medication.id > last_id,
+            db.or_(*(Medication.frequency.ilike(f'%{word}%') for word in SCHEDULED_FREQUENCY_WORDS)),
+            db.or_(Medication.materialized_until == None, Medication.materialized_until < until),
+            db.or_(Medication.end_date == None, Medication.end_date > db.func.coalesce(Medication.materialized_until, Medication.start_date))
+        ).order_by(Medication.id).limit(batch_size).all()
         
-        As a medical assistant, provide a helpful response based on this profile.
-        """
+        if not batch:
+            break
         
-        full_prompt = context + "\n\nUser Query: " + prompt
+        for medication in batch:
+            # Only the scheduler that moves materialized_until on from the value it read inserts the doses
+            claimed = Medication.query.filter(
+                Medication.id == medication.id,
+                Medication.materialized_until == medication.materialized_until if medication.materialized_until else Medication.materialized_until == None
+            ).update({Medication.materialized_until: until}, synchronize_session=False)
+            if claimed:
+                materialize_medication_reminders(medication, until)
+        db.session.commit()
         
-        # Generate response using Gemini
-        model = genai.GenerativeModel('gemini-1.5-pro-latest')
-        response = model.generate_content(full_prompt)
+        last_id = batch[-1].id
+
+# Background task for checking reminders
+def dispatch_notifications(notifications_by_user):
+    """Emit one payload per user: the notification itself, or a batch when several are due"""
+    for user_id, notifications in notifications_by_user.items():
+        if len(notifications) == 1:
+            socketio.emit('notification', notifications[0], to=user_room(user_id))
+        else:
+            socketio.emit('notification', {
+                'type': 'notification_batch',
+                'user_id': user_id,
+                'notifications': notifications
+            }, to=user_room(user_id))
+
+def claim_due_rows(model, due_filter, order_by, current_time, batch_size):
+    """Claim up to batch_size due rows of model for this scheduler process and return their ids.
+    
+    Candidates are picked with FOR UPDATE SKIP LOCKED where the database
+    supports it, and the UPDATE re-checks that each row is still unclaimed, so
+    concurrent schedulers never claim the same row. A claim older than
+    SCHEDULER_CLAIM_TIMEOUT belongs to a scheduler that died mid-sweep and can
+    be taken over.
+    """
+    claimable = db.or_(model.claimed_by == None, model.claimed_at < current_time - SCHEDULER_CLAIM_TIMEOUT)
+    candidate_ids = [
+        row[0] for row in db.session.query(model.id).filter(due_filter, claimable).order_by(order_by)
+        .limit(batch_size).with_for_update(skip_locked=True).all()
+    ]
+    if not candidate_ids:
+        return []
+    
+    model.query.filter(model.id.in_(candidate_ids), claimable).update(
+        {model.claimed_by: SCHEDULER_ID, model.claimed_at: current_time}, synchronize_session=False
+    )
+    db.session.commit()
+    return candidate_ids
+
+def check_reminders(current_time, batch_size=500):
+    """Dispatch every reminder, timer and insight that is due at current_time in batched sweeps.
+    
+    Each sweep claims up to batch_size due rows of each kind for this process,
+    loads them together with their medication/appointment and user in one
+    joined query, emits one payload per user and marks the whole batch with a
+    single UPDATE ... WHERE id IN (...). Claims keep concurrent schedulers from
+    sending a row twice. Rows are only marked after the emit, so a crash
+    mid-sweep re-delivers them once the claim expires (at-least-once) instead
+    of dropping them.
+    """
+    while True:
+        notifications_by_user = {}
         
-        # Save conversation to database
-        conversation = Conversation(
-            user_id=user_id,
-            message=prompt,
-            response=response.text,
-            interaction_type='chat'
+        medication_ids = claim_due_rows(
+            MedicationReminder,
+            db.and_(MedicationReminder.is_sent == False, MedicationReminder.scheduled_time <= current_time),
+            MedicationReminder.scheduled_time, current_time, batch_size
+        )
+        appointment_ids = claim_due_rows(
+            AppointmentReminder,
+            db.and_(AppointmentReminder.is_sent == False, AppointmentReminder.reminder_time <= current_time),
+            AppointmentReminder.reminder_time, current_time, batch_size
+        )
+        timer_ids = claim_due_rows(
+            Timer,
+            db.and_(Timer.status == 'Running', Timer.end_time <= current_time),
+            Timer.end_time, current_time, batch_size
         )
-        db.session.add(conversation)
+        insight_ids = claim_due_rows(
+            HealthInsight,
+            db.and_(HealthInsight.is_delivered == False, HealthInsight.deliver_at <= current_time),
+            HealthInsight.deliver_at, current_time, batch_size
+        )
+        
+        if not (medication_ids or appointment_ids or timer_ids or insight_ids):
+            break
+        
+        # Medication reminders
+        medication_rows = db.session.query(
+            MedicationReminder.id, Medication.id, Medication.name, Medication.dosage, User.id
+        ).join(Medication, MedicationReminder.medication_id == Medication.id).join(
+            User, Medication.user_id == User.id
+        ).filter(
+            MedicationReminder.id.in_(medication_ids),
+            MedicationReminder.claimed_by == SCHEDULER_ID
+        ).order_by(MedicationReminder.scheduled_time).all() if medication_ids else []
+        
+        for reminder_id, medication_id, name, dosage, user_id in medication_rows:
+            notifications_by_user.setdefault(user_id, []).append({
+                'type': 'medication_reminder',
+                'user_id': user_id,
+                'title': 'Medication Reminder',
+                'message': f"Time to take your {name} ({dosage})",
+                'medication_id': medication_id,
+                'reminder_id': reminder_id
+            })
+        
+        # Appointment reminders
+        appointment_rows = db.session.query(
+            AppointmentReminder.id, Appointment.id, Appointment.doctor_name, Appointment.date_time, Appointment.purpose, User.id
+        ).join(Appointment, AppointmentReminder.appointment_id == Appointment.id).join(
+            User, Appointment.user_id == User.id
+        ).filter(
+            AppointmentReminder.id.in_(appointment_ids),
+            AppointmentReminder.claimed_by == SCHEDULER_ID
+        ).order_by(AppointmentReminder.reminder_time).all() if appointment_ids else []
+        
+        for reminder_id, appointment_id, doctor_name, date_time, purpose, user_id in appointment_rows:
+            notifications_by_user.setdefault(user_id, []).append({
+                'type': 'appointment_reminder',
+                'user_id': user_id,
+                'title': 'Appointment Reminder',
+                'message': f"You have an appointment with Dr. {doctor_name} at {date_time.strftime('%I:%M %p')} for {purpose}",
+                'appointment_id': appointment_id,
+                'reminder_id': reminder_id
+            })
+        
+        # Completed timers
+        timer_rows = db.session.query(Timer.id, Timer.name, Timer.user_id).filter(
+            Timer.id.in_(timer_ids),
+            Timer.claimed_by == SCHEDULER_ID
+        ).order_by(Timer.end_time).all() if timer_ids else []
+        
+        for timer_id, name, user_id in timer_rows:
+            notifications_by_user.setdefault(user_id, []).append({
+                'type': 'timer_completed',
+                'user_id': user_id,
+                'title': 'Timer Completed',
+                'message': f"Your timer for {name} has completed",
+                'timer_id': timer_id
+            })
+        
+        # Precomputed health insights whose delivery time has come
+        insight_rows = db.session.query(HealthInsight.id, HealthInsight.user_id, HealthInsight.content).filter(
+            HealthInsight.id.in_(insight_ids),
+            HealthInsight.claimed_by == SCHEDULER_ID
+        ).order_by(HealthInsight.deliver_at).all() if insight_ids else []
+        
+        for insight_id, user_id, content in insight_rows:
+            notifications_by_user.setdefault(user_id, []).append(
+                health_insight_notification(insight_id, user_id, content)
+            )
+        
+        dispatch_notifications(notifications_by_user)
+        
+        # Mark the whole sweep in one transaction (rows without a medication/appointment are retired too)
+        if medication_ids:
+            MedicationReminder.query.filter(
+                MedicationReminder.id.in_(medication_ids), MedicationReminder.claimed_by == SCHEDULER_ID
+            ).update({MedicationReminder.is_sent: True}, synchronize_session=False)
+        if appointment_ids:
+            AppointmentReminder.query.filter(
+                AppointmentReminder.id.in_(appointment_ids), AppointmentReminder.claimed_by == SCHEDULER_ID
+            ).update({AppointmentReminder.is_sent: True}, synchronize_session=False)
+        if timer_ids:
+            Timer.query.filter(
+                Timer.id.in_(timer_ids), Timer.claimed_by == SCHEDULER_ID
+            ).update({Timer.status: 'Completed', Timer.elapsed: Timer.duration}, synchronize_session=False)
+        if insight_ids:
+            HealthInsight.query.filter(
+                HealthInsight.id.in_(insight_ids), HealthInsight.claimed_by == SCHEDULER_ID
+            ).update({HealthInsight.is_delivered: True}, synchronize_session=False)
+        
+        # Sent doses count towards reminder_stats; completed timers and delivered insights change the lists
+        touch_rows(Medication, {row[1] for row in medication_rows})
+        touch_rows(Appointment, {row[1] for row in appointment_rows})
+        touch_rows(Timer, [row[0] for row in timer_rows])
+        touch_rows(HealthInsight, [row[0] for row in insight_rows])
         db.session.commit()
         
-        return response.text
-    except Exception as e:
-        print(f"Error generating AI response: {e}")
-        return "I'm sorry, I encountered an error processing your request. Please try again later."
+        if max(len(medication_ids), len(appointment_ids), len(timer_ids), len(insight_ids)) < batch_size:
+            break
 
-def text_to_speech(text, language_code='en-US'):
-    """Convert text to speech using Google Cloud TTS"""
-    try:
-        client = texttospeech.TextToSpeechClient()
+class ReminderScheduler:
+    """Sleeps until the earliest due reminder instead of polling on a fixed interval.
+    
+    A min-heap holds the next due times. It is seeded from the database with
+    indexed MIN() lookups and fed by the routes whenever they create reminders
+    or start timers, so each wake-up only touches rows that are actually due.
+    """
+    
+    def __init__(self, max_sleep=300):
+        self.max_sleep = max_sleep  # Upper bound between database resyncs
+        self._heap = []
+        self._pending = set()
+        self._condition = threading.Condition()
+        self._running = False
+    
+    def schedule(self, due_time):
+        """Wake the scheduler at due_time (no-op for duplicates, or in processes that don't run it)"""
+        if due_time is None or not self._running:
+            return
         
-        synthesis_input = texttospeech.SynthesisInput(text=text)
+        with self._condition:
+            if due_time in self._pending:
+                return
+            heapq.heappush(self._heap, due_time)
+            self._pending.add(due_time)
+            
+            # Only interrupt the current sleep if this is the new earliest event
+            if self._heap[0] == due_time:
+                self._condition.notify()
+    
+    def load_next_due_times(self, after=None):
+        """Seed the heap with the earliest pending event of each kind.
         
-        voice = texttospeech.VoiceSelectionParams(
-            language_code=language_code,
-            ssml_gender=texttospeech.SsmlVoiceGender.NEUTRAL
+        Events at or before `after` were covered by the last sweep, so they are
+        skipped; this keeps a row that cannot be dispatched from spinning the loop.
+        """
+        medication_query = db.session.query(db.func.min(MedicationReminder.scheduled_time)).filter(
+            MedicationReminder.is_sent == False
         )
-        
-        audio_config = texttospeech.AudioConfig(
-            audio_encoding=texttospeech.AudioEncoding.MP3
+        appointment_query = db.session.query(db.func.min(AppointmentReminder.reminder_time)).filter(
+            AppointmentReminder.is_sent == False
         )
-        
-        response = client.synthesize_speech(
-            input=synthesis_input, voice=voice, audio_config=audio_config
+        timer_query = db.session.query(db.func.min(Timer.end_time)).filter(
+            Timer.status == 'Running'
         )
+        insight_query = db.session.query(db.func.min(HealthInsight.deliver_at)).filter(
+            HealthInsight.is_delivered == False
+        )
+        generation_query = db.session.query(db.func.min(User.next_insight_at))
         
-        # Encode audio content to base64 for sending through WebSocket
-        audio_content = base64.b64encode(response.audio_content).decode('utf-8')
-        return audio_content
-    except Exception as e:
+        if after is not None:
+            medication_query = medication_query.filter(MedicationReminder.scheduled_time > after)
+            appointment_query = appointment_query.filter(AppointmentReminder.reminder_time > after)
+            timer_query = timer_query.filter(Timer.end_time > after)
+            insight_query = insight_query.filter(HealthInsight.deliver_at > after)
+            generation_query = generation_query.filter(User.next_insight_at > after)
+        
+        next_medication = medication_query.scalar()
+        next_appointment = appointment_query.scalar()
+        next_timer = timer_query.scalar()
+        next_insight = insight_query.scalar()
+        next_generation = generation_query.scalar()
+        
+        for due_time in (next_medication, next_appointment, next_timer, next_insight, next_generation):
+            self.schedule(due_time)
+    
+    def wait_for_next_due(self):
+        """Block until the earliest event is due (or max_sleep passes) and return the current time"""
+        with self._condition:
+            now = datetime.utcnow()
+            timeout = self.max_sleep
+            if self._heap:
+                timeout = min(timeout, (self._heap[0] - now).total_seconds())
+            if timeout > 0:
+                self._condition.wait(timeout)
+            
+            now = datetime.utcnow()
+            while self._heap and self._heap[0] <= now:
+                self._pending.discard(heapq.heappop(self._heap))
+            return now
+    
+    def run(self):
+        self._running = True
+        with app.app_context():
+            materialize_time = datetime.utcnow()
+            self.schedule(materialize_time)
+            current_time = None
+            
+            while True:
+                try:
+                    self.load_next_due_times(after=current_time)
+                    current_time = self.wait_for_next_due()
+                    
+                    # Extend the rolling reminder horizon
+                    if current_time >= materialize_time:
+                        materialize_reminders(current_time)
+                        materialize_time = current_time + REMINDER_REFRESH_INTERVAL
+                        self.schedule(materialize_time)
+                    
+                    check_reminders(current_time)
+                    
+                    # Generate the insights whose jittered generation time has come on the insight job thread
+                    if insight_job.has_due_users(current_time):
+                        insight_job.start()
+                except Exception as e:
+                    print(f"Error in reminder scheduler: {e}")
+                    db.session.rollback()
+                    time.sleep(1)
+                finally:
+                    db.session.remove()
+
+reminder_scheduler = ReminderScheduler()
+
+def start_reminder_thread():
+    """Run the scheduler on a background thread of this process"""
+    reminder_thread = threading.Thread(target=reminder_scheduler.run)
+    reminder_thread.daemon = True
+    reminder_thread.start()
+    return reminder_thread
+
+@app.cli.command('scheduler')
+@click.option('--resync', default=SCHEDULER_RESYNC_SECONDS, show_default=True,
+              help='Seconds between checks for rows created by web workers.')
+def scheduler_command(resync):
+    """Run the reminder scheduler in the foreground.
+    
+    Web workers don't dispatch reminders themselves; run this once (or several
+    times for redundancy, as rows are claimed before they are sent).
+    """
+    reminder_scheduler.max_sleep = resync
+    print(f'Reminder scheduler {SCHEDULER_ID} started')
+    reminder_scheduler.run()
+
+# Helper functions
+INTENT_ROUTER_ENABLED = os.environ.get('INTENT_ROUTER_ENABLED', '1') == '1'
+ADHERENCE_WINDOW = timedelta(days=int(os.environ.get('ADHERENCE_WINDOW_DAYS', 7)))
+
+# Optional lead-in and closing words around a data question ("hey, can you tell me ... please?")
+INTENT_PREFIX = r"(?:(?:hey|hi|ok|okay|so|please)\b,? )*(?:(?:can|could|would) you (?:please )?(?:tell|show|remind) me |(?:please )?(?:tell|show|remind) me |i (?:want|need) to know |do you know )?"
+INTENT_SUFFIX = r"(?: please| for me)?"
+INTENT_MEDS = r"(?:meds|medications?|medicines?|pills|tablets|doses)"
+INTENT_APPOINTMENT = r"(?:appointments?|doctors? (?:appointments?|visits?)|visits?|check ?ups?)"
+INTENT_PERIOD = r"(?: (?:today|this week|lately|recently|on time|regularly))?"
+
+INTENT_PATTERNS = {
+    'todays_doses': [
+        rf"(?:what|which) {INTENT_MEDS} (?:do|should|must) i (?:have to |need to )?(?:take|have)(?: today| this (?:morning|afternoon|evening)| tonight)?",
+        rf"(?:what|which) {INTENT_MEDS} (?:are|is) (?:due|scheduled|left)(?: for)? today",
+        rf"(?:what(?: is|s)? )?my (?:{INTENT_MEDS}|medication|dose|pill) schedule(?: for)?(?: today)?",
+        rf"(?:my )?{INTENT_MEDS} (?:for )?today",
+        rf"when (?:do|should) i take my {INTENT_MEDS}(?: today)?",
+        rf"(?:do|did) i (?:still )?have (?:any )?{INTENT_MEDS} (?:left |due )?(?:to take )?today",
+    ],
+    'next_appointment': [
+        rf"when(?: is|s) my next {INTENT_APPOINTMENT}",
+        rf"(?:what|when)(?: is|s| are) my (?:next|upcoming) {INTENT_APPOINTMENT}",
+        rf"(?:my )?(?:next|upcoming) {INTENT_APPOINTMENT}",
+        rf"do i have (?:an |any )?(?:upcoming )?{INTENT_APPOINTMENT}(?: coming up| soon| this week| scheduled)?",
+        r"when (?:do|should) i see (?:the|my) doctor(?: next)?",
+    ],
+    'timer_status': [
+        r"(?:what(?: is|s)? )?(?:the )?(?:status of )?my timers?(?: status)?",
+        r"(?:the )?timers? status",
+        r"how (?:much|long)(?: time)?(?: is)? (?:left|remaining) on (?:my|the) timers?",
+        r"(?:is|are) (?:my|the) timers? (?:still )?(?:running|done|finished|on)",
+        r"(?:do i have )?any (?:active |running )?timers?(?: running)?",
+    ],
+    'adherence': [
+        rf"(?:what(?: is|s)? )?my (?:medication |med |dose )?adherence(?: rate| score)?{INTENT_PERIOD}",
+        rf"(?:have|did) i (?:been )?(?:take|taking|taken) (?:all )?my {INTENT_MEDS}{INTENT_PERIOD}",
+        rf"how many {INTENT_MEDS} (?:did|have) i (?:miss|missed|skip|skipped){INTENT_PERIOD}",
+        rf"(?:did|have) i (?:miss|missed|skip|skipped) any {INTENT_MEDS}{INTENT_PERIOD}",
+        rf"how (?:am i|have i been) doing (?:with|on) my {INTENT_MEDS}{INTENT_PERIOD}",
+    ],
+}
+
+def format_seconds(seconds):
+    """Format a number of seconds as HH:MM:SS"""
+    seconds = int(seconds)
+    return f'{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}'
+
+class IntentRouter:
+    """Answers questions about the user's own data straight from the database.
+    
+    Each intent has a few patterns that must match the whole (normalized)
+    question, so "what meds do I take today?" is routed while "what are the side
+    effects of my meds?" still goes to Gemini. Routed answers are built from
+    indexed queries and take milliseconds; anything else returns None.
+    """
+    
+    def __init__(self, patterns):
+        self._patterns = [
+            (intent, re.compile(INTENT_PREFIX + pattern + INTENT_SUFFIX))
+            for intent, intent_patterns in patterns.items()
+            for pattern in intent_patterns
+        ]
+        self._handlers = {
+            'todays_doses': self.todays_doses,
+            'next_appointment': self.next_appointment,
+            'timer_status': self.timer_status,
+            'adherence': self.adherence
+        }
+        self._lock = threading.Lock()
+        self.routed = Counter()
+        self.fallbacks = 0
+        self._routed_seconds = 0.0
+    
+    @staticmethod
+    def normalize(text):
+        text = re.sub(r"['’]", '', re.sub(r'\s+', ' ', text.lower())).strip()
+        return re.sub(r'[\s?.!]+$', '', text)
+    
+    def classify(self, text):
+        """Return the intent a question is asking for, or None for open questions"""
+        text = self.normalize(text)
+        for intent, pattern in self._patterns:
+            if pattern.fullmatch(text):
+                return intent
+        return None
+    
+    def answer(self, user_id, text):
+        """Return the answer to a data question, or None when the model should answer"""
+        intent = self.classify(text) if INTENT_ROUTER_ENABLED else None
+        if intent is None:
+            with self._lock:
+                self.fallbacks += 1
+            return None
+        
+        started = time.perf_counter()
+        user = db.session.get(User, user_id)
+        response_text = self._handlers[intent](user, datetime.utcnow())
+        
+        with self._lock:
+            self.routed[intent] += 1
+            self._routed_seconds += time.perf_counter() - started
+        return response_text
+    
+    def todays_doses(self, user, current_time):
+        tz = user_timezone(user)
+        local_now = utc_to_local(current_time, tz)
+        day_start = datetime.combine(local_now.date(), datetime.min.time())
+        
+        rows = db.session.query(
+            MedicationReminder.scheduled_time, MedicationReminder.status, Medication.name, Medication.dosage
+        ).join(Medication, MedicationReminder.medication_id == Medication.id).filter(
+            Medication.user_id == user.id,
+            MedicationReminder.scheduled_time >= local_to_utc(day_start, tz),
+            MedicationReminder.scheduled_time < local_to_utc(day_start + timedelta(days=1), tz)
+        ).order_by(MedicationReminder.scheduled_time, Medication.name).all()
+        
+        if not rows:
+            return "You have no medication doses scheduled for today."
+        
+        lines = [f"Here are your doses for today ({local_now.strftime('%A, %B %d')}):"]
+        for scheduled_time, status, name, dosage in rows:
+            if status == 'Acknowledged':
+                state = 'taken'
+            elif status == 'Dismissed':
+                state = 'skipped'
+            elif scheduled_time <= current_time:
+                state = 'not taken yet'
+            else:
+                state = 'upcoming'
+            lines.append(f"• {utc_to_local(scheduled_time, tz).strftime('%I:%M %p')} - {name} {dosage} ({state})")
+        return "\n".join(lines)
+    
+    def next_appointment(self, user, current_time):
+        appointment = Appointment.query.filter(
+            Appointment.user_id == user.id,
+            Appointment.status.in_(('Scheduled', 'Rescheduled')),
+            Appointment.date_time > current_time
+        ).order_by(Appointment.date_time, Appointment.id).first()
+        
+        if not appointment:
+            return "You have no upcoming appointments."
+        
+        date_time = utc_to_local(appointment.date_time, user_timezone(user))
+        doctor = f"Dr. {appointment.doctor_name}"
+        if appointment.specialty:
+            doctor += f" ({appointment.specialty})"
+        response_text = (
+            f"Your next appointment is with {doctor} on "
+            f"{date_time.strftime('%A, %B %d at %I:%M %p')} at {appointment.location}."
+        )
+        if appointment.purpose:
+            response_text += f" Purpose: {appointment.purpose}."
+        return response_text
+    
+    def timer_status(self, user, current_time):
+        timers = Timer.query.filter_by(user_id=user.id).order_by(Timer.created_at, Timer.id).all()
+        
+        if not timers:
+            return "You don't have any timers set up."
+        
+        lines = ["Here are your timers:"]
+        for timer in timers:
+            if timer.status == 'Running':
+                remaining = max(0, (timer.end_time - current_time).total_seconds())
+                lines.append(f"• {timer.name} - running, {format_seconds(remaining)} remaining")
+            elif timer.status == 'Paused':
+                lines.append(f"• {timer.name} - paused, {format_seconds(timer.duration - timer.elapsed)} remaining")
+            else:
+                lines.append(f"• {timer.name} - {timer.status.lower()} ({format_seconds(timer.duration)})")
+        return "\n".join(lines)
+    
+    def adherence(self, user, current_time):
+        rows = db.session.query(
+            Medication.name,
+            db.func.count(MedicationReminder.id),
+            db.func.sum(db.case((MedicationReminder.status == 'Acknowledged', 1), else_=0))
+        ).join(Medication, MedicationReminder.medication_id == Medication.id).filter(
+            Medication.user_id == user.id,
+            MedicationReminder.scheduled_time > current_time - ADHERENCE_WINDOW,
+            MedicationReminder.scheduled_time <= current_time
+        ).group_by(Medication.id, Medication.name).order_by(Medication.name).all()
+        
+        days = ADHERENCE_WINDOW.days
+        if not rows:
+            return f"No medication doses were due in the last {days} days."
+        
+        due = sum(total for _, total, _ in rows)
+        taken = sum(acknowledged or 0 for _, _, acknowledged in rows)
+        lines = [f"Over the last {days} days you took {taken} of {due} scheduled doses ({round(100 * taken / due)}%)."]
+        for name, total, acknowledged in rows:
+            lines.append(f"• {name}: {acknowledged or 0} of {total}")
+        return "\n".join(lines)
+    
+    def stats(self):
+        with self._lock:
+            routed = sum(self.routed.values())
+            lookups = routed + self.fallbacks
+            return {
+                'enabled': INTENT_ROUTER_ENABLED,
+                'routed': routed,
+                'fallbacks': self.fallbacks,
+                'hit_rate': round(routed / lookups, 3) if lookups else None,
+                'intents': dict(self.routed),
+                'avg_routed_ms': round(1000 * self._routed_seconds / routed, 2) if routed else None
+            }
+
+intent_router = IntentRouter(INTENT_PATTERNS)
+
+def generate_ai_response(prompt, user_id, on_chunk=None, usage=None, interaction_type='chat'):
+    """Generate response using Gemini API with user context.
+    
+    When on_chunk is given the response is streamed and every text chunk is
+    passed to it as soon as it arrives; the conversation is saved once at the end
+    with interaction_type ('chat' or 'voice').
+    If a dict is passed as usage, the estimated prompt token count is stored in it.
+    Questions about the user's own medications, appointments and timers are
+    answered by the intent router without calling the model.
+    """
+    try:
+        routed_text = intent_router.answer(user_id, prompt)
+        if routed_text is not None:
+            if on_chunk:
+                on_chunk(routed_text)
+            if usage is not None:
+                usage['prompt_tokens'] = 0
+            save_conversation(user_id, prompt, routed_text, interaction_type)
+            return routed_text
+        
+        # Rendered medical profile for context, cached until the profile changes
+        prompt_context = prompt_context_cache.get(user_id)
+        context = prompt_context['profile']
+        
+        # Add bounded conversation memory
+        history = chat_context.build(user_id)
+        if history:
+            context += "\n" + history + "\n"
+        
+        full_prompt = context + "\n\nUser Query: " + prompt
+        
+        prompt_tokens = estimate_tokens(full_prompt)
+        chat_context.record(prompt_tokens)
+        if usage is not None:
+            usage['prompt_tokens'] = prompt_tokens
+        
+        # Reuse a previous answer to a near-identical question when the cache is enabled
+        response_text = None
+        use_cache = CHAT_CACHE_ENABLED and not is_follow_up(prompt)
+        if use_cache:
+            cache_scope = prompt_context['cache_scope']
+            response_text = response_cache.lookup(cache_scope, prompt)
+            if response_text is not None and on_chunk:
+                on_chunk(response_text)
+        
+        if response_text is None:
+            # Generate response using Gemini
+            model = clients.model(GEMINI_CHAT_MODEL)
+            with clients.track(GEMINI_CHAT_MODEL):
+                if on_chunk:
+                    chunks = []
+                    for chunk in model.generate_content(full_prompt, stream=True):
+                        chunks.append(chunk.text)
+                        on_chunk(chunk.text)
+                    response_text = ''.join(chunks)
+                else:
+                    response_text = model.generate_content(full_prompt).text
+            
+            if use_cache:
+                response_cache.store(cache_scope, prompt, response_text)
+        
+        save_conversation(user_id, prompt, response_text, interaction_type)
+        
+        return response_text
+    except Exception as e:
+        print(f"Error generating AI response: {e}")
+        return "I'm sorry, I encountered an error processing your request. Please try again later."
+
+def save_conversation(user_id, prompt, response_text, interaction_type):
+    """Save a chat exchange to the user's conversation history"""
+    conversation = Conversation(
+        user_id=user_id,
+        message=prompt,
+        response=response_text,
+        interaction_type=interaction_type
+    )
+    db.session.add(conversation)
+    db.session.commit()
+
+def text_to_speech(text, language_code='en-US'):
+    """Convert text to speech using Google Cloud TTS and return the audio cache key.
+    
+    Identical text and voice settings are synthesized once; the audio is then
+    served from /ai/audio/<key>.
+    """
+    try:
+        ssml_gender = texttospeech.SsmlVoiceGender.NEUTRAL
+        audio_encoding = texttospeech.AudioEncoding.MP3
+        
+        key = AudioCache.key(text, language_code, ssml_gender, audio_encoding)
+        if audio_cache.get(key) is not None:
+            return key
+        
+        client = clients.tts_client()
+        
+        synthesis_input = texttospeech.SynthesisInput(text=text)
+        
+        voice = texttospeech.VoiceSelectionParams(
+            language_code=language_code,
+            ssml_gender=ssml_gender
+        )
+        
+        audio_config = texttospeech.AudioConfig(
+            audio_encoding=audio_encoding
+        )
+        
+        with clients.track('text-to-speech'):
+            response = client.synthesize_speech(
+                input=synthesis_input, voice=voice, audio_config=audio_config
+            )
+        
+        audio_cache.put(key, response.audio_content)
+        return key
+    except Exception as e:
         print(f"Error in text-to-speech conversion: {e}")
         return None
 
-def generate_health_insights(user_id):
-    """Generate personalized health insights for a user"""
-    try:
-        user = User.query.get(user_id)
-        
-        # Get user's recent activity and status
-        recent_medications = Medication.query.filter_by(user_id=user_id).order_by(Medication.id.desc()).limit(5).all()
-        upcoming_appointments = Appointment.query.filter_by(user_id=user_id, status='Scheduled').order_by(Appointment.date_time).limit(3).all()
-        
-        # Construct context for AI
-        context = f"""
-        Generate a personalized health insight for a user with the following profile:
-        - Height: {user.height}cm
-        - Weight: {user.weight}kg
-        - Blood Type: {user.blood_type}
-        - Allergies: {user.allergies}
-        - Medical Conditions: {user.medical_conditions}
-        
-        Recent medications: {', '.join([m.name for m in recent_medications])}
-        Upcoming appointments: {', '.join([f"Dr. {a.doctor_name} on {a.date_time.strftime('%Y-%m-%d')}" for a in upcoming_appointments])}
-        
-        Generate one concise health tip that would be valuable for this user's wellbeing today.
-        """
-        
-        # Generate insight using Gemini
-        model = genai.GenerativeModel('gemini-pro')
-        response = model.generate_content(context)
+def build_profile_context(user):
+    """Construct the medical profile part of chat prompts"""
+    return f"""
+        User Medical Profile:
+        - Height: {user.height}cm
+        - Weight: {user.weight}kg
+        - Blood Type: {user.blood_type}
+        - Allergies: {user.allergies}
+        - Medical Conditions: {user.medical_conditions}
+        
+        As a medical assistant, provide a helpful response based on this profile.
+        """
+
+def build_insight_prompt(user, recent_medications, upcoming_appointments):
+    """Construct the health insight prompt for a user"""
+    return f"""
+        Generate a personalized health insight for a user with the following profile:
+        - Height: {user.height}cm
+        - Weight: {user.weight}kg
+        - Blood Type: {user.blood_type}
+        - Allergies: {user.allergies}
+        - Medical Conditions: {user.medical_conditions}
+        
+        Recent medications: {', '.join([m.name for m in recent_medications])}
+        Upcoming appointments: {', '.join([f"Dr. {a.doctor_name} on {a.date_time.strftime('%Y-%m-%d')}" for a in upcoming_appointments])}
+        
+        Generate one concise health tip that would be valuable for this user's wellbeing today.
+        """
+
+def generate_insight_text(prompt):
+    """Generate an insight using Gemini"""
+    model = clients.model(GEMINI_INSIGHT_MODEL)
+    with clients.track(GEMINI_INSIGHT_MODEL):
+        return model.generate_content(prompt).text
+
+def health_insight_notification(insight_id, user_id, content):
+    """Build the notification payload of a stored insight"""
+    return {
+        'type': 'health_insight',
+        'user_id': user_id,
+        'title': 'Daily Health Insight',
+        'message': content,
+        'insight_id': insight_id
+    }
+
+def notify_health_insight(insight):
+    """Send a stored insight to its user"""
+    notification = health_insight_notification(insight.id, insight.user_id, insight.content)
+    
+    socketio.emit('notification', notification, to=user_room(insight.user_id))
+
+def generate_health_insights(user_id):
+    """Generate personalized health insights for a user"""
+    try:
+        # Profile, recent medications and upcoming appointments, cached until one of them changes
+        context = prompt_context_cache.get(user_id)['insight']
+        
+        content = generate_insight_text(context)
+        
+        # Create health insight
+        insight = HealthInsight(
+            user_id=user_id,
+            insight_type='daily',
+            content=content
+        )
+        db.session.add(insight)
+        db.session.commit()
+        
+        # Send notification to user
+        notify_health_insight(insight)
+        
+        return content
+    except Exception as e:
+        print(f"Error generating health insight: {e}")
+        return None
+
+class TokenBucket:
+    """Blocking token-bucket rate limiter shared by worker threads"""
+    
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+class InsightJobRunner:
+    """Generates daily health insights ahead of each user's local delivery time.
+    
+    Every user carries the time of their next generation (next_insight_at), a
+    jittered point in the window before their local delivery hour, so model
+    calls are spread across the day instead of spiking at one moment. A pass
+    streams the due users in keyset-paginated chunks, prefetches medications
+    and appointments for the whole chunk and fans model calls out to a thread
+    pool under a token bucket. Each insight is stored undelivered together with
+    its InsightRun row (whose unique constraint keeps it exactly-once per user
+    and local day) and the user's next generation time; the reminder scheduler
+    pushes it when its delivery time comes. Users are claimed with a conditional
+    UPDATE of next_insight_at, so passes in several scheduler processes never
+    generate the same insight twice.
+    """
+    
+    def __init__(self, workers, rate_per_second, chunk_size):
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self._rate_limiter = TokenBucket(rate_per_second, capacity=max(1, workers))
+        self._lock = threading.Lock()
+        self._thread = None
+        self._progress = {'state': 'idle'}
+    
+    def start(self):
+        """Start a pass over the due users in the background; returns False if one is already active"""
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return False
+            
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+            return True
+    
+    @staticmethod
+    def has_due_users(current_time):
+        """Return True if a user's insight should be generated (or first scheduled) by current_time"""
+        return db.session.query(User.id).filter(
+            db.or_(User.next_insight_at == None, User.next_insight_at <= current_time)
+        ).first() is not None
+    
+    def stats(self):
+        with self._lock:
+            return dict(self._progress)
+    
+    def _count(self, **increments):
+        with self._lock:
+            for key, value in increments.items():
+                self._progress[key] += value
+    
+    def _finish(self, state, **extra):
+        with self._lock:
+            self._progress.update(state=state, finished_at=datetime.utcnow().isoformat(), **extra)
+    
+    def _due_users(self, current_time, last_id):
+        return User.query.filter(
+            User.id > last_id,
+            db.or_(User.next_insight_at == None, User.next_insight_at <= current_time)
+        ).order_by(User.id).limit(self.chunk_size).all()
+    
+    def _plan(self, users, current_time):
+        """Return {user_id: (delivery_date, deliver_at, next_insight_at)} for the users to generate now.
+        
+        Users seen for the first time only get their generation time scheduled
+        unless it has already passed.
+        """
+        plans = {}
+        for user in users:
+            previous = user.next_insight_at
+            delivery_date, deliver_at = next_insight_delivery(user, previous or current_time)
+            if previous is None:
+                generate_at = insight_generation_time(user.id, delivery_date, deliver_at)
+                if generate_at > current_time:
+                    if self._claim(user.id, previous, generate_at):
+                        self._count(scheduled=1)
+                    continue
+            
+            # Claim the user by moving next_insight_at to the retry time: a concurrent
+            # pass skips them, and if generation fails they are retried after the delay
+            if not self._claim(user.id, previous, current_time + INSIGHT_RETRY_DELAY):
+                continue
+            
+            # A late pass (e.g. after downtime) schedules from now rather than replaying missed days
+            next_date, next_deliver_at = next_insight_delivery(user, max(deliver_at, current_time))
+            plans[user.id] = (delivery_date, deliver_at, insight_generation_time(user.id, next_date, next_deliver_at))
+        return plans
+    
+    def _build_prompts(self, users):
+        user_ids = [user.id for user in users]
+        
+        # Prefetch medications and appointments for the whole chunk
+        medications = {}
+        for medication in Medication.query.filter(Medication.user_id.in_(user_ids)).order_by(Medication.id.desc()):
+            medications.setdefault(medication.user_id, []).append(medication)
+        
+        appointments = {}
+        for appointment in Appointment.query.filter(
+            Appointment.user_id.in_(user_ids), Appointment.status == 'Scheduled'
+        ).order_by(Appointment.date_time):
+            appointments.setdefault(appointment.user_id, []).append(appointment)
+        
+        return {
+            user.id: build_insight_prompt(user, medications.get(user.id, [])[:5], appointments.get(user.id, [])[:3])
+            for user in users
+        }
+    
+    def _generate(self, prompt):
+        self._rate_limiter.acquire()
+        return generate_insight_text(prompt)
+    
+    def _save(self, user_id, plan, content):
+        delivery_date, deliver_at, next_insight_at = plan
+        insight = HealthInsight(
+            user_id=user_id,
+            insight_type='daily',
+            content=content,
+            deliver_at=deliver_at,
+            is_delivered=False
+        )
+        db.session.add(insight)
+        db.session.flush()
+        db.session.add(InsightRun(user_id=user_id, run_date=delivery_date, insight_id=insight.id))
+        self._reschedule(user_id, next_insight_at)
+        
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # Another worker already stored this user's insight for the day
+            db.session.rollback()
+            self._reschedule(user_id, next_insight_at)
+            db.session.commit()
+            return None
+        
+        return insight
+    
+    @staticmethod
+    def _claim(user_id, previous, next_insight_at):
+        """Move next_insight_at on, unless another scheduler process changed it since it was read"""
+        unchanged = User.next_insight_at == previous if previous else User.next_insight_at == None
+        return User.query.filter(User.id == user_id, unchanged).update(
+            {User.next_insight_at: next_insight_at}, synchronize_session=False
+        ) == 1
+    
+    @staticmethod
+    def _reschedule(user_id, next_insight_at):
+        User.query.filter_by(id=user_id).update({User.next_insight_at: next_insight_at}, synchronize_session=False)
+    
+    def _run(self):
+        current_time = datetime.utcnow()
+        with self._lock:
+            self._progress = {
+                'state': 'running',
+                'started_at': current_time.isoformat(),
+                'finished_at': None,
+                'processed': 0,
+                'succeeded': 0,
+                'failed': 0,
+                'skipped': 0,
+                'scheduled': 0
+            }
+        
+        with app.app_context():
+            try:
+                with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='insight') as executor:
+                    last_id = 0
+                    while True:
+                        users = self._due_users(current_time, last_id)
+                        if not users:
+                            break
+                        last_id = users[-1].id
+                        
+                        plans = self._plan(users, current_time)
+                        prompts = self._build_prompts([user for user in users if user.id in plans])
+                        db.session.commit()
+                        
+                        futures = {executor.submit(self._generate, prompt): user_id for user_id, prompt in prompts.items()}
+                        
+                        for future in as_completed(futures):
+                            user_id = futures[future]
+                            try:
+                                content = future.result()
+                            except Exception as e:
+                                # The claim left next_insight_at at the retry time, so a later pass retries it
+                                print(f"Error generating health insight: {e}")
+                                self._count(processed=1, failed=1)
+                                continue
+                            
+                            insight = self._save(user_id, plans[user_id], content)
+                            if insight:
+                                reminder_scheduler.schedule(plans[user_id][1])
+                                self._count(processed=1, succeeded=1)
+                            else:
+                                self._count(processed=1, skipped=1)
+                        
+                        db.session.expunge_all()
+                
+                self._finish('finished')
+            except Exception as e:
+                print(f"Error in health insight job: {e}")
+                db.session.rollback()
+                self._finish('failed', error=str(e))
+
+insight_job = InsightJobRunner(INSIGHT_WORKERS, INSIGHT_RATE_PER_SECOND, INSIGHT_CHUNK_SIZE)
+
+class ChatJobQueue:
+    """Runs chat generations on a bounded thread pool and pushes results over Socket.IO.
+    
+    Admission is capped globally (max_pending) and per user (max_per_user); when
+    either limit is hit submit() returns None and the route answers 429. Text is
+    streamed to the user's room as chat_chunk events while generating; the final
+    result is emitted as chat_response and kept briefly for polling clients.
+    """
+    
+    def __init__(self, max_workers, max_pending, max_per_user, max_results=1000):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.max_per_user = max_per_user
+        self.max_results = max_results
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='chat')
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._per_user = {}
+        self._results = OrderedDict()  # job_id -> (user_id, result)
+        self._avg_seconds = 2.0  # Moving average of job duration, used for Retry-After
+        self.completed = 0
+        self.rejected = 0
+    
+    def submit(self, user_id, message, interaction_type='chat'):
+        """Queue a chat job and return its id, or None when the queue is saturated"""
+        with self._lock:
+            if self._pending >= self.max_pending or self._per_user.get(user_id, 0) >= self.max_per_user:
+                self.rejected += 1
+                return None
+            
+            self._pending += 1
+            self._per_user[user_id] = self._per_user.get(user_id, 0) + 1
+            
+            job_id = secrets.token_hex(8)
+            self._store_result(job_id, user_id, {'job_id': job_id, 'status': 'queued'})
+        
+        self._executor.submit(self._run, job_id, user_id, message, interaction_type)
+        return job_id
+    
+    def retry_after(self):
+        """Estimate in seconds until a slot frees up"""
+        with self._lock:
+            waves = max(1, self._pending - self.max_workers + 1) / self.max_workers
+            return max(1, math.ceil(self._avg_seconds * waves))
+    
+    def get_result(self, job_id, user_id):
+        """Return the status/result of a job owned by user_id, or None"""
+        with self._lock:
+            entry = self._results.get(job_id)
+        if not entry or entry[0] != user_id:
+            return None
+        return entry[1]
+    
+    def stats(self):
+        with self._lock:
+            return {
+                'pending': self._pending,
+                'max_pending': self.max_pending,
+                'workers': self.max_workers,
+                'completed': self.completed,
+                'rejected': self.rejected,
+                'avg_seconds': round(self._avg_seconds, 3)
+            }
+    
+    def _store_result(self, job_id, user_id, result):
+        # Caller holds the lock
+        self._results[job_id] = (user_id, result)
+        self._results.move_to_end(job_id)
+        while len(self._results) > self.max_results:
+            self._results.popitem(last=False)
+    
+    def _run(self, job_id, user_id, message, interaction_type):
+        started = time.monotonic()
+        try:
+            with app.app_context():
+                # Stream text to the browser while the model is still generating
+                usage = {}
+                response_text = generate_ai_response(
+                    message, user_id,
+                    on_chunk=lambda text: socketio.emit('chat_chunk', {'job_id': job_id, 'text': text}, to=user_room(user_id)),
+                    usage=usage,
+                    interaction_type=interaction_type
+                )
+                result = {'job_id': job_id, 'status': 'done', 'response': response_text, 'prompt_tokens': usage.get('prompt_tokens')}
+                
+                if interaction_type == 'voice':
+                    # Convert response to speech
+                    language_code = prompt_context_cache.get(user_id)['language']
+                    audio_key = text_to_speech(response_text, language_code)
+                    result['audio_url'] = f'/ai/audio/{audio_key}' if audio_key else None
+        except Exception as e:
+            print(f"Error running chat job: {e}")
+            result = {
+                'job_id': job_id,
+                'status': 'error',
+                'response': "I'm sorry, I encountered an error processing your request. Please try again later."
+            }
+        finally:
+            with self._lock:
+                self._pending -= 1
+                self._per_user[user_id] -= 1
+                if not self._per_user[user_id]:
+                    del self._per_user[user_id]
+                self._avg_seconds = 0.8 * self._avg_seconds + 0.2 * (time.monotonic() - started)
+                self.completed += 1
+        
+        with self._lock:
+            self._store_result(job_id, user_id, result)
+        socketio.emit('chat_response', result, to=user_room(user_id))
+
+chat_jobs = ChatJobQueue(CHAT_MAX_WORKERS, CHAT_MAX_PENDING, CHAT_MAX_PER_USER)
+
+def submit_chat_job(user_id, message, interaction_type):
+    """Queue a chat job and build the 202 response, or a 429 with Retry-After when saturated"""
+    job_id = chat_jobs.submit(user_id, message, interaction_type)
+    
+    if job_id is None:
+        retry_after = chat_jobs.retry_after()
+        response = jsonify({
+            'error': 'The assistant is busy. Please try again shortly.',
+            'retry_after': retry_after
+        })
+        response.headers['Retry-After'] = str(retry_after)
+        return response, 429
+    
+    return jsonify({'job_id': job_id, 'status': 'queued'}), 202
+
+def reminder_load_option(relationship, time_column, default='all'):
+    """Return the eager-load option selected by ?reminders=upcoming|none|all&window=<hours>.
+    
+    Returns None for 'none'. Raises ValueError for invalid parameters.
+    """
+    mode = request.args.get('reminders', default)
+    if mode not in ('upcoming', 'none', 'all'):
+        raise ValueError('reminders must be one of: upcoming, none, all')
+    
+    if mode == 'none':
+        return None
+    if mode == 'all':
+        return selectinload(relationship)
+    
+    try:
+        window = float(request.args.get('window', 24))
+    except ValueError:
+        raise ValueError('window must be a number of hours')
+    
+    current_time = datetime.utcnow()
+    return selectinload(relationship.and_(
+        time_column >= current_time,
+        time_column <= current_time + timedelta(hours=window)
+    ))
+
+def medication_reminder_stats(user_id):
+    """Return {medication_id: {'total', 'acknowledged', 'missed'}} for a user's reminders in one query"""
+    rows = db.session.query(
+        MedicationReminder.medication_id,
+        db.func.count(MedicationReminder.id),
+        db.func.sum(db.case((MedicationReminder.status == 'Acknowledged', 1), else_=0)),
+        db.func.sum(db.case((db.and_(
+            MedicationReminder.status == 'Pending', MedicationReminder.scheduled_time < datetime.utcnow()
+        ), 1), else_=0))
+    ).join(Medication, MedicationReminder.medication_id == Medication.id).filter(
+        Medication.user_id == user_id
+    ).group_by(MedicationReminder.medication_id).all()
+    
+    return {
+        medication_id: {'total': total, 'acknowledged': acknowledged or 0, 'missed': missed or 0}
+        for medication_id, total, acknowledged, missed in rows
+    }
+
+def medication_to_dict(med, include_reminders=False, reminder_stats=None):
+    """Serialize a medication, optionally with its loaded reminders and adherence counts"""
+    med_dict = {
+        'id': med.id,
+        'name': med.name,
+        'dosage': med.dosage,
+        'frequency': med.frequency,
+        'time_of_day': med.time_of_day,
+        'start_date': med.start_date.isoformat(),
+        'end_date': med.end_date.isoformat() if med.end_date else None,
+        'status': med.status,
+        'notes': med.notes
+    }
+    if reminder_stats is not None:
+        med_dict['reminder_stats'] = reminder_stats.get(med.id, {'total': 0, 'acknowledged': 0, 'missed': 0})
+    if include_reminders:
+        med_dict['reminders'] = [
+            {
+                'id': r.id,
+                'scheduled_time': r.scheduled_time.isoformat(),
+                'is_sent': r.is_sent,
+                'is_acknowledged': r.is_acknowledged,
+                'status': r.status
+            } for r in med.reminders
+        ]
+    return med_dict
+
+def appointment_to_dict(appt, include_reminders=False):
+    """Serialize an appointment, optionally with its loaded reminders"""
+    appt_dict = {
+        'id': appt.id,
+        'doctor_name': appt.doctor_name,
+        'specialty': appt.specialty,
+        'location': appt.location,
+        'date_time': appt.date_time.isoformat(),
+        'purpose': appt.purpose,
+        'notes': appt.notes,
+        'status': appt.status
+    }
+    if include_reminders:
+        appt_dict['reminders'] = [
+            {
+                'id': r.id,
+                'reminder_time': r.reminder_time.isoformat(),
+                'is_sent': r.is_sent
+            } for r in appt.reminders
+        ]
+    return appt_dict
+
+def timer_to_dict(timer):
+    """Serialize a timer"""
+    return {
+        'id': timer.id,
+        'name': timer.name,
+        'duration': timer.duration,
+        'start_time': timer.start_time.isoformat() if timer.start_time else None,
+        'end_time': timer.end_time.isoformat() if timer.end_time else None,
+        'elapsed': timer.elapsed,
+        'status': timer.status,
+        'created_at': timer.created_at.isoformat()
+    }
+
+def timer_elapsed(timer, current_time):
+    """Seconds the timer has run so far, including the current run"""
+    elapsed = timer.elapsed or 0
+    if timer.status == 'Running' and timer.start_time:
+        elapsed += (current_time - timer.start_time).total_seconds()
+    return min(elapsed, timer.duration)
+
+def publish_timer(timer):
+    """Push a timer's new state to every open tab of its user"""
+    socketio.emit('timer_update', timer_to_dict(timer), to=user_room(timer.user_id))
+
+def insight_to_dict(insight):
+    """Serialize a health insight"""
+    return {
+        'id': insight.id,
+        'type': insight.insight_type,
+        'content': insight.content,
+        'generated_at': insight.generated_at.isoformat(),
+        'is_read': insight.is_read
+    }
+
+def profile_to_dict(user):
+    """Serialize a user's profile"""
+    return {
+        'username': user.username,
+        'email': user.email,
+        'height': user.height,
+        'weight': user.weight,
+        'blood_type': user.blood_type,
+        'allergies': user.allergies,
+        'medical_conditions': user.medical_conditions,
+        'emergency_contact': user.emergency_contact,
+        'preferred_language': user.preferred_language,
+        'timezone': user.timezone or 'UTC'
+    }
+
+def delivered_insights(user_id):
+    """Query the user's insights that have been delivered"""
+    # Precomputed insights stay hidden until the scheduler delivers them (and bumps the revision)
+    return HealthInsight.query.filter_by(user_id=user_id, is_delivered=True)
+
+# Stable list orders as (column, descending); each ends with the primary key so cursors are unique
+MEDICATION_ORDER = ((Medication.id, False),)
+APPOINTMENT_ORDER = ((Appointment.date_time, False), (Appointment.id, False))
+TIMER_ORDER = ((Timer.created_at, False), (Timer.id, False))
+INSIGHT_FEED_ORDER = ((HealthInsight.is_read, False), (HealthInsight.generated_at, True), (HealthInsight.id, True))  # Unread first, newest first
+
+MEDICATION_STATUSES = ('Taken', 'Pending', 'Missed')
+APPOINTMENT_STATUSES = ('Scheduled', 'Completed', 'Cancelled', 'Rescheduled')
+TIMER_STATUSES = ('Ready', 'Running', 'Paused', 'Completed')
+INSIGHT_STATUSES = {'unread': False, 'read': True}
+
+def encode_cursor(values):
+    """Encode the sort key of the last row of a page as an opaque ?after= cursor"""
+    payload = json.dumps([value.isoformat() if isinstance(value, datetime) else value for value in values])
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor, order):
+    """Decode an ?after= cursor into sort key values. Raises ValueError for malformed cursors."""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        if not isinstance(values, list) or len(values) != len(order):
+            raise ValueError
+        return [
+            datetime.fromisoformat(value) if isinstance(column.type, db.DateTime) else value
+            for (column, descending), value in zip(order, values)
+        ]
+    except (ValueError, TypeError):
+        raise ValueError('after must be a cursor returned in X-Next-Cursor')
+
+def keyset_page(query, order, limit, after=None):
+    """Return (rows, next_cursor) for one page of query in order, starting after a cursor.
+    
+    The page is selected with a WHERE on the sort key of the previous page's
+    last row instead of an OFFSET, so every page costs the same index range
+    scan and rows inserted meanwhile never shift or repeat entries.
+    """
+    if after is not None:
+        # Bound as literals: SQLAlchemy only allows = and != against bare True/False
+        values = [db.literal(value, column.type) for (column, _), value in zip(order, decode_cursor(after, order))]
+        query = query.filter(db.or_(*[
+            db.and_(
+                *[column == value for (column, _), value in zip(order[:i], values[:i])],
+                order[i][0] < values[i] if order[i][1] else order[i][0] > values[i]
+            ) for i in range(len(order))
+        ]))
+    
+    rows = query.order_by(*[column.desc() if descending else column for column, descending in order]).limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+    
+    rows = rows[:limit]
+    return rows, encode_cursor([getattr(rows[-1], column.key) for column, _ in order])
+
+def status_filter(column, allowed):
+    """Return the filters selected by ?status=A,B on column; allowed is a tuple or a {name: value} dict.
+    
+    Raises ValueError for unknown statuses.
+    """
+    values = allowed if isinstance(allowed, dict) else {status: status for status in allowed}
+    statuses = [status.strip() for status in request.args.get('status', '').split(',') if status.strip()]
+    
+    unknown = [status for status in statuses if status not in values]
+    if unknown:
+        raise ValueError(f"status must be one or more of: {', '.join(values)}")
+    
+    return [column.in_([values[status] for status in statuses])] if statuses else []
+
+def list_limit(default_limit):
+    """Return ?limit=, between 1 and LIST_MAX_LIMIT. Raises ValueError for invalid values."""
+    try:
+        limit = int(request.args.get('limit', default_limit))
+    except ValueError:
+        raise ValueError('limit must be a number')
+    if not 1 <= limit <= LIST_MAX_LIMIT:
+        raise ValueError(f'limit must be between 1 and {LIST_MAX_LIMIT}')
+    return limit
+
+# Newest first
+CONVERSATION_ORDER = ((Conversation.timestamp, True), (Conversation.id, True))
+EXPORT_BATCH = 1000  # Rows fetched from the server-side cursor at a time
+
+def conversation_to_dict(conversation):
+    """Serialize a conversation turn"""
+    return {
+        'id': conversation.id,
+        'message': conversation.message,
+        'response': conversation.response,
+        'timestamp': conversation.timestamp.isoformat(),
+        'interaction_type': conversation.interaction_type
+    }
+
+def conversation_search_filter(text):
+    """SQL condition matching conversations whose message or response contain every word of text.
+    
+    Uses the FTS5 index on SQLite and the search_vector GIN index on Postgres
+    (both created by migrations); other databases fall back to LIKE scans.
+    Returns None when text has no words.
+    """
+    words = re.findall(r'\w+', text)
+    if not words:
+        return None
+    
+    dialect = db.engine.dialect.name
+    if dialect == 'sqlite':
+        # Each word quoted, so user input is never parsed as FTS5 query syntax
+        return db.text(
+            'conversation.id IN (SELECT rowid FROM conversation_fts WHERE conversation_fts MATCH :fts_query)'
+        ).bindparams(fts_query=' '.join(f'"{word}"' for word in words))
+    if dialect == 'postgresql':
+        return db.text(
+            "conversation.search_vector @@ plainto_tsquery('english', :ts_query)"
+        ).bindparams(ts_query=' '.join(words))
+    
+    return db.and_(*[
+        db.or_(Conversation.message.ilike(f'%{word}%'), Conversation.response.ilike(f'%{word}%'))
+        for word in words
+    ])
+
+def conversation_query(user_id):
+    """Query the user's conversations, narrowed by ?q= and ?type=chat|voice. Raises ValueError for an unknown type."""
+    query = Conversation.query.filter_by(user_id=user_id)
+    
+    search = conversation_search_filter(request.args.get('q', ''))
+    if search is not None:
+        query = query.filter(search)
+    
+    interaction_type = request.args.get('type')
+    if interaction_type is not None:
+        if interaction_type not in ('chat', 'voice'):
+            raise ValueError('type must be chat or voice')
+        query = query.filter(Conversation.interaction_type == interaction_type)
+    
+    return query
+
+CONVERSATION_EXPORT_COLUMNS = (Conversation.id, Conversation.timestamp, Conversation.interaction_type, Conversation.message, Conversation.response)
+MEDICATION_EXPORT_COLUMNS = (
+    Medication.id, Medication.name, Medication.dosage, Medication.frequency, Medication.time_of_day,
+    Medication.start_date, Medication.end_date, Medication.status, Medication.notes
+)
+APPOINTMENT_EXPORT_COLUMNS = (
+    Appointment.id, Appointment.doctor_name, Appointment.specialty, Appointment.location,
+    Appointment.date_time, Appointment.purpose, Appointment.notes, Appointment.status
+)
+
+def export_rows(query, columns, order, export_format):
+    """Yield an export chunk by chunk as NDJSON or CSV.
+    
+    Plain column tuples are streamed from a server-side cursor in batches of
+    EXPORT_BATCH, so memory use stays flat however many rows there are.
+    """
+    names = [column.key for column in columns]
+    rows = query.with_entities(*columns).order_by(*order).yield_per(EXPORT_BATCH)
+    
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if export_format == 'csv':
+        writer.writerow(names)
+    
+    for count, row in enumerate(rows, 1):
+        values = [value.isoformat() if isinstance(value, datetime) else value for value in row]
+        if export_format == 'csv':
+            writer.writerow(values)
+        else:
+            buffer.write(json.dumps(dict(zip(names, values))) + '\n')
+        
+        if count % 100 == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    
+    yield buffer.getvalue()
+
+def export_response(query, columns, order, filename):
+    """Stream query as the download selected by ?format=ndjson|csv, or a 400 for another format"""
+    export_format = request.args.get('format', 'ndjson')
+    if export_format not in ('ndjson', 'csv'):
+        return jsonify({'error': 'format must be ndjson or csv'}), 400
+    
+    mimetype = 'text/csv' if export_format == 'csv' else 'application/x-ndjson'
+    return Response(
+        stream_with_context(export_rows(query, columns, order, export_format)),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename={filename}.{export_format}'}
+    )
+
+def user_revision(user_id):
+    """Return the current revision of a user's lists"""
+    return db.session.query(User.revision).filter_by(id=user_id).scalar()
+
+def versioned_list_response(user_id, model, query, serialize, order, filters=(), default_limit=LIST_DEFAULT_LIMIT, conditional=True):
+    """Answer a list GET with keyset pages, ETag/If-None-Match and ?since=<revision> deltas.
+    
+    query selects the user's rows of model; serialize turns a list of rows into
+    a list of dicts; filters are the ?status= conditions. A full response is one
+    page in order (?limit=, ?after=<cursor>) as a plain list, with the cursor of
+    the next page in X-Next-Cursor and the revision in the ETag and X-Revision
+    headers. With ?since=<revision> the body is {'revision', 'changed',
+    'deleted'}: the rows stamped after that revision, unpaged, and the ids that
+    were deleted or no longer match the filters. Pass conditional=False for
+    responses that change with the clock (e.g. ?reminders=upcoming) so they are
+    never answered with 304.
+    """
+    # Read the revision first: rows committed meanwhile are sent again next time, never skipped
+    revision = user_revision(user_id)
+    
+    since = request.args.get('since')
+    if since is not None:
+        try:
+            since = int(since)
+        except ValueError:
+            return jsonify({'error': 'since must be a revision number'}), 400
+        
+        changed, deleted = [], []
+        if since < revision:
+            changed_query = query.filter(model.revision > since)
+            if filters:
+                rows = changed_query.add_columns(db.case((db.and_(*filters), True), else_=False)).all()
+                changed = [row for row, matches in rows if matches]
+                deleted = [row.id for row, matches in rows if not matches]
+            else:
+                changed = changed_query.all()
+            deleted += [row_id for (row_id,) in db.session.query(Tombstone.row_id).filter(
+                Tombstone.user_id == user_id,
+                Tombstone.table_name == model.__tablename__,
+                Tombstone.revision > since
+            ).all()]
+        
+        return jsonify({'revision': revision, 'changed': serialize(changed), 'deleted': deleted})
+    
+    try:
+        limit = list_limit(default_limit)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    # The query string selects the representation (e.g. ?reminders=, ?after=), so it is part of the tag
+    etag = hashlib.sha256(f'{user_id}:{revision}:{request.full_path}'.encode('utf-8')).hexdigest()[:32]
+    if conditional and request.if_none_match.contains(etag):
+        response = app.response_class(status=304)
+    else:
+        try:
+            rows, next_cursor = keyset_page(query.filter(*filters), order, limit, request.args.get('after'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        response = jsonify(serialize(rows))
+        if next_cursor:
+            response.headers['X-Next-Cursor'] = next_cursor
+    
+    response.headers['X-Revision'] = str(revision)
+    if conditional:
+        response.set_etag(etag)
+        response.cache_control.no_cache = True  # Browsers revalidate with If-None-Match on every fetch
+    return response
+
+# One alternation per token kind; the outer group names tell the parser what matched
+DATE_TOKEN_PATTERN = re.compile(rf"""
+    \b(?:
+        (?P<iso>(?P<iso_year>\d{{4}})-(?P<iso_month>\d{{2}})-(?P<iso_day>\d{{2}})(?:[t\s](?P<iso_hour>\d{{2}}):(?P<iso_minute>\d{{2}}))?)
+      | (?P<offset>in\s+(?P<offset_count>\d+|{_alternation(NUMBER_WORDS)})\s+(?P<offset_unit>minute|min|hour|hr|day|week)s?)
+      | (?P<daily>daily|everyday|(?:every|each)\s+day)
+      | (?P<weekly>weekly)
+      | (?P<every>every|each)
+      | (?P<relative_day>day\s+after\s+tomorrow|today|tonight|tomorrow)
+      | (?P<weekday>(?:(?P<weekday_modifier>next|this|coming)\s+)?(?P<weekday_name>{_WEEKDAY})(?P<weekday_plural>s)?)
+      | (?P<month_date>(?P<month_name>{_MONTH})\.?\s+(?P<month_day>\d{{1,2}})(?:st|nd|rd|th)?(?:,?\s+(?P<month_year>\d{{4}}))?)
+      | (?P<date_month>(?P<date_day>\d{{1,2}})(?:st|nd|rd|th)?\s+(?:of\s+)?(?P<date_month_name>{_MONTH})(?:,?\s+(?P<date_year>\d{{4}}))?)
+      | (?P<clock>(?P<clock_at>at\s+)?(?P<hour>\d{{1,2}})(?::(?P<minute>\d{{2}}))?\s*(?:(?P<meridiem>[ap])\.?m)?)
+      | (?P<named_time>{_alternation(NAMED_TIMES)})
+    )\b
+""", re.VERBOSE)
+
+def format_clock_time(hour, minute):
+    """Format a time as it is stored in Medication.time_of_day ("8:00 AM")"""
+    return f"{hour % 12 or 12}:{minute:02d} {'AM' if hour < 12 else 'PM'}"
+
+def parse_natural_language_date(text, tz=pytz.utc, now=None):
+    """Parse natural language date/time expressions in a single pass.
+    
+    Understands relative days ("tomorrow", "in 3 days", "next Monday"), dates
+    ("May 10", "2025-05-10"), clock times ("2:30pm", "at 9", "noon") and
+    recurrence ("daily", "every Monday and Thursday", "every morning"), in any
+    combination such as "tomorrow at 2:30pm" or "every Monday at 9". Times are
+    read in tz; a time without a date means its next occurrence.
+    
+    Returns None when nothing was recognized, otherwise a dict with 'when'
+    (the first occurrence, naive UTC), 'recurrence' (None, 'daily' or 'weekly'),
+    'weekdays', 'times', and 'frequency'/'time_of_day' in the form Medication uses.
+    """
+    current_time = now or datetime.utcnow()
+    local_now = utc_to_local(current_time, tz)
+    today = local_now.date()
+    
+    date = None
+    day_offset = None
+    delta = None
+    weekdays = []
+    next_week = False
+    recurrence = None
+    every = False
+    times = []
+    default_time = None
+    matched = False
+    
+    for match in DATE_TOKEN_PATTERN.finditer(text.lower()):
+        kind = match.lastgroup
+        
+        if kind == 'clock':
+            hour = int(match.group('hour'))
+            minute = int(match.group('minute') or 0)
+            meridiem = match.group('meridiem')
+            # A bare number is only a time after "at" or with minutes or am/pm
+            if not (match.group('clock_at') or match.group('minute') or meridiem):
+                continue
+            if meridiem:
+                if not 1 <= hour <= 12:
+                    continue
+                hour = hour % 12 + (12 if meridiem == 'p' else 0)
+            if hour > 23 or minute > 59:
+                continue
+            times.append((hour, minute))
+        elif kind == 'named_time':
+            default_time = NAMED_TIMES[match.group('named_time')]
+            if every:
+                recurrence = recurrence or 'daily'
+        elif kind == 'relative_day':
+            word = match.group('relative_day')
+            if word == 'tonight':
+                day_offset, default_time = 0, NAMED_TIMES['night']
+            else:
+                day_offset = {'today': 0, 'tomorrow': 1}.get(word, 2)
+        elif kind == 'offset':
+            count = match.group('offset_count')
+            count = int(count) if count.isdigit() else NUMBER_WORDS[count]
+            unit = match.group('offset_unit')
+            if unit in ('minute', 'min'):
+                delta = timedelta(minutes=count)
+            elif unit in ('hour', 'hr'):
+                delta = timedelta(hours=count)
+            else:
+                day_offset = count * (7 if unit == 'week' else 1)
+        elif kind == 'weekday':
+            weekdays.append(WEEKDAY_ALIASES[match.group('weekday_name')])
+            next_week = next_week or match.group('weekday_modifier') == 'next'
+            if every or match.group('weekday_plural'):
+                recurrence = 'weekly'
+        elif kind in ('iso', 'month_date', 'date_month'):
+            try:
+                if kind == 'iso':
+                    date = datetime(int(match.group('iso_year')), int(match.group('iso_month')), int(match.group('iso_day'))).date()
+                    if match.group('iso_hour'):
+                        times.append((int(match.group('iso_hour')), int(match.group('iso_minute'))))
+                else:
+                    month = MONTH_ALIASES[match.group('month_name') or match.group('date_month_name')]
+                    day = int(match.group('month_day') or match.group('date_day'))
+                    year = match.group('month_year') or match.group('date_year')
+                    date = datetime(int(year) if year else today.year, month, day).date()
+                    if not year and date < today:
+                        date = date.replace(year=today.year + 1)
+            except ValueError:
+                continue
+        elif kind == 'daily':
+            recurrence = 'daily'
+        elif kind == 'weekly':
+            recurrence = 'weekly'
+        elif kind == 'every':
+            every = True
+            continue
+        
+        matched = True
+        every = False
+    
+    if not matched:
+        return None
+    
+    times = sorted(set(times)) or ([default_time] if default_time else [])
+    weekdays = sorted(set(weekdays))
+    
+    if delta is not None and recurrence is None:
+        when = local_now + delta
+    else:
+        if date is not None:
+            start = date
+        elif day_offset is not None:
+            start = today + timedelta(days=day_offset)
+        else:
+            start = today
+        explicit_day = date is not None or day_offset is not None
+        
+        if recurrence == 'daily' and weekdays:
+            recurrence = 'weekly'
+        elif recurrence == 'weekly' and not weekdays:
+            weekdays = [start.weekday()]
+        elif recurrence is None and weekdays:
+            # "Monday" is the coming Monday (today if the time is still ahead), "next Monday" is never today
+            days_ahead = (weekdays[0] - start.weekday()) % 7
+            if days_ahead == 0 and (next_week or (times and datetime.combine(start, datetime.min.time().replace(hour=times[-1][0], minute=times[-1][1])) <= local_now)):
+                days_ahead = 7
+            start += timedelta(days=days_ahead)
+            explicit_day = not times
+            weekdays = []
+        
+        # An explicit one-off day is taken as given; otherwise the first time that is still ahead
+        clock_times = [datetime.min.time().replace(hour=hour, minute=minute) for hour, minute in times] or [local_now.time()]
+        when = None
+        for days in range(8):
+            day = start + timedelta(days=days)
+            if recurrence == 'weekly' and day.weekday() not in weekdays:
+                continue
+            when = next((
+                datetime.combine(day, clock_time) for clock_time in clock_times
+                if (explicit_day and not recurrence) or datetime.combine(day, clock_time) > local_now
+            ), None)
+            if when is not None:
+                break
+    
+    formatted_times = [format_clock_time(hour, minute) for hour, minute in times]
+    frequency = recurrence
+    if recurrence == 'weekly':
+        frequency = 'weekly on ' + ', '.join(WEEKDAY_NAMES[weekday] for weekday in weekdays)
+    
+    return {
+        'when': local_to_utc(when, tz),
+        'recurrence': recurrence,
+        'weekdays': [WEEKDAY_NAMES[weekday] for weekday in weekdays],
+        'times': formatted_times,
+        'frequency': frequency,
+        'time_of_day': ', '.join(formatted_times) or None
+    }
+
+def apply_medication_schedule(data, user_id):
+    """Fill in frequency and time_of_day from a schedule like "every Monday at 9am".
+    
+    Returns the request data unchanged when it has no schedule. Raises
+    ValueError when the schedule does not repeat or names no time.
+    """
+    if not data.get('schedule'):
+        return data
+    
+    user = db.session.get(User, user_id)
+    schedule = parse_natural_language_date(data['schedule'], user_timezone(user))
+    if not schedule or not schedule['recurrence'] or not schedule['time_of_day']:
+        raise ValueError('schedule must repeat and name a time, e.g. "every day at 8am and 8pm"')
+    
+    return dict(data, frequency=schedule['frequency'], time_of_day=schedule['time_of_day'])
+
+def parse_request_datetime(value, tz):
+    """Parse an ISO 8601 timestamp or an expression like "tomorrow at 2:30pm" (read in tz) to naive UTC"""
+    if isinstance(value, str):
+        try:
+            return parse_iso_datetime(value)
+        except ValueError:
+            parsed = parse_natural_language_date(value, tz)
+            if parsed:
+                return parsed['when']
+    return None
+
+def medication_fields(data, user_id):
+    """Validate a medication from a request and return its column values. Raises ValueError."""
+    if not isinstance(data, dict):
+        raise ValueError('medication must be a JSON object')
+    
+    data = apply_medication_schedule(data, user_id)
+    missing = [field for field in ('name', 'dosage', 'frequency', 'time_of_day') if not data.get(field)]
+    if missing:
+        raise ValueError(f"missing {', '.join(missing)}")
+    
+    try:
+        start_date = parse_iso_datetime(data['start_date']) if data.get('start_date') else datetime.utcnow()
+        end_date = parse_iso_datetime(data['end_date']) if data.get('end_date') else None
+    except (TypeError, ValueError):
+        raise ValueError('start_date and end_date must be ISO 8601')
+    
+    return {
+        'user_id': user_id,
+        'name': data['name'],
+        'dosage': data['dosage'],
+        'frequency': data['frequency'],
+        'time_of_day': data['time_of_day'],
+        'start_date': start_date,
+        'end_date': end_date,
+        'notes': data.get('notes', '')
+    }
+
+def appointment_fields(data, user_id):
+    """Validate an appointment from a request and return its column values. Raises ValueError."""
+    if not isinstance(data, dict):
+        raise ValueError('appointment must be a JSON object')
+    
+    missing = [field for field in ('doctor_name', 'location', 'date_time') if not data.get(field)]
+    if missing:
+        raise ValueError(f"missing {', '.join(missing)}")
+    
+    # date_time is ISO 8601 or an expression like "next Monday at 2:30pm" in the user's timezone
+    date_time = parse_request_datetime(data['date_time'], user_timezone(db.session.get(User, user_id)))
+    if date_time is None:
+        raise ValueError('date_time must be ISO 8601 or a date like "tomorrow at 2:30pm"')
+    
+    return {
+        'user_id': user_id,
+        'doctor_name': data['doctor_name'],
+        'specialty': data.get('specialty', ''),
+        'location': data['location'],
+        'date_time': date_time,
+        'purpose': data.get('purpose', ''),
+        'notes': data.get('notes', '')
+    }
+
+def appointment_reminder_times(date_time):
+    """Reminders go out 1 day and 1 hour before an appointment"""
+    return [date_time - timedelta(days=1), date_time - timedelta(hours=1)]
+
+BULK_MAX_ITEMS = int(os.environ.get('BULK_MAX_ITEMS', 10000))
+NDJSON_MIMETYPES = ('application/x-ndjson', 'application/ndjson', 'application/jsonl', 'application/x-jsonlines')
+
+def stream_lines(stream, chunk_size=64 * 1024):
+    """Yield the lines of a binary stream read in large chunks (its own readline goes byte by byte)"""
+    pending = b''
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        lines = (pending + chunk).split(b'\n')
+        pending = lines.pop()
+        yield from lines
+    if pending:
+        yield pending
+
+def bulk_request_items():
+    """Yield the items of a bulk request: a JSON array, or NDJSON read line by line from the body.
+    
+    A line that is not valid JSON is yielded as None so it gets its own error.
+    Raises ValueError when a JSON body is not an array.
+    """
+    if request.mimetype in NDJSON_MIMETYPES:
+        for line in stream_lines(request.stream):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                yield None
+        return
+    
+    items = request.get_json(silent=True)
+    if not isinstance(items, list):
+        raise ValueError('body must be a JSON array or NDJSON')
+    yield from items
+
+def bulk_import(validate, insert):
+    """Validate every item of a bulk request, insert the valid ones in one transaction and report per item.
+    
+    validate(item, user_id) returns the column values of an item or raises ValueError;
+    insert(rows) inserts the validated rows and returns their ids in order.
+    """
+    user_id = session['user_id']
+    results = []
+    rows = []
+    
+    try:
+        for index, item in enumerate(bulk_request_items()):
+            if index >= BULK_MAX_ITEMS:
+                return jsonify({'error': f'A bulk request takes at most {BULK_MAX_ITEMS} items'}), 413
+            try:
+                rows.append(validate(item, user_id))
+                results.append({'index': index, 'status': 'created'})
+            except ValueError as e:
+                results.append({'index': index, 'status': 'error', 'error': str(e)})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    if rows:
+        # Bulk inserts bypass the flush hook, so the rows are stamped with the new revision here
+        revision = bump_user_revisions([user_id])[user_id]
+        for row in rows:
+            row['revision'] = revision
+        
+        try:
+            ids = iter(insert(rows))
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error in bulk import: {e}")
+            return jsonify({'error': 'The import failed and nothing was saved. Please try again.'}), 500
+        
+        for result in results:
+            if result['status'] == 'created':
+                result['id'] = next(ids)
+    
+    return jsonify({
+        'created': len(rows),
+        'failed': len(results) - len(rows),
+        'results': results
+    })
+
+def insert_returning_ids(model, rows):
+    """INSERT rows in one executemany and return their primary keys in the order given"""
+    return db.session.scalars(
+        db.insert(model).returning(model.id, sort_by_parameter_order=True), rows
+    ).all()
+
+def insert_medications(rows):
+    """Insert medications and materialize their reminders for the next horizon"""
+    until = datetime.utcnow() + REMINDER_HORIZON
+    tz = user_timezone(db.session.get(User, rows[0]['user_id']))
+    for row in rows:
+        row['materialized_until'] = until
+    
+    ids = insert_returning_ids(Medication, rows)
+    
+    reminder_rows = [
+        {'medication_id': medication_id, 'scheduled_time': reminder_time}
+        for medication_id, row in zip(ids, rows)
+        for reminder_time in medication_occurrences(Medication(**row), datetime.utcnow(), until, tz)
+    ]
+    if reminder_rows:
+        db.session.execute(db.insert(MedicationReminder), reminder_rows)
+        reminder_scheduler.schedule(min(row['scheduled_time'] for row in reminder_rows))
+    return ids
+
+def insert_appointments(rows):
+    """Insert appointments with their two reminders each"""
+    ids = insert_returning_ids(Appointment, rows)
+    
+    reminder_rows = [
+        {'appointment_id': appointment_id, 'reminder_time': reminder_time}
+        for appointment_id, row in zip(ids, rows)
+        for reminder_time in appointment_reminder_times(row['date_time'])
+    ]
+    db.session.execute(db.insert(AppointmentReminder), reminder_rows)
+    reminder_scheduler.schedule(min(row['reminder_time'] for row in reminder_rows))
+    return ids
+
+# Write operations shared by the routes and /sync. They flush but leave the
+# commit to the caller, and return the due times to hand to the scheduler.
+def schedule_due_times(due_times):
+    """Wake the scheduler for the earliest of due_times; it reloads the rest from the database"""
+    due_times = [due_time for due_time in due_times if due_time is not None]
+    if due_times:
+        reminder_scheduler.schedule(min(due_times))
+
+def update_profile(user, data):
+    """Apply the profile fields in data. Raises ValueError for an unknown timezone."""
+    timezone_changed = 'timezone' in data and data['timezone'] != user.timezone
+    if timezone_changed and (not isinstance(data['timezone'], str) or data['timezone'] not in pytz.all_timezones_set):
+        raise ValueError('Unknown timezone')
+    
+    user.height = data.get('height', user.height)
+    user.weight = data.get('weight', user.weight)
+    user.blood_type = data.get('blood_type', user.blood_type)
+    user.allergies = data.get('allergies', user.allergies)
+    user.medical_conditions = data.get('medical_conditions', user.medical_conditions)
+    user.emergency_contact = data.get('emergency_contact', user.emergency_contact)
+    user.preferred_language = data.get('preferred_language', user.preferred_language)
+    
+    # Dose times and the insight delivery hour are local, so move them to the new timezone
+    due_times = []
+    if timezone_changed:
+        user.timezone = data['timezone']
+        schedule_next_insight(user, datetime.utcnow())
+        due_times.append(user.next_insight_at)
+        for medication in user.medications:
+            due_times.extend(rematerialize_medication_reminders(medication))
+    return due_times
+
+def create_medication(fields):
+    """Add a medication with the reminders of the next horizon"""
+    medication = Medication(**fields)
+    db.session.add(medication)
+    db.session.flush()
+    
+    # Reminders are materialized for the next horizon only; the scheduler rolls them forward
+    return medication, materialize_medication_reminders(medication, datetime.utcnow() + REMINDER_HORIZON)
+
+def update_medication_fields(medication, data):
+    """Apply a medication edit. Raises ValueError for an invalid schedule or date."""
+    data = apply_medication_schedule(data, medication.user_id)
+    
+    try:
+        start_date = parse_iso_datetime(data['start_date']) if 'start_date' in data else medication.start_date
+        end_date = parse_iso_datetime(data['end_date']) if 'end_date' in data else medication.end_date
+    except (TypeError, ValueError):
+        raise ValueError('start_date and end_date must be ISO 8601')
+    
+    medication.name = data.get('name', medication.name)
+    medication.dosage = data.get('dosage', medication.dosage)
+    medication.frequency = data.get('frequency', medication.frequency)
+    medication.time_of_day = data.get('time_of_day', medication.time_of_day)
+    medication.start_date = start_date
+    medication.end_date = end_date
+    medication.status = data.get('status', medication.status)
+    medication.notes = data.get('notes', medication.notes)
+    
+    # Re-materialize the pending horizon if the schedule changed
+    if any(field in data for field in ('frequency', 'time_of_day', 'start_date', 'end_date')):
+        return rematerialize_medication_reminders(medication)
+    return []
+
+def delete_medication(medication):
+    """Delete a medication and its reminders"""
+    MedicationReminder.query.filter_by(medication_id=medication.id).delete()
+    db.session.delete(medication)
+
+def create_appointment(fields):
+    """Add an appointment with its reminders (1 day before, 1 hour before)"""
+    appointment = Appointment(**fields)
+    db.session.add(appointment)
+    db.session.flush()
+    
+    reminder_times = appointment_reminder_times(appointment.date_time)
+    db.session.add_all([
+        AppointmentReminder(appointment_id=appointment.id, reminder_time=reminder_time)
+        for reminder_time in reminder_times
+    ])
+    return appointment, reminder_times
+
+def delete_appointment(appointment):
+    """Delete an appointment and its reminders"""
+    AppointmentReminder.query.filter_by(appointment_id=appointment.id).delete()
+    db.session.delete(appointment)
+
+def create_timer(user_id, data):
+    """Add a ready timer. Raises ValueError unless data has a name and a positive duration in seconds."""
+    if not isinstance(data, dict) or not data.get('name'):
+        raise ValueError('missing name')
+    if not isinstance(data.get('duration'), int) or isinstance(data['duration'], bool) or data['duration'] <= 0:
+        raise ValueError('duration must be a positive number of seconds')
+    
+    timer = Timer(user_id=user_id, name=data['name'], duration=data['duration'])
+    db.session.add(timer)
+    db.session.flush()
+    return timer
+
+def run_timer(timer, current_time):
+    """Start a ready or completed timer, or resume a paused one. Raises ValueError if it is running."""
+    if timer.status == 'Running':
+        raise ValueError('Timer is already running')
+    
+    if timer.status != 'Paused':
+        timer.elapsed = 0
+    
+    timer.start_time = current_time
+    timer.end_time = current_time + timedelta(seconds=timer.duration - timer.elapsed)
+    timer.status = 'Running'
+    timer.claimed_by = None  # A restarted timer is dispatched again
+    timer.claimed_at = None
+
+def pause_timer_run(timer, current_time):
+    """Stop a running timer and keep the time it has run. Raises ValueError if it is not running."""
+    if timer.status != 'Running':
+        raise ValueError('Timer is not running')
+    
+    # The scheduler owns a timer once it is due; it is reported as completed instead
+    if timer.end_time <= current_time:
+        raise ValueError('Timer has already finished')
+    
+    timer.elapsed = timer_elapsed(timer, current_time)
+    timer.end_time = None
+    timer.status = 'Paused'
+    timer.claimed_by = None
+    timer.claimed_at = None
+
+def reset_timer_run(timer):
+    """Put a timer back to its full duration"""
+    timer.start_time = None
+    timer.end_time = None
+    timer.elapsed = 0
+    timer.status = 'Ready'
+    timer.claimed_by = None  # A claimed completion is dropped
+    timer.claimed_at = None
+
+SYNC_MAX_MUTATIONS = int(os.environ.get('SYNC_MAX_MUTATIONS', 500))
+SYNC_KEY_TTL = timedelta(days=int(os.environ.get('SYNC_KEY_TTL_DAYS', 30)))  # How long a replay is recognized
+
+class SyncBatch:
+    """Applies a batch of offline mutations from one client, in order, in one transaction.
+    
+    Each mutation is {"key", "op", "target"?, "data"?}. The key makes it
+    idempotent: keys already recorded in SyncMutation are answered with their
+    stored result instead of being applied again. A create's key also serves
+    as a temporary id, so later mutations (in this batch or a later one) can
+    target a row the client created offline. Scheduler wake-ups and timer
+    pushes are collected and only sent by finish() after the commit.
+    """
+    
+    OPS = {
+        'profile.update': 'update_profile',
+        'medication.create': 'create_medication',
+        'medication.update': 'update_medication',
+        'medication.delete': 'delete_medication',
+        'appointment.create': 'create_appointment',
+        'appointment.delete': 'delete_appointment',
+        'timer.create': 'create_timer',
+        'timer.start': 'start_timer',
+        'timer.pause': 'pause_timer',
+        'timer.reset': 'reset_timer',
+        'insight.read': 'read_insight'
+    }
+    
+    def __init__(self, user_id):
+        self.user_id = user_id
+        self.results = {}  # key -> result of mutations applied before or in this batch
+        self.due_times = []
+        self.timers = []
+    
+    def load_applied(self, keys):
+        for key, result in db.session.query(SyncMutation.key, SyncMutation.result).filter(
+            SyncMutation.user_id == self.user_id, SyncMutation.key.in_(keys)
+        ).all():
+            self.results[key] = json.loads(result)
+    
+    def apply(self, mutation):
+        """Apply one mutation and return its result. Raises ValueError if it cannot be applied."""
+        if not isinstance(mutation, dict) or not isinstance(mutation.get('key'), str) or not 0 < len(mutation['key']) <= 64:
+            raise ValueError('each mutation needs a key of at most 64 characters')
         
-        # Create health insight
-        insight = HealthInsight(
-            user_id=user_id,
-            insight_type='daily',
-            content=response.text
-        )
-        db.session.add(insight)
-        db.session.commit()
+        key = mutation['key']
+        if key in self.results:
+            return dict(self.results[key], duplicate=True)
         
-        # Send notification to user
-        notification = {
-            'type': 'health_insight',
-            'user_id': user_id,
-            'title': 'Daily Health Insight',
-            'message': response.text,
-            'insight_id': insight.id
-        }
+        handler = self.OPS.get(mutation.get('op'))
+        if handler is None:
+            raise ValueError(f"unknown op {mutation.get('op')!r}")
         
-        socketio.emit(f'notification_{user_id}', notification)
+        result = getattr(self, handler)(mutation)
+        self.results[key] = result
+        db.session.add(SyncMutation(user_id=self.user_id, key=key, result=json.dumps(result)))
+        return result
+    
+    def finish(self):
+        """Send the side effects of the committed batch"""
+        schedule_due_times(self.due_times)
+        for timer in self.timers:
+            publish_timer(timer)
+    
+    def row(self, model, mutation):
+        """Load the user's row that a mutation targets, by id or by the key of the create that made it"""
+        target = mutation.get('target')
+        if isinstance(target, str):
+            target = self.results.get(target, {}).get('id') if target in self.results else None
         
-        return response.text
-    except Exception as e:
-        print(f"Error generating health insight: {e}")
-        return None
-
-def parse_natural_language_date(text):
-    """Parse natural language date/time expressions"""
-    current_time = datetime.utcnow()
+        row = model.query.filter_by(id=target, user_id=self.user_id).first() if isinstance(target, int) else None
+        if row is None:
+            raise ValueError(f"{model.__name__.lower()} {mutation.get('target')} not found")
+        return row
     
-    # Match patterns like "tomorrow at 2pm", "in 3 days", "next Monday", etc.
-    if "tomorrow" in text.lower():
-        return current_time + timedelta(days=1)
-    elif "today" in text.lower():
-        return current_time
-    elif re.search(r"in (\d+) days?", text.lower()):
-        match = re.search(r"in (\d+) days?", text.lower())
-        days = int(match.group(1))
-        return current_time + timedelta(days=days)
-    elif re.search(r"in (\d+) hours?", text.lower()):
-        match = re.search(r"in (\d+) hours?", text.lower())
-        hours = int(match.group(1))
-        return current_time + timedelta(hours=hours)
-    elif re.search(r"(\d+)(am|pm)", text.lower()):
-        match = re.search(r"(\d+)(am|pm)", text.lower())
-        hour = int(match.group(1))
-        ampm = match.group(2)
-        
-        if ampm.lower() == "pm" and hour < 12:
-            hour += 12
-        
-        result = current_time.replace(hour=hour, minute=0, second=0, microsecond=0)
-        return result
+    def data(self, mutation):
+        data = mutation.get('data')
+        if not isinstance(data, dict):
+            raise ValueError('data must be a JSON object')
+        return data
+    
+    def update_profile(self, mutation):
+        self.due_times.extend(update_profile(db.session.get(User, self.user_id), self.data(mutation)))
+        return {}
+    
+    def create_medication(self, mutation):
+        medication, reminder_times = create_medication(medication_fields(self.data(mutation), self.user_id))
+        self.due_times.extend(reminder_times)
+        return {'id': medication.id}
+    
+    def update_medication(self, mutation):
+        medication = self.row(Medication, mutation)
+        self.due_times.extend(update_medication_fields(medication, self.data(mutation)))
+        return {'id': medication.id}
+    
+    def delete_medication(self, mutation):
+        medication = self.row(Medication, mutation)
+        delete_medication(medication)
+        return {'id': medication.id}
+    
+    def create_appointment(self, mutation):
+        appointment, reminder_times = create_appointment(appointment_fields(self.data(mutation), self.user_id))
+        self.due_times.extend(reminder_times)
+        return {'id': appointment.id}
+    
+    def delete_appointment(self, mutation):
+        appointment = self.row(Appointment, mutation)
+        delete_appointment(appointment)
+        return {'id': appointment.id}
+    
+    def create_timer(self, mutation):
+        timer = create_timer(self.user_id, self.data(mutation))
+        return {'id': timer.id}
+    
+    def start_timer(self, mutation):
+        timer = self.row(Timer, mutation)
+        run_timer(timer, datetime.utcnow())
+        self.due_times.append(timer.end_time)
+        self.timers.append(timer)
+        return {'id': timer.id}
+    
+    def pause_timer(self, mutation):
+        timer = self.row(Timer, mutation)
+        pause_timer_run(timer, datetime.utcnow())
+        self.timers.append(timer)
+        return {'id': timer.id}
+    
+    def reset_timer(self, mutation):
+        timer = self.row(Timer, mutation)
+        reset_timer_run(timer)
+        self.timers.append(timer)
+        return {'id': timer.id}
     
-    # Default to current time if no pattern matches
-    return current_time
+    def read_insight(self, mutation):
+        insight = self.row(HealthInsight, mutation)
+        insight.is_read = True
+        return {'id': insight.id}
 
 # Routes
 @app.route('/')
@@ -379,10 +3346,16 @@ def register():
         email=data['email']
     )
     user.set_password(data['password'])
+    if data.get('timezone') in pytz.all_timezones_set:
+        user.timezone = data['timezone']
     
     db.session.add(user)
+    db.session.flush()
+    schedule_next_insight(user, datetime.utcnow())
     db.session.commit()
     
+    reminder_scheduler.schedule(user.next_insight_at)
+    
     return jsonify({'message': 'User registered successfully', 'user_id': user.id})
 
 @app.route('/login', methods=['POST'])
@@ -417,31 +3390,18 @@ def profile():
     user = User.query.get(user_id)
     
     if request.method == 'GET':
-        return jsonify({
-            'username': user.username,
-            'email': user.email,
-            'height': user.height,
-            'weight': user.weight,
-            'blood_type': user.blood_type,
-            'allergies': user.allergies,
-            'medical_conditions': user.medical_conditions,
-            'emergency_contact': user.emergency_contact,
-            'preferred_language': user.preferred_language
-        })
+        return jsonify(profile_to_dict(user))
     
     elif request.method == 'POST':
-        data = request.json
-        
-        user.height = data.get('height', user.height)
-        user.weight = data.get('weight', user.weight)
-        user.blood_type = data.get('blood_type', user.blood_type)
-        user.allergies = data.get('allergies', user.allergies)
-        user.medical_conditions = data.get('medical_conditions', user.medical_conditions)
-        user.emergency_contact = data.get('emergency_contact', user.emergency_contact)
-        user.preferred_language = data.get('preferred_language', user.preferred_language)
+        try:
+            due_times = update_profile(user, request.json)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
         db.session.commit()
         
+        schedule_due_times(due_times)
+        
         return jsonify({'message': 'Profile updated successfully'})
 
 @app.route('/medications', methods=['GET', 'POST'])
@@ -452,96 +3412,67 @@ def medications():
     user_id = session['user_id']
     
     if request.method == 'GET':
-        user_medications = Medication.query.filter_by(user_id=user_id).all()
-        
-        result = []
-        for med in user_medications:
-            reminders = MedicationReminder.query.filter_by(medication_id=med.id).all()
-            med_dict = {
-                'id': med.id,
-                'name': med.name,
-                'dosage': med.dosage,
-                'frequency': med.frequency,
-                'time_of_day': med.time_of_day,
-                'start_date': med.start_date.isoformat(),
-                'end_date': med.end_date.isoformat() if med.end_date else None,
-                'status': med.status,
-                'notes': med.notes,
-                'reminders': [
-                    {
-                        'id': r.id,
-                        'scheduled_time': r.scheduled_time.isoformat(),
-                        'is_sent': r.is_sent,
-                        'is_acknowledged': r.is_acknowledged,
-                        'status': r.status
-                    } for r in reminders
-                ]
-            }
-            result.append(med_dict)
+        try:
+            reminder_option = reminder_load_option(Medication.reminders, MedicationReminder.scheduled_time)
+            filters = status_filter(Medication.status, MEDICATION_STATUSES)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        # Reminders are loaded for all medications in one extra query instead of one per medication
+        query = Medication.query.filter_by(user_id=user_id)
+        if reminder_option is not None:
+            query = query.options(reminder_option)
+        
+        def serialize(meds):
+            reminder_stats = medication_reminder_stats(user_id) if meds else {}
+            return [medication_to_dict(med, reminder_option is not None, reminder_stats) for med in meds]
         
-        return jsonify(result)
+        return versioned_list_response(
+            user_id, Medication, query, serialize, MEDICATION_ORDER, filters,
+            conditional=request.args.get('reminders') != 'upcoming'
+        )
     
     elif request.method == 'POST':
-        data = request.json
+        try:
+            fields = medication_fields(request.json, user_id)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
         # Create new medication
-        medication = Medication(
-            user_id=user_id,
-            name=data['name'],
-            dosage=data['dosage'],
-            frequency=data['frequency'],
-            time_of_day=data['time_of_day'],
-            start_date=datetime.fromisoformat(data['start_date']) if 'start_date' in data else datetime.utcnow(),
-            end_date=datetime.fromisoformat(data['end_date']) if 'end_date' in data else None,
-            notes=data.get('notes', '')
-        )
-        
-        db.session.add(medication)
+        medication, reminder_times = create_medication(fields)
         db.session.commit()
         
-        # Create reminders based on frequency
-        if 'daily' in data['frequency'].lower():
-            # Parse time of day
-            times = data['time_of_day'].split(',')
-            for time_str in times:
-                time_str = time_str.strip()
-                if not time_str:
-                    continue
-                
-                # Parse time (format like "8:00 AM")
-                try:
-                    hour, minute = time_str.split(':')
-                    hour = int(hour)
-                    minute = int(minute.split()[0])
-                    am_pm = time_str.split()[1].upper()
-                    
-                    if am_pm == 'PM' and hour < 12:
-                        hour += 12
-                    elif am_pm == 'AM' and hour == 12:
-                        hour = 0
-                    
-                    # Create daily reminders for next 30 days
-                    current_date = datetime.utcnow().date()
-                    for i in range(30):
-                        reminder_date = current_date + timedelta(days=i)
-                        reminder_time = datetime.combine(reminder_date, datetime.min.time()) + timedelta(hours=hour, minutes=minute)
-                        
-                        reminder = MedicationReminder(
-                            medication_id=medication.id,
-                            scheduled_time=reminder_time
-                        )
-                        
-                        db.session.add(reminder)
-                except Exception as e:
-                    print(f"Error parsing time: {e}")
-        
-        db.session.commit()
+        schedule_due_times(reminder_times)
         
         return jsonify({
             'message': 'Medication added successfully',
             'medication_id': medication.id
         })
 
+@app.route('/medications/bulk', methods=['POST'])
+def bulk_medications():
+    """Import many medications from a JSON array or NDJSON in one transaction"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    return bulk_import(medication_fields, insert_medications)
+
+@app.route('/medications/export', methods=['GET'])
+def export_medications():
+    """Stream the user's medications as NDJSON or CSV (importable by /medications/bulk)"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    user_id = session['user_id']
+    
+    try:
+        filters = status_filter(Medication.status, MEDICATION_STATUSES)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    query = Medication.query.filter_by(user_id=user_id).filter(*filters)
+    return export_response(query, MEDICATION_EXPORT_COLUMNS, (Medication.id,), 'medications')
+
 @app.route('/medications/<int:medication_id>', methods=['PUT', 'DELETE'])
 def update_medication(medication_id):
     if 'user_id' not in session:
@@ -555,27 +3486,19 @@ def update_medication(medication_id):
         return jsonify({'error': 'Medication not found'}), 404
     
     if request.method == 'PUT':
-        data = request.json
-        
-        medication.name = data.get('name', medication.name)
-        medication.dosage = data.get('dosage', medication.dosage)
-        medication.frequency = data.get('frequency', medication.frequency)
-        medication.time_of_day = data.get('time_of_day', medication.time_of_day)
-        medication.start_date = datetime.fromisoformat(data['start_date']) if 'start_date' in data else medication.start_date
-        medication.end_date = datetime.fromisoformat(data['end_date']) if 'end_date' in data else medication.end_date
-        medication.status = data.get('status', medication.status)
-        medication.notes = data.get('notes', medication.notes)
+        try:
+            reminder_times = update_medication_fields(medication, request.json)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
         db.session.commit()
         
+        schedule_due_times(reminder_times)
+        
         return jsonify({'message': 'Medication updated successfully'})
     
     elif request.method == 'DELETE':
-        # Delete all reminders first
-        MedicationReminder.query.filter_by(medication_id=medication_id).delete()
-        
-        # Then delete the medication
-        db.session.delete(medication)
+        delete_medication(medication)
         db.session.commit()
         
         return jsonify({'message': 'Medication deleted successfully'})
@@ -588,69 +3511,82 @@ def appointments():
     user_id = session['user_id']
     
     if request.method == 'GET':
-        user_appointments = Appointment.query.filter_by(user_id=user_id).all()
-        
-        result = []
-        for appt in user_appointments:
-            reminders = AppointmentReminder.query.filter_by(appointment_id=appt.id).all()
-            appt_dict = {
-                'id': appt.id,
-                'doctor_name': appt.doctor_name,
-                'specialty': appt.specialty,
-                'location': appt.location,
-                'date_time': appt.date_time.isoformat(),
-                'purpose': appt.purpose,
-                'notes': appt.notes,
-                'status': appt.status,
-                'reminders': [
-                    {
-                        'id': r.id,
-                        'reminder_time': r.reminder_time.isoformat(),
-                        'is_sent': r.is_sent
-                    } for r in reminders
-                ]
-            }
-            result.append(appt_dict)
+        try:
+            reminder_option = reminder_load_option(Appointment.reminders, AppointmentReminder.reminder_time)
+            filters = status_filter(Appointment.status, APPOINTMENT_STATUSES)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
-        return jsonify(result)
-    
-    elif request.method == 'POST':
-        data = request.json
+        # Reminders are loaded for all appointments in one extra query instead of one per appointment
+        query = Appointment.query.filter_by(user_id=user_id)
+        if reminder_option is not None:
+            query = query.options(reminder_option)
         
-        # Create new appointment
-        appointment = Appointment(
-            user_id=user_id,
-            doctor_name=data['doctor_name'],
-            specialty=data.get('specialty', ''),
-            location=data['location'],
-            date_time=datetime.fromisoformat(data['date_time']),
-            purpose=data.get('purpose', ''),
-            notes=data.get('notes', '')
+        return versioned_list_response(
+            user_id, Appointment, query,
+            lambda appts: [appointment_to_dict(appt, reminder_option is not None) for appt in appts],
+            APPOINTMENT_ORDER, filters,
+            conditional=request.args.get('reminders') != 'upcoming'
         )
+    
+    elif request.method == 'POST':
+        try:
+            fields = appointment_fields(request.json, user_id)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
-        db.session.add(appointment)
+        # Create new appointment with its reminders
+        appointment, reminder_times = create_appointment(fields)
         db.session.commit()
         
-        # Create reminders (1 day before, 1 hour before)
-        reminder1 = AppointmentReminder(
-            appointment_id=appointment.id,
-            reminder_time=appointment.date_time - timedelta(days=1)
-        )
-        
-        reminder2 = AppointmentReminder(
-            appointment_id=appointment.id,
-            reminder_time=appointment.date_time - timedelta(hours=1)
-        )
-        
-        db.session.add(reminder1)
-        db.session.add(reminder2)
-        db.session.commit()
+        schedule_due_times(reminder_times)
         
         return jsonify({
             'message': 'Appointment added successfully',
             'appointment_id': appointment.id
         })
 
+@app.route('/appointments/<int:appointment_id>', methods=['DELETE'])
+def remove_appointment(appointment_id):
+    if 'user_id' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    user_id = session['user_id']
+    
+    appointment = Appointment.query.filter_by(id=appointment_id, user_id=user_id).first()
+    
+    if not appointment:
+        return jsonify({'error': 'Appointment not found'}), 404
+    
+    delete_appointment(appointment)
+    db.session.commit()
+    
+    return jsonify({'message': 'Appointment deleted successfully'})
+
+@app.route('/appointments/bulk', methods=['POST'])
+def bulk_appointments():
+    """Import many appointments from a JSON array or NDJSON in one transaction"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    return bulk_import(appointment_fields, insert_appointments)
+
+@app.route('/appointments/export', methods=['GET'])
+def export_appointments():
+    """Stream the user's appointments as NDJSON or CSV (importable by /appointments/bulk)"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    user_id = session['user_id']
+    
+    try:
+        filters = status_filter(Appointment.status, APPOINTMENT_STATUSES)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    query = Appointment.query.filter_by(user_id=user_id).filter(*filters)
+    return export_response(query, APPOINTMENT_EXPORT_COLUMNS, (Appointment.date_time, Appointment.id), 'appointments')
+
 @app.route('/timers', methods=['GET', 'POST'])
 def timers():
     if 'user_id' not in session:
@@ -659,34 +3595,24 @@ def timers():
     user_id = session['user_id']
     
     if request.method == 'GET':
-        user_timers = Timer.query.filter_by(user_id=user_id).all()
-        
-        result = []
-        for timer in user_timers:
-            timer_dict = {
-                'id': timer.id,
-                'name': timer.name,
-                'duration': timer.duration,
-                'start_time': timer.start_time.isoformat() if timer.start_time else None,
-                'end_time': timer.end_time.isoformat() if timer.end_time else None,
-                'status': timer.status,
-                'created_at': timer.created_at.isoformat()
-            }
-            result.append(timer_dict)
+        try:
+            filters = status_filter(Timer.status, TIMER_STATUSES)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
-        return jsonify(result)
+        return versioned_list_response(
+            user_id, Timer, Timer.query.filter_by(user_id=user_id),
+            lambda user_timers: [timer_to_dict(timer) for timer in user_timers],
+            TIMER_ORDER, filters
+        )
     
     elif request.method == 'POST':
-        data = request.json
-        
         # Create new timer
-        timer = Timer(
-            user_id=user_id,
-            name=data['name'],
-            duration=data['duration']  # Duration in seconds
-        )
+        try:
+            timer = create_timer(user_id, request.json)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
-        db.session.add(timer)
         db.session.commit()
         
         return jsonify({
@@ -695,7 +3621,9 @@ def timers():
         })
 
 @app.route('/timers/<int:timer_id>/start', methods=['POST'])
+@app.route('/timers/<int:timer_id>/resume', methods=['POST'])
 def start_timer(timer_id):
+    """Start a ready or completed timer, or resume a paused one where it stopped"""
     if 'user_id' not in session:
         return jsonify({'error': 'Unauthorized'}), 401
     
@@ -706,44 +3634,89 @@ def start_timer(timer_id):
     if not timer:
         return jsonify({'error': 'Timer not found'}), 404
     
-    current_time = datetime.utcnow()
-    timer.start_time = current_time
-    timer.end_time = current_time + timedelta(seconds=timer.duration)
-    timer.status = 'Running'
+    try:
+        run_timer(timer, datetime.utcnow())
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 409
     
     db.session.commit()
     
+    reminder_scheduler.schedule(timer.end_time)
+    publish_timer(timer)
+    
     return jsonify({
-        'message': 'Timer started',
+        'message': 'Timer resumed' if timer.elapsed else 'Timer started',
         'start_time': timer.start_time.isoformat(),
-        'end_time': timer.end_time.isoformat()
+        'end_time': timer.end_time.isoformat(),
+        'elapsed': timer.elapsed
     })
 
-@app.route('/insights', methods=['GET'])
-def insights():
+@app.route('/timers/<int:timer_id>/pause', methods=['POST'])
+def pause_timer(timer_id):
+    """Stop a running timer and keep the time it has run"""
     if 'user_id' not in session:
         return jsonify({'error': 'Unauthorized'}), 401
     
     user_id = session['user_id']
     
-    # Get unread insights first, then read insights, limit to 10 total
-    unread_insights = HealthInsight.query.filter_by(user_id=user_id, is_read=False).order_by(HealthInsight.generated_at.desc()).all()
-    read_insights = HealthInsight.query.filter_by(user_id=user_id, is_read=True).order_by(HealthInsight.generated_at.desc()).limit(10 - len(unread_insights)).all()
+    timer = Timer.query.filter_by(id=timer_id, user_id=user_id).first()
     
-    all_insights = unread_insights + read_insights
+    if not timer:
+        return jsonify({'error': 'Timer not found'}), 404
     
-    result = []
-    for insight in all_insights:
-        insight_dict = {
-            'id': insight.id,
-            'type': insight.insight_type,
-            'content': insight.content,
-            'generated_at': insight.generated_at.isoformat(),
-            'is_read': insight.is_read
-        }
-        result.append(insight_dict)
+    try:
+        pause_timer_run(timer, datetime.utcnow())
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 409
     
-    return jsonify(result)
+    db.session.commit()
+    
+    publish_timer(timer)
+    
+    return jsonify({
+        'message': 'Timer paused',
+        'elapsed': timer.elapsed,
+        'remaining': timer.duration - timer.elapsed
+    })
+
+@app.route('/timers/<int:timer_id>/reset', methods=['POST'])
+def reset_timer(timer_id):
+    """Put a timer back to its full duration"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    user_id = session['user_id']
+    
+    timer = Timer.query.filter_by(id=timer_id, user_id=user_id).first()
+    
+    if not timer:
+        return jsonify({'error': 'Timer not found'}), 404
+    
+    reset_timer_run(timer)
+    db.session.commit()
+    
+    publish_timer(timer)
+    
+    return jsonify({'message': 'Timer reset'})
+
+@app.route('/insights', methods=['GET'])
+def insights():
+    if 'user_id' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    user_id = session['user_id']
+    
+    try:
+        filters = status_filter(HealthInsight.is_read, INSIGHT_STATUSES)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    # Deltas include older insights too; clients keep the first 10 in the same order
+    return versioned_list_response(
+        user_id, HealthInsight, delivered_insights(user_id),
+        lambda user_insights: [insight_to_dict(insight) for insight in user_insights],
+        INSIGHT_FEED_ORDER, filters, default_limit=INSIGHT_FEED_LIMIT
+    )
 
 @app.route('/insights/<int:insight_id>/read', methods=['POST'])
 def mark_insight_read(insight_id):
@@ -762,6 +3735,141 @@ def mark_insight_read(insight_id):
     
     return jsonify({'message': 'Insight marked as read'})
 
+@app.route('/bootstrap', methods=['GET'])
+def bootstrap():
+    """Return everything the dashboard needs at startup in one response"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    user_id = session['user_id']
+    
+    # Same ?reminders=&window= options as the list endpoints, but without reminders by default
+    try:
+        medication_option = reminder_load_option(Medication.reminders, MedicationReminder.scheduled_time, default='none')
+        appointment_option = reminder_load_option(Appointment.reminders, AppointmentReminder.reminder_time, default='none')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    user = User.query.get(user_id)
+    revision = user_revision(user_id)  # Read before the lists, like versioned_list_response
+    
+    medication_query = Medication.query.filter_by(user_id=user_id)
+    if medication_option is not None:
+        medication_query = medication_query.options(medication_option)
+    
+    appointment_query = Appointment.query.filter_by(user_id=user_id)
+    if appointment_option is not None:
+        appointment_query = appointment_query.options(appointment_option)
+    
+    # First page of each list; the rest is fetched from the list endpoints with the returned cursors
+    user_medications, medication_cursor = keyset_page(medication_query, MEDICATION_ORDER, LIST_DEFAULT_LIMIT)
+    user_appointments, appointment_cursor = keyset_page(appointment_query, APPOINTMENT_ORDER, LIST_DEFAULT_LIMIT)
+    user_timers, timer_cursor = keyset_page(Timer.query.filter_by(user_id=user_id), TIMER_ORDER, LIST_DEFAULT_LIMIT)
+    user_insights, _ = keyset_page(delivered_insights(user_id), INSIGHT_FEED_ORDER, INSIGHT_FEED_LIMIT)
+    
+    reminder_stats = medication_reminder_stats(user_id)
+    
+    return jsonify({
+        'profile': profile_to_dict(user),
+        'medications': [medication_to_dict(med, medication_option is not None, reminder_stats) for med in user_medications],
+        'appointments': [appointment_to_dict(appt, appointment_option is not None) for appt in user_appointments],
+        'timers': [timer_to_dict(timer) for timer in user_timers],
+        'insights': [insight_to_dict(insight) for insight in user_insights],
+        'cursors': {
+            'medications': medication_cursor,
+            'appointments': appointment_cursor,
+            'timers': timer_cursor
+        },
+        'revision': revision
+    })
+
+@app.route('/sync', methods=['POST'])
+def sync():
+    """Apply a client's queued offline mutations, in order, all or nothing"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    user_id = session['user_id']
+    data = request.get_json(silent=True)
+    mutations = data.get('mutations') if isinstance(data, dict) else None
+    
+    if not isinstance(mutations, list):
+        return jsonify({'error': 'mutations must be a list'}), 400
+    if len(mutations) > SYNC_MAX_MUTATIONS:
+        return jsonify({'error': f'A sync takes at most {SYNC_MAX_MUTATIONS} mutations'}), 413
+    
+    # Forget keys old enough that no client still replays them
+    SyncMutation.query.filter(
+        SyncMutation.user_id == user_id, SyncMutation.applied_at < datetime.utcnow() - SYNC_KEY_TTL
+    ).delete(synchronize_session=False)
+    
+    # Load the keys being replayed and the creates that string targets refer to
+    batch = SyncBatch(user_id)
+    batch.load_applied([
+        key for mutation in mutations if isinstance(mutation, dict)
+        for key in (mutation.get('key'), mutation.get('target')) if isinstance(key, str)
+    ])
+    
+    results = []
+    for index, mutation in enumerate(mutations):
+        try:
+            results.append(batch.apply(mutation))
+        except (ValueError, TypeError, KeyError) as e:
+            # Nothing of the batch is kept; the client drops this mutation and sends the rest again
+            db.session.rollback()
+            return jsonify({
+                'error': str(e) if isinstance(e, ValueError) else 'mutation fields have the wrong type',
+                'index': index,
+                'key': mutation.get('key') if isinstance(mutation, dict) else None
+            }), 422
+    
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # Another request from this client applied the same keys first
+        db.session.rollback()
+        return jsonify({'error': 'A sync for these changes is already in progress. Please try again.'}), 409
+    
+    batch.finish()
+    
+    return jsonify({'results': results, 'revision': user_revision(user_id)})
+
+@app.route('/conversations', methods=['GET'])
+def conversations():
+    """Page through the user's conversation history, newest first"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    user_id = session['user_id']
+    
+    try:
+        query = conversation_query(user_id)
+        user_conversations, next_cursor = keyset_page(query, CONVERSATION_ORDER, list_limit(LIST_DEFAULT_LIMIT), request.args.get('after'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    response = jsonify([conversation_to_dict(conversation) for conversation in user_conversations])
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response
+
+@app.route('/conversations/export', methods=['GET'])
+def export_conversations():
+    """Stream the user's whole conversation history, oldest first, as NDJSON or CSV"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    user_id = session['user_id']
+    
+    try:
+        query = conversation_query(user_id)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return export_response(
+        query, CONVERSATION_EXPORT_COLUMNS, (Conversation.timestamp, Conversation.id), 'conversations'
+    )
+
 @app.route('/ai/chat', methods=['POST'])
 def ai_chat():
     if 'user_id' not in session:
@@ -771,11 +3879,9 @@ def ai_chat():
     data = request.json
     
     message = data['message']
-    response_text = generate_ai_response(message, user_id)
     
-    return jsonify({
-        'response': response_text
-    })
+    # The response is delivered as chat_response to the user's room (or via /ai/jobs/<job_id>)
+    return submit_chat_job(user_id, message, 'chat')
 
 @app.route('/ai/voice', methods=['POST'])
 def ai_voice():
@@ -785,24 +3891,69 @@ def ai_voice():
     user_id = session['user_id']
     data = request.json
     
-    user = User.query.get(user_id)
-    
     message = data['message']
-    response_text = generate_ai_response(message, user_id)
     
-    # Convert response to speech
-    language_code = user.preferred_language if user.preferred_language else 'en-US'
-    audio_content = text_to_speech(response_text, language_code)
+    # The response and its audio are delivered like /ai/chat results
+    return submit_chat_job(user_id, message, 'voice')
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    if METRICS_TOKEN:
+        authorization = request.headers.get('Authorization', '')
+        if not secrets.compare_digest(authorization.encode(), f'Bearer {METRICS_TOKEN}'.encode()):
+            return jsonify({'error': 'Unauthorized'}), 401
+    elif 'user_id' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
     
     return jsonify({
-        'response': response_text,
-        'audio': audio_content
+        'clients': clients.stats(),
+        'audio_cache': audio_cache.stats(),
+        'response_cache': response_cache.stats(),
+        'intent_router': intent_router.stats(),
+        'chat_context': chat_context.stats(),
+        'prompt_context': prompt_context_cache.stats(),
+        'insight_job': insight_job.stats(),
+        'chat_jobs': chat_jobs.stats()
     })
 
+@app.route('/ai/audio/<audio_key>', methods=['GET'])
+def ai_audio(audio_key):
+    if 'user_id' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    if not re.fullmatch(r'[0-9a-f]{64}', audio_key):
+        return jsonify({'error': 'Audio not found'}), 404
+    
+    path = audio_cache.ensure_on_disk(audio_key)
+    
+    if not path:
+        return jsonify({'error': 'Audio not found'}), 404
+    
+    # Content-addressed, so the response never changes: ETag plus Range support via send_file
+    return send_file(path, mimetype='audio/mpeg', conditional=True, etag=audio_key, max_age=31536000)
+
+@app.route('/ai/jobs/<job_id>', methods=['GET'])
+def ai_job(job_id):
+    if 'user_id' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    user_id = session['user_id']
+    
+    result = chat_jobs.get_result(job_id, user_id)
+    
+    if not result:
+        return jsonify({'error': 'Job not found'}), 404
+    
+    return jsonify(result)
+
 # SocketIO event handlers
 @socketio.on('connect')
 def handle_connect():
     print(f'Client connected: {request.sid}')
+    
+    # Notifications are only delivered to the room of the logged-in user
+    if 'user_id' in session:
+        join_room(user_room(session['user_id']))
 
 @socketio.on('disconnect')
 def handle_disconnect():
@@ -810,9 +3961,13 @@ def handle_disconnect():
 
 @socketio.on('join_user_channel')
 def handle_join_user_channel(data):
-    user_id = data.get('user_id')
-    if user_id:
-        print(f'User {user_id} joined their notification channel')
+    # The room comes from the session; a user_id sent by the client is never trusted
+    if 'user_id' not in session:
+        return {'success': False, 'message': 'Unauthorized'}
+    
+    join_room(user_room(session['user_id']))
+    print(f"User {session['user_id']} joined their notification channel")
+    return {'success': True}
 
 @socketio.on('medication_taken')
 def handle_medication_taken(data):
@@ -835,4 +3990,12 @@ def handle_medication_taken(data):
     return {'success': False, 'message': 'Failed to update medication status'}
 
 if __name__ == '__main__':
+    # Bring the schema up to date before serving; deployments run `flask db upgrade` instead
+    with app.app_context():
+        upgrade()
+    
+    # The development server dispatches reminders itself; the debug reloader imports
+    # this file twice, so only the serving child process starts the scheduler
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_reminder_thread()
     socketio.run(app, debug=True)
\ No newline at end of file
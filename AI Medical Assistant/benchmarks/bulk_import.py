@@ -0,0 +1,56 @@
+"""Medication import: one POST per item vs /medications/bulk (JSON array and NDJSON).
+
+Imports --items daily medications with two dose times each (so twice as many
+reminders) for a separate user per mode, then exports them back as NDJSON.
+
+    python -m benchmarks.bulk_import [--items 10000]
+"""
+import argparse
+import json
+
+from benchmarks.support import add_users, load_app, logged_in_client, timed
+
+app_module = load_app()
+
+
+def per_item(client, items):
+    for item in items:
+        assert client.post('/medications', json=item).status_code == 200
+
+
+def bulk_json(client, items):
+    assert client.post('/medications/bulk', json=items).get_json()['created'] == len(items)
+
+
+def bulk_ndjson(client, items):
+    body = '\n'.join(json.dumps(item) for item in items)
+    response = client.post('/medications/bulk', data=body, content_type='application/x-ndjson')
+    assert response.get_json()['created'] == len(items)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--items', type=int, default=10000)
+    args = parser.parse_args()
+    
+    items = [
+        {'name': f'Medication {i}', 'dosage': '500mg', 'frequency': 'daily', 'time_of_day': '8:00 AM, 8:00 PM', 'notes': 'With food'}
+        for i in range(args.items)
+    ]
+    
+    with app_module.app.app_context():
+        add_users(app_module, 3)
+        for user_id, (name, load) in enumerate((('per-item POST', per_item), ('bulk JSON', bulk_json), ('bulk NDJSON', bulk_ndjson)), 1):
+            client = logged_in_client(app_module, user_id)
+            _, elapsed = timed(load, client, items)
+            reminders = app_module.MedicationReminder.query.join(app_module.Medication).filter(
+                app_module.Medication.user_id == user_id
+            ).count()
+            print(f'{name:14} {elapsed:7.2f} s  {args.items / elapsed:7.0f} items/s  reminders: {reminders}')
+        
+        response, elapsed = timed(lambda: client.get('/medications/export').get_data())
+        print(f'export NDJSON  {len(response) / 1e6:.1f} MB in {elapsed:.2f} s')
+
+
+if __name__ == '__main__':
+    main()
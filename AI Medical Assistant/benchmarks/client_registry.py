@@ -0,0 +1,56 @@
+"""Client reuse: the shared ClientRegistry vs building a client for every call.
+
+The fake clients take --construct-ms to construct and --call-ms per model
+call, standing in for gRPC channel setup and a short generation.
+
+    python -m benchmarks.client_registry [--calls 100] [--construct-ms 30] [--call-ms 5]
+"""
+import argparse
+
+from benchmarks.support import add_users, load_app, percentiles, timed
+from tests.fakes import FakeGenerativeModel, FakeTextToSpeechClient
+
+app_module = load_app()
+
+
+class PerCallClients(app_module.ClientRegistry):
+    """How the app worked before the registry: a new client for every request"""
+    
+    def model(self, name):
+        return app_module.genai.GenerativeModel(name)
+    
+    def tts_client(self):
+        return app_module.texttospeech.TextToSpeechClient()
+
+
+def run(label, calls):
+    chat, tts = [], []
+    for i in range(calls):
+        # Distinct texts so neither the response cache nor the audio cache answers
+        chat.append(timed(app_module.generate_ai_response, f'Tell me about vitamin number {i}', 1)[1])
+        tts.append(timed(app_module.text_to_speech, f'Reading number {i}')[1])
+    for name, samples in (('chat', chat), ('tts', tts)):
+        p50, p99 = percentiles(samples)
+        print(f'{label:9} {name:5} p50 {p50:6.1f} ms  p99 {p99:6.1f} ms')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--calls', type=int, default=100)
+    parser.add_argument('--construct-ms', type=float, default=30)
+    parser.add_argument('--call-ms', type=float, default=5)
+    args = parser.parse_args()
+    
+    FakeGenerativeModel.construct_latency = FakeTextToSpeechClient.construct_latency = args.construct_ms / 1000
+    FakeGenerativeModel.latency = args.call_ms / 1000
+    
+    with app_module.app.app_context():
+        add_users(app_module, 1)
+        shared = app_module.clients
+        for label, registry in (('per-call', PerCallClients()), ('registry', shared)):
+            app_module.clients = registry
+            run(label, args.calls)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""Conversation history: FTS search, the LIKE fallback and streaming export.
+
+Seeds --rows conversations (a tenth of them owned by the requesting user)
+straight into a SQLite file, then times /conversations queries and both
+export formats. RSS is the process's anonymous memory, so SQLite's
+memory-mapped pages do not count.
+
+    python -m benchmarks.conversation_history [--rows 1000000]
+
+Seeding goes through the FTS triggers and takes several minutes at 1M rows.
+"""
+import argparse
+import random
+import sqlite3
+import time
+
+from benchmarks.support import add_users, load_app, logged_in_client
+
+app_module = load_app()
+Conversation = app_module.Conversation
+
+COMMON_WORDS = ['pain', 'dose', 'sleep', 'water', 'doctor', 'blood', 'pressure', 'medication', 'headache', 'exercise']
+
+
+def seed(rows):
+    rng = random.Random(1)
+    words = [''.join(rng.choice('abcdefghijklmnopqrstuvwxyz') for _ in range(rng.randint(3, 9))) for _ in range(20000)]
+    
+    def sentence(length):
+        return ' '.join(rng.choice(COMMON_WORDS) if rng.random() < 0.1 else rng.choice(words) for _ in range(length))
+    
+    connection = sqlite3.connect(app_module.db.engine.url.database)
+    base = 1700000000
+    batch = []
+    for i in range(rows):
+        user_id = 1 if i % 10 == 0 else 2 + i % 50
+        timestamp = time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(base + i * 30)) + '.000000'
+        batch.append((user_id, sentence(12), sentence(60), timestamp, 'chat'))
+        if len(batch) == 10000 or i == rows - 1:
+            connection.executemany(
+                'INSERT INTO conversation (user_id, message, response, timestamp, interaction_type) VALUES (?, ?, ?, ?, ?)', batch
+            )
+            batch = []
+    connection.commit()
+    
+    # A word that is in one of the user's conversations but not common
+    message = connection.execute(
+        'SELECT message FROM conversation WHERE user_id = 1 LIMIT 1 OFFSET ?', (rows // 20,)
+    ).fetchone()[0]
+    connection.close()
+    return next(word for word in message.split() if word not in COMMON_WORDS)
+
+
+def rss_mb():
+    with open('/proc/self/status') as status:
+        for line in status:
+            if line.startswith('RssAnon:'):
+                return int(line.split()[1]) / 1000
+
+
+def time_get(client, url, repeat=20):
+    client.get(url)  # Warm the page cache
+    started = time.perf_counter()
+    for _ in range(repeat):
+        response = client.get(url)
+    return (time.perf_counter() - started) / repeat * 1000, len(response.get_json())
+
+
+def time_like(word):
+    query = Conversation.query.filter_by(user_id=1).filter(
+        Conversation.message.ilike(f'%{word}%') | Conversation.response.ilike(f'%{word}%')
+    ).order_by(Conversation.timestamp.desc()).limit(100)
+    started = time.perf_counter()
+    found = query.all()
+    return (time.perf_counter() - started) * 1000, len(found)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1000000)
+    args = parser.parse_args()
+    
+    with app_module.app.app_context():
+        add_users(app_module, 51)
+        started = time.perf_counter()
+        rare = seed(args.rows)
+        print(f'seeded {args.rows} conversations in {time.perf_counter() - started:.0f} s')
+        
+        client = logged_in_client(app_module, 1)
+        for url in ('/conversations', f'/conversations?q={rare}', '/conversations?q=zzzzqq',
+                    '/conversations?q=headache', '/conversations?q=headache%20pressure'):
+            elapsed, rows = time_get(client, url)
+            print(f'{url:45} {rows:4} rows {elapsed:8.1f} ms')
+        for word in ('headache', 'zzzzqq'):
+            elapsed, rows = time_like(word)
+            print(f'{"LIKE scan for " + word:45} {rows:4} rows {elapsed:8.1f} ms')
+        
+        for export_format in ('ndjson', 'csv'):
+            response = client.get(f'/conversations/export?format={export_format}', buffered=False)
+            start_rss = peak_rss = rss_mb()
+            size = 0
+            started = time.perf_counter()
+            for chunk_number, chunk in enumerate(response.response, 1):
+                size += len(chunk)
+                if chunk_number % 100 == 0:
+                    peak_rss = max(peak_rss, rss_mb())
+            response.close()
+            print(f'export {export_format:6} {size / 1e6:5.0f} MB in {time.perf_counter() - started:4.1f} s, '
+                  f'RSS +{peak_rss - start_rss:.1f} MB')
+
+
+if __name__ == '__main__':
+    main()
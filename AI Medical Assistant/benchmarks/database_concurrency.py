@@ -0,0 +1,110 @@
+"""Database under concurrent load: the tuned engine options vs SQLAlchemy defaults.
+
+Writer threads insert conversations and reader threads page through them,
+each for --seconds. By default every run gets a fresh SQLite file, and the
+tuned run adds WAL, busy_timeout and the pool settings. With --database-url
+(e.g. a PostgreSQL server) the same workload runs there instead, and the
+tuned run adds the pool settings and pool_pre_ping. The app's tables in that
+database are dropped and recreated before each run.
+
+    python -m benchmarks.database_concurrency [--seconds 5] [--database-url URL]
+"""
+import argparse
+import os
+import random
+import threading
+import time
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import sessionmaker
+
+from benchmarks.support import load_app, percentiles, temporary_directory
+
+app_module = load_app()
+Conversation = app_module.Conversation
+
+
+def run(tuned, writers, readers, seconds, database_url=None):
+    url = database_url or 'sqlite:///' + os.path.join(temporary_directory(), 'concurrency.db')
+    if tuned:
+        engine = create_engine(url, **app_module.database_engine_options(url))
+    else:
+        # The old setup: no pragmas (SQLite keeps its rollback journal and 5 s lock timeout), default pool
+        event.remove(Engine, 'connect', app_module.set_sqlite_pragmas)
+        engine = create_engine(url)
+    app_module.db.metadata.drop_all(engine)
+    app_module.db.metadata.create_all(engine)
+    Session = sessionmaker(engine)
+    with Session() as session:
+        session.execute(app_module.User.__table__.insert(), [
+            {'id': i, 'username': f'user{i}', 'email': f'user{i}@example.com', 'password_hash': 'x'} for i in range(1, 51)
+        ])
+        session.commit()
+    
+    lock = threading.Lock()
+    write_times, read_times, errors = [], [], []
+    stop = time.monotonic() + seconds
+    
+    def writer():
+        while time.monotonic() < stop:
+            started = time.perf_counter()
+            try:
+                with Session() as session:
+                    session.add(Conversation(user_id=random.randint(1, 50), message='m' * 200, response='r' * 800))
+                    session.commit()
+            except Exception as e:
+                with lock:
+                    errors.append(e)
+                continue
+            with lock:
+                write_times.append(time.perf_counter() - started)
+    
+    def reader():
+        while time.monotonic() < stop:
+            started = time.perf_counter()
+            try:
+                with Session() as session:
+                    session.query(Conversation).filter_by(user_id=random.randint(1, 50)).order_by(
+                        Conversation.timestamp.desc()
+                    ).limit(20).all()
+            except Exception as e:
+                with lock:
+                    errors.append(e)
+                continue
+            with lock:
+                read_times.append(time.perf_counter() - started)
+    
+    threads = [threading.Thread(target=writer) for _ in range(writers)] + [threading.Thread(target=reader) for _ in range(readers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    if not tuned:
+        event.listen(Engine, 'connect', app_module.set_sqlite_pragmas)
+    engine.dispose()
+    
+    print(f"{'tuned' if tuned else 'default':8} {writers}W/{readers}R  "
+          f'{len(write_times) / seconds:6.0f} writes/s  {len(read_times) / seconds:6.0f} reads/s  '
+          f'write p99 {percentiles(write_times)[1] if write_times else float("nan"):6.1f} ms  '
+          f'read p99 {percentiles(read_times)[1] if read_times else float("nan"):6.1f} ms  errors: {len(errors)}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--database-url', help='run against this database instead of temporary SQLite files')
+    args = parser.parse_args()
+    
+    database_url = args.database_url
+    if database_url and database_url.startswith('postgres://'):
+        database_url = 'postgresql://' + database_url[len('postgres://'):]
+    
+    for writers, readers in ((4, 4), (8, 16)):
+        run(False, writers, readers, args.seconds, database_url)
+        run(True, writers, readers, args.seconds, database_url)
+
+
+if __name__ == '__main__':
+    main()
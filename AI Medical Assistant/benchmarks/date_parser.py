@@ -0,0 +1,68 @@
+"""Date parsing: cost per call of parse_natural_language_date vs the parser it replaced.
+
+Times 8 typical inputs (best of 5 runs of --number calls each) with the old
+parser, which the script reproduces, and with the new one in UTC and in
+Europe/Berlin.
+
+    python -m benchmarks.date_parser [--number 20000]
+"""
+import argparse
+import re
+import timeit
+from datetime import datetime, timedelta
+
+import pytz
+
+from benchmarks.support import load_app
+
+app_module = load_app()
+
+INPUTS = [
+    'tomorrow at 2:30pm', 'every Monday at 9', 'in 3 days at 8am', 'next Monday', '8pm',
+    'remind me about the thing', 'daily at 8:00 AM, 8:00 PM', '10th of december at 3pm'
+]
+
+
+def legacy_parse(text):
+    """The old parser: first match wins, lowercasing the text for every check"""
+    current_time = datetime.utcnow()
+    if 'tomorrow' in text.lower():
+        return current_time + timedelta(days=1)
+    elif 'today' in text.lower():
+        return current_time
+    elif re.search(r'in (\d+) days?', text.lower()):
+        match = re.search(r'in (\d+) days?', text.lower())
+        return current_time + timedelta(days=int(match.group(1)))
+    elif re.search(r'in (\d+) hours?', text.lower()):
+        match = re.search(r'in (\d+) hours?', text.lower())
+        return current_time + timedelta(hours=int(match.group(1)))
+    elif re.search(r'(\d+)(am|pm)', text.lower()):
+        match = re.search(r'(\d+)(am|pm)', text.lower())
+        hour = int(match.group(1))
+        if match.group(2) == 'pm' and hour < 12:
+            hour += 12
+        return current_time.replace(hour=hour, minute=0, second=0, microsecond=0)
+    return current_time
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--number', type=int, default=20000)
+    args = parser.parse_args()
+    
+    berlin = pytz.timezone('Europe/Berlin')
+    parsers = (
+        ('old', legacy_parse),
+        ('new, UTC', app_module.parse_natural_language_date),
+        ('new, Europe/Berlin', lambda text: app_module.parse_natural_language_date(text, berlin)),
+    )
+    for name, parse in parsers:
+        costs = [
+            min(timeit.repeat(lambda: parse(text), number=args.number, repeat=5)) / args.number * 1e6
+            for text in INPUTS
+        ]
+        print(f"{name:18} {' '.join(f'{cost:5.1f}' for cost in costs)}  mean {sum(costs) / len(costs):.1f} us")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""List refresh: full reloads vs If-None-Match (304) vs ?since= deltas.
+
+Seeds one user with 30 medications, 20 appointments, 10 timers and 10
+insights, then times a refresh of all four lists through the test client.
+
+    python -m benchmarks.list_refresh [--rounds 200]
+"""
+import argparse
+import time
+from datetime import datetime, timedelta
+
+from benchmarks.support import add_users, load_app, logged_in_client
+
+app_module = load_app()
+
+LISTS = ('/medications', '/appointments', '/timers', '/insights')
+
+
+def seed(client):
+    for i in range(30):
+        client.post('/medications', json={
+            'name': f'Medication {i}', 'dosage': '10mg', 'frequency': 'daily', 'time_of_day': '8:00 AM'
+        })
+    for i in range(20):
+        client.post('/appointments', json={
+            'doctor_name': f'Doctor {i}', 'specialty': 'General', 'location': 'Clinic',
+            'date_time': (datetime.utcnow() + timedelta(days=i + 1)).isoformat(), 'purpose': 'Checkup'
+        })
+    for i in range(10):
+        client.post('/timers', json={'name': f'Timer {i}', 'duration': 600})
+    app_module.db.session.add_all([
+        app_module.HealthInsight(user_id=1, insight_type='hydration', content=f'Insight {i}') for i in range(10)
+    ])
+    app_module.db.session.commit()
+
+
+def refresh(client, headers_for):
+    """GET every list and return (responses, bytes received)"""
+    responses = [client.get(url, headers=headers) for url, headers in headers_for()]
+    return responses, sum(len(response.data) for response in responses)
+
+
+def measure(label, client, rounds, headers_for, before=None):
+    cpu = 0.0
+    for _ in range(rounds):
+        if before:
+            before()
+        started = time.process_time()
+        responses, size = refresh(client, headers_for)
+        cpu += time.process_time() - started
+    statuses = sorted({response.status_code for response in responses})
+    print(f'{label:28} {size:7} B  {cpu / rounds * 1000:6.1f} ms CPU  status {statuses}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rounds', type=int, default=200)
+    args = parser.parse_args()
+    
+    with app_module.app.app_context():
+        add_users(app_module, 1)
+        client = logged_in_client(app_module, 1)
+        seed(client)
+        
+        # Plain URLs: ?reminders=upcoming depends on the clock and is never answered with 304
+        full = [client.get(url) for url in LISTS]
+        etags = {url: response.headers['ETag'] for url, response in zip(LISTS, full)}
+        revisions = {url: response.headers['X-Revision'] for url, response in zip(LISTS, full)}
+        medication_id = full[0].get_json()[0]['id']
+        
+        measure('full refresh', client, args.rounds, lambda: [(url, {}) for url in LISTS])
+        measure('If-None-Match -> 304', client, args.rounds, lambda: [(url, {'If-None-Match': etags[url]}) for url in LISTS])
+        measure('?since, nothing changed', client, args.rounds, lambda: [(f'{url}?since={revisions[url]}', {}) for url in LISTS])
+        
+        def edit():
+            client.put(f'/medications/{medication_id}', json={'notes': str(time.time())})
+        measure('?since, 1 medication edited', client, args.rounds,
+                lambda: [(f'{url}?since={revisions[url]}', {}) for url in LISTS], before=edit)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+"""Offline replay: one request per queued change vs a single /sync batch.
+
+Replays --timers timer creates plus starts both ways, then sends the same
+/sync batch again to time the idempotent duplicate path.
+
+    python -m benchmarks.offline_sync [--timers 200]
+"""
+import argparse
+
+from benchmarks.support import add_users, load_app, logged_in_client, timed
+
+app_module = load_app()
+
+
+def per_request(client, count):
+    for i in range(count):
+        timer_id = client.post('/timers', json={'name': f'Timer {i}', 'duration': 60}).get_json()['timer_id']
+        client.post(f'/timers/{timer_id}/start')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--timers', type=int, default=200)
+    args = parser.parse_args()
+    
+    mutations = []
+    for i in range(args.timers):
+        mutations.append({'key': f'create-{i}', 'op': 'timer.create', 'data': {'name': f'Timer {i}', 'duration': 60}})
+        mutations.append({'key': f'start-{i}', 'op': 'timer.start', 'target': f'create-{i}'})
+    
+    with app_module.app.app_context():
+        add_users(app_module, 2)
+        _, elapsed = timed(per_request, logged_in_client(app_module, 1), args.timers)
+        print(f'{len(mutations)} requests  {elapsed:6.2f} s')
+        
+        client = logged_in_client(app_module, 2)
+        response, elapsed = timed(client.post, '/sync', json={'mutations': mutations})
+        print(f'one /sync      {elapsed:6.2f} s  status {response.status_code}')
+        
+        response, elapsed = timed(client.post, '/sync', json={'mutations': mutations})
+        duplicates = all(result.get('duplicate') for result in response.get_json()['results'])
+        print(f'replayed /sync {elapsed:6.2f} s  status {response.status_code}, all duplicates: {duplicates}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""Reminder dispatch: the batched check_reminders sweep vs the old per-row loop.
+
+Seeds N due medication reminders spread over 100 users on a SQLite file and
+times one dispatch with each implementation.
+
+    python -m benchmarks.reminder_dispatch [--reminders 10000]
+
+The per-row loop needs several minutes for 10k reminders.
+"""
+import argparse
+from datetime import datetime, timedelta
+
+from benchmarks.support import add_users, load_app, timed
+
+app_module = load_app()
+db = app_module.db
+
+
+def legacy_check_reminders(current_time):
+    """The medication part of check_reminders before batching: two lookups, one emit and one commit per row"""
+    reminders = app_module.MedicationReminder.query.filter(
+        app_module.MedicationReminder.is_sent == False,
+        app_module.MedicationReminder.scheduled_time <= current_time
+    ).all()
+    for reminder in reminders:
+        medication = db.session.get(app_module.Medication, reminder.medication_id)
+        user = db.session.get(app_module.User, medication.user_id)
+        app_module.socketio.emit(f'notification_{user.id}', {
+            'type': 'medication_reminder',
+            'user_id': user.id,
+            'title': 'Medication Reminder',
+            'message': f"Time to take your {medication.name} ({medication.dosage})",
+            'medication_id': medication.id,
+            'reminder_id': reminder.id
+        })
+        reminder.is_sent = True
+        db.session.commit()
+
+
+def seed(reminders):
+    for table in reversed(db.metadata.sorted_tables):
+        db.session.execute(table.delete())
+    db.session.commit()
+    
+    add_users(app_module, 100)
+    now = datetime.utcnow()
+    db.session.execute(app_module.Medication.__table__.insert(), [
+        {'id': medication_id, 'user_id': medication_id % 100 + 1, 'name': 'Metformin', 'dosage': '500mg',
+         'frequency': 'daily', 'time_of_day': '8:00 AM', 'start_date': now}
+        for medication_id in range(1, 1001)
+    ])
+    due = now - timedelta(minutes=1)
+    db.session.execute(app_module.MedicationReminder.__table__.insert(), [
+        {'medication_id': i % 1000 + 1, 'scheduled_time': due, 'is_sent': False, 'is_acknowledged': False, 'status': 'Pending'}
+        for i in range(reminders)
+    ])
+    db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--reminders', type=int, default=10000)
+    args = parser.parse_args()
+    
+    with app_module.app.app_context():
+        for name, check in (('per-row loop', legacy_check_reminders), ('batched sweep', app_module.check_reminders)):
+            seed(args.reminders)
+            _, elapsed = timed(check, datetime.utcnow())
+            unsent = app_module.MedicationReminder.query.filter_by(is_sent=False).count()
+            print(f'{name:14} {elapsed:8.2f} s  {args.reminders / elapsed:10,.0f} reminders/s  unsent left: {unsent}')
+
+
+if __name__ == '__main__':
+    main()
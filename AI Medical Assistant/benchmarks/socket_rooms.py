@@ -0,0 +1,71 @@
+"""Notification fan-out: per-user rooms vs the old broadcast with per-user event names.
+
+Connects N Socket.IO test clients, each logged in as a different user,
+dispatches one reminder per user and reports what each client received.
+
+    python -m benchmarks.socket_rooms [--clients 10 100 1000]
+"""
+import argparse
+import contextlib
+import io
+import json
+
+from benchmarks.support import add_users, load_app, logged_in_client, timed
+
+app_module = load_app()
+socketio = app_module.socketio
+
+
+def broadcast_dispatch(notifications_by_user):
+    """How notifications were sent before rooms: to every socket, filtered in the browser"""
+    for user_id, notifications in notifications_by_user.items():
+        socketio.emit(f'notification_{user_id}', notifications[0])
+
+
+def notification(user_id):
+    return {
+        'type': 'medication_reminder',
+        'user_id': user_id,
+        'title': 'Medication Reminder',
+        'message': 'Time to take your Metformin (500mg)',
+        'medication_id': 1,
+        'reminder_id': user_id
+    }
+
+
+def run(count):
+    with contextlib.redirect_stdout(io.StringIO()):  # The connect handler logs every client
+        sockets = [
+            socketio.test_client(app_module.app, flask_test_client=logged_in_client(app_module, user_id))
+            for user_id in range(1, count + 1)
+        ]
+    for socket in sockets:
+        socket.get_received()
+    
+    results = []
+    for name, dispatch in (('broadcast', broadcast_dispatch), ('rooms', app_module.dispatch_notifications)):
+        _, elapsed = timed(dispatch, {user_id: [notification(user_id)] for user_id in range(1, count + 1)})
+        received = [socket.get_received() for socket in sockets]
+        messages = sum(len(packets) for packets in received) / count
+        size = sum(len(json.dumps(packets)) for packets in received) / count
+        results.append(f'{name} {messages:6.1f} msgs {size:8.0f} B per client, {elapsed * 1000:7.0f} ms')
+    print(f'clients={count:<5} ' + '  |  '.join(results))
+    
+    with contextlib.redirect_stdout(io.StringIO()):
+        for socket in sockets:
+            socket.disconnect()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clients', type=int, nargs='+', default=[10, 100, 1000])
+    args = parser.parse_args()
+    
+    with app_module.app.app_context():
+        add_users(app_module, max(args.clients))
+    for count in args.clients:
+        run(count)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""Shared setup for the benchmark scripts.
+
+Run a benchmark from the app directory as a module, e.g.
+`python -m benchmarks.reminder_dispatch`. load_app() points the app at a
+fresh SQLite file, swaps the Gemini and TTS clients for the offline fakes
+used by the tests and brings the schema up to date with the migrations.
+"""
+import atexit
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load_app(database_url=None):
+    """Import app against a fresh database (a temporary SQLite file by default) and return the module"""
+    if database_url is None:
+        database_url = 'sqlite:///' + os.path.join(temporary_directory(), 'medical_assistant.db')
+    os.environ['DATABASE_URL'] = database_url
+    os.environ['TTS_CACHE_DIR'] = temporary_directory()  # Start with no cached audio
+    
+    os.chdir(APP_DIR)  # Flask-Migrate finds migrations/ relative to the working directory
+    if APP_DIR not in sys.path:
+        sys.path.insert(0, APP_DIR)
+    
+    from tests import fakes
+    fakes.install()
+    
+    import app as app_module
+    from flask_migrate import upgrade
+    
+    with app_module.app.app_context():
+        upgrade()
+    return app_module
+
+
+def temporary_directory():
+    """A directory that is removed when the benchmark exits"""
+    path = tempfile.mkdtemp(prefix='bench-')
+    atexit.register(shutil.rmtree, path, ignore_errors=True)
+    return path
+
+
+def add_users(app_module, count):
+    """Insert users 1..count with a known password and return their ids"""
+    from werkzeug.security import generate_password_hash
+    
+    password_hash = generate_password_hash('secret123')
+    app_module.db.session.execute(app_module.User.__table__.insert(), [
+        {'id': user_id, 'username': f'user{user_id}', 'email': f'user{user_id}@example.com',
+         'password_hash': password_hash, 'timezone': 'UTC'}
+        for user_id in range(1, count + 1)
+    ])
+    app_module.db.session.commit()
+    return list(range(1, count + 1))
+
+
+def logged_in_client(app_module, user_id):
+    """A Flask test client whose session belongs to user_id"""
+    client = app_module.app.test_client()
+    with client.session_transaction() as session:
+        session['user_id'] = user_id
+    return client
+
+
+def timed(function, *args, **kwargs):
+    """Call function and return (result, elapsed seconds)"""
+    started = time.perf_counter()
+    result = function(*args, **kwargs)
+    return result, time.perf_counter() - started
+
+
+def percentiles(samples):
+    """Return (p50, p99) of samples in milliseconds"""
+    ordered = sorted(samples)
+    return statistics.median(ordered) * 1000, ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))] * 1000
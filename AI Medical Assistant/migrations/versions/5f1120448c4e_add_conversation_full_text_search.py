@@ -0,0 +1,69 @@
+"""Add conversation full-text search
+
+SQLite gets an external-content FTS5 table kept in sync by triggers; Postgres
+gets a generated tsvector column with a GIN index. Batch migrations of the
+conversation table copy and drop it, which drops the SQLite triggers, so they
+must be recreated afterwards.
+
+Revision ID: 5f1120448c4e
+Revises: 4ff210299bc9
+Create Date: 2026-10-17 06:53:40.796341
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '5f1120448c4e'
+down_revision = '4ff210299bc9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+
+    if dialect == 'sqlite':
+        op.execute("""
+            CREATE VIRTUAL TABLE conversation_fts USING fts5(
+                message, response, content='conversation', content_rowid='id', tokenize='porter unicode61'
+            )
+        """)
+        op.execute("""
+            CREATE TRIGGER conversation_fts_insert AFTER INSERT ON conversation BEGIN
+                INSERT INTO conversation_fts(rowid, message, response) VALUES (new.id, new.message, new.response);
+            END
+        """)
+        op.execute("""
+            CREATE TRIGGER conversation_fts_delete AFTER DELETE ON conversation BEGIN
+                INSERT INTO conversation_fts(conversation_fts, rowid, message, response) VALUES ('delete', old.id, old.message, old.response);
+            END
+        """)
+        op.execute("""
+            CREATE TRIGGER conversation_fts_update AFTER UPDATE OF message, response ON conversation BEGIN
+                INSERT INTO conversation_fts(conversation_fts, rowid, message, response) VALUES ('delete', old.id, old.message, old.response);
+                INSERT INTO conversation_fts(rowid, message, response) VALUES (new.id, new.message, new.response);
+            END
+        """)
+        # Index the existing history
+        op.execute("INSERT INTO conversation_fts(conversation_fts) VALUES ('rebuild')")
+    elif dialect == 'postgresql':
+        op.execute("""
+            ALTER TABLE conversation ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+                to_tsvector('english', coalesce(message, '') || ' ' || coalesce(response, ''))
+            ) STORED
+        """)
+        op.execute("CREATE INDEX ix_conversation_search_vector ON conversation USING GIN (search_vector)")
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+
+    if dialect == 'sqlite':
+        op.execute("DROP TRIGGER IF EXISTS conversation_fts_update")
+        op.execute("DROP TRIGGER IF EXISTS conversation_fts_delete")
+        op.execute("DROP TRIGGER IF EXISTS conversation_fts_insert")
+        op.execute("DROP TABLE IF EXISTS conversation_fts")
+    elif dialect == 'postgresql':
+        op.execute("DROP INDEX IF EXISTS ix_conversation_search_vector")
+        op.execute("ALTER TABLE conversation DROP COLUMN IF EXISTS search_vector")
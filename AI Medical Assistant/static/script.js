@@ -2,16 +2,183 @@
 let socket;
 let userId = null;
 let speechRecognition = null;
-let currentActiveTimers = [];
+let timerTickInterval = null; // Single loop that redraws every running timer
+let chatJobWaiters = new Map(); // job_id -> resolve callback for /ai/chat results
+let chatJobResults = new Map(); // Results that arrived before anyone was waiting
+let chatJobChunkHandlers = new Map(); // job_id -> callback for streamed text chunks
 
-// Chat Intelligence: Processes chat requests locally first, then fallback to Gemini API
-class ChatIntelligence {
+// Client-side store of the user's data. It is filled by a single /bootstrap request
+// and refreshed one dataset at a time after changes; the page renderers,
+// ChatIntelligence and HealthAnalytics all read from it.
+class DataStore {
     constructor() {
+        this.profile = null;
         this.medications = [];
         this.appointments = [];
         this.timers = [];
-        this.userProfile = null;
-        this.healthInsights = [];
+        this.insights = [];
+        this.loaded = false;
+        this.listeners = {};
+        // Server revision each list was last synced at; refresh() then fetches only the changes
+        this.revisions = {};
+        
+        // Same orders as the list endpoints
+        const byTime = (a, b) => new Date(a) - new Date(b);
+        this.orders = {
+            medications: (a, b) => a.id - b.id,
+            appointments: (a, b) => byTime(a.date_time, b.date_time) || a.id - b.id,
+            timers: (a, b) => byTime(a.created_at, b.created_at) || a.id - b.id,
+            // Unread first, newest first
+            insights: (a, b) => (a.is_read - b.is_read) || byTime(b.generated_at, a.generated_at) || b.id - a.id
+        };
+        this.endpoints = {
+            profile: '/profile',
+            medications: '/medications?reminders=none',
+            appointments: '/appointments?reminders=none',
+            timers: '/timers',
+            insights: '/insights'
+        };
+    }
+    
+    // Call listener(data) whenever a dataset changes
+    subscribe(kind, listener) {
+        if (!this.listeners[kind]) {
+            this.listeners[kind] = [];
+        }
+        this.listeners[kind].push(listener);
+    }
+    
+    set(kind, data) {
+        this[kind] = data;
+        
+        (this.listeners[kind] || []).forEach(listener => {
+            try {
+                listener(data);
+            } catch (error) {
+                console.error(`Error rendering ${kind}:`, error);
+            }
+        });
+    }
+    
+    // Load every dataset in one request
+    async bootstrap() {
+        try {
+            const { data } = await this.request('/bootstrap');
+            
+            Object.keys(this.endpoints).forEach(kind => {
+                if (kind !== 'profile') {
+                    this.revisions[kind] = data.revision;
+                }
+                this.set(kind, data[kind]);
+            });
+            this.loaded = true;
+            
+            // Lists longer than the first page continue from the returned cursors
+            await Promise.all(Object.entries(data.cursors || {})
+                .filter(([kind, cursor]) => cursor)
+                .map(async ([kind, cursor]) => {
+                    const { rows } = await this.fetchPages(kind, cursor);
+                    this.set(kind, this[kind].concat(rows));
+                }));
+        } catch (error) {
+            console.error('Error loading dashboard data:', error);
+        }
+    }
+    
+    async request(url) {
+        const response = await fetch(url, {
+            method: 'GET',
+            headers: { 'Content-Type': 'application/json' }
+        });
+        const data = await response.json();
+        
+        if (data.error) {
+            throw new Error(data.error);
+        }
+        return { data, response };
+    }
+    
+    withParam(url, name, value) {
+        return `${url}${url.includes('?') ? '&' : '?'}${name}=${encodeURIComponent(value)}`;
+    }
+    
+    // Fetch a whole list page by page, following X-Next-Cursor
+    async fetchPages(kind, after = null) {
+        const endpoint = this.endpoints[kind];
+        let rows = [];
+        let revision = null;
+        
+        do {
+            const { data, response } = await this.request(after ? this.withParam(endpoint, 'after', after) : endpoint);
+            rows = rows.concat(data);
+            
+            // The first page's revision is the oldest, so later deltas never miss a change
+            if (revision === null && response.headers.get('X-Revision') !== null) {
+                revision = parseInt(response.headers.get('X-Revision'), 10);
+            }
+            after = kind === 'insights' ? null : response.headers.get('X-Next-Cursor');
+        } while (after);
+        
+        return { rows, revision };
+    }
+    
+    // Reload a single dataset after it changed: only the rows changed since the last sync
+    // when its revision is known, otherwise the full list
+    async refresh(kind) {
+        try {
+            if (kind === 'profile') {
+                const { data } = await this.request(this.endpoints.profile);
+                this.set(kind, data);
+                return;
+            }
+            
+            const revision = this.revisions[kind];
+            if (revision === undefined) {
+                const { rows, revision: latest } = await this.fetchPages(kind);
+                if (latest !== null) {
+                    this.revisions[kind] = latest;
+                }
+                this.set(kind, rows);
+                return;
+            }
+            
+            const { data } = await this.request(this.withParam(this.endpoints[kind], 'since', revision));
+            this.revisions[kind] = data.revision;
+            if (data.changed.length || data.deleted.length) {
+                this.set(kind, this.merge(kind, data.changed, data.deleted));
+            }
+        } catch (error) {
+            console.error(`Error loading ${kind}:`, error);
+        }
+    }
+    
+    // Apply a delta to a list: replace changed rows, add new ones, drop deleted ones,
+    // and keep the server's order
+    merge(kind, changed, deleted) {
+        const rows = new Map(this[kind].map(row => [row.id, row]));
+        
+        deleted.forEach(id => rows.delete(id));
+        changed.forEach(row => rows.set(row.id, row));
+        
+        const merged = Array.from(rows.values()).sort(this.orders[kind]);
+        
+        // The insight feed shows the first 10 only
+        return kind === 'insights' ? merged.slice(0, 10) : merged;
+    }
+}
+
+const dataStore = new DataStore();
+
+// Page renderers redraw whenever their dataset changes
+dataStore.subscribe('profile', renderUserProfile);
+dataStore.subscribe('medications', renderMedications);
+dataStore.subscribe('appointments', renderAppointments);
+dataStore.subscribe('timers', renderTimers);
+dataStore.subscribe('insights', renderHealthInsights);
+
+// Chat Intelligence: Processes chat requests locally first, then fallback to Gemini API
+class ChatIntelligence {
+    constructor() {
         this.commandPatterns = {
             // Medication related commands
             addMedication: [
@@ -93,56 +260,41 @@ class ChatIntelligence {
         };
     }
     
+    // User data lives in the shared store
+    get medications() {
+        return dataStore.medications;
+    }
+    
+    get appointments() {
+        return dataStore.appointments;
+    }
+    
+    get timers() {
+        return dataStore.timers;
+    }
+    
+    get userProfile() {
+        return dataStore.profile;
+    }
+    
+    get healthInsights() {
+        return dataStore.insights;
+    }
+    
     async initialize() {
-        await this.refreshLocalData();
+        if (!dataStore.loaded) {
+            await this.refreshLocalData();
+        }
     }
     
-    // Refresh all local data
+    // Refresh all local data (one /bootstrap request)
     async refreshLocalData() {
-        try {
-            // Load medications
-            const medicationsResponse = await fetch('/medications', {
-                method: 'GET',
-                headers: { 'Content-Type': 'application/json' }
-            });
-            this.medications = await medicationsResponse.json();
-            
-            // Load appointments
-            const appointmentsResponse = await fetch('/appointments', {
-                method: 'GET',
-                headers: { 'Content-Type': 'application/json' }
-            });
-            this.appointments = await appointmentsResponse.json();
-            
-            // Load timers
-            const timersResponse = await fetch('/timers', {
-                method: 'GET',
-                headers: { 'Content-Type': 'application/json' }
-            });
-            this.timers = await timersResponse.json();
-            
-            // Load user profile
-            const profileResponse = await fetch('/profile', {
-                method: 'GET',
-                headers: { 'Content-Type': 'application/json' }
-            });
-            this.userProfile = await profileResponse.json();
-            
-            // Load health insights
-            const insightsResponse = await fetch('/insights', {
-                method: 'GET',
-                headers: { 'Content-Type': 'application/json' }
-            });
-            this.healthInsights = await insightsResponse.json();
-            
-            console.log('Local data refreshed successfully');
-        } catch (error) {
-            console.error('Error refreshing local data:', error);
-        }
+        await dataStore.bootstrap();
+        console.log('Local data refreshed successfully');
     }
     
-    // Process a chat message
-    async processMessage(message) {
+    // Process a chat message (onChunk receives the answer text as it streams in)
+    async processMessage(message, onChunk = null) {
         try {
             // First check if this is a command to execute an action
             const commandResponse = this.processCommand(message);
@@ -157,7 +309,7 @@ class ChatIntelligence {
             }
             
             // If no local data matches, use Gemini API
-            return await this.queryGeminiAPI(message);
+            return await this.queryGeminiAPI(message, onChunk);
         } catch (error) {
             console.error('Error processing message:', error);
             return 'Sorry, I encountered an error processing your request. Please try again.';
@@ -244,7 +396,7 @@ class ChatIntelligence {
     }
     
     // Query Gemini API for responses
-    async queryGeminiAPI(message) {
+    async queryGeminiAPI(message, onChunk = null) {
         try {
             const response = await fetch('/ai/chat', {
                 method: 'POST',
@@ -255,13 +407,65 @@ class ChatIntelligence {
             });
             
             const data = await response.json();
-            return data.response;
+            
+            if (response.status === 429) {
+                return `The assistant is busy right now. Please try again in ${data.retry_after} seconds.`;
+            }
+            if (data.error) {
+                return 'Sorry, I encountered an error while trying to get an answer. Please try again.';
+            }
+            
+            // The answer is generated in the background and pushed over the socket
+            const result = await this.waitForChatJob(data.job_id, onChunk);
+            return result.response;
         } catch (error) {
             console.error('Error querying Gemini API:', error);
             return 'Sorry, I encountered an error while trying to get an answer. Please try again.';
         }
     }
     
+    // Wait for a chat job result from the socket, polling /ai/jobs as a fallback
+    waitForChatJob(jobId, onChunk = null, timeout = 60000) {
+        if (chatJobResults.has(jobId)) {
+            const result = chatJobResults.get(jobId);
+            chatJobResults.delete(jobId);
+            return Promise.resolve(result);
+        }
+        
+        if (onChunk) {
+            // Accumulate streamed chunks so the callback always gets the text so far
+            let text = '';
+            chatJobChunkHandlers.set(jobId, chunk => {
+                text += chunk;
+                onChunk(text);
+            });
+        }
+        
+        return new Promise((resolve, reject) => {
+            const timer = setTimeout(() => {
+                chatJobWaiters.delete(jobId);
+                chatJobChunkHandlers.delete(jobId);
+                
+                fetch(`/ai/jobs/${jobId}`)
+                    .then(response => response.json())
+                    .then(result => {
+                        if (result.status === 'done') {
+                            resolve(result);
+                        } else {
+                            reject(new Error('Chat response timed out'));
+                        }
+                    })
+                    .catch(reject);
+            }, timeout);
+            
+            chatJobWaiters.set(jobId, result => {
+                clearTimeout(timer);
+                chatJobChunkHandlers.delete(jobId);
+                resolve(result);
+            });
+        });
+    }
+    
     // Helper: Check if message matches any pattern in the array
     matchesAnyPattern(message, patterns) {
         return patterns.some(pattern => this.matchesPattern(message, pattern));
@@ -334,11 +538,8 @@ class ChatIntelligence {
         this.timers.forEach(timer => {
             response += `• ${timer.name} - `;
             
-            if (timer.status === 'Running') {
-                const endTime = new Date(timer.end_time);
-                const now = new Date();
-                const remainingSeconds = Math.max(0, Math.floor((endTime - now) / 1000));
-                response += `Running (${this.formatTime(remainingSeconds)} remaining)\n`;
+            if (timer.status === 'Running' || timer.status === 'Paused') {
+                response += `${timer.status} (${this.formatTime(timerRemainingSeconds(timer))} remaining)\n`;
             } else {
                 response += `${timer.status} (${this.formatTime(timer.duration)})\n`;
             }
@@ -659,7 +860,7 @@ class ChatIntelligence {
     // Create a timer directly
     async createTimer(name, duration) {
         try {
-            const response = await fetch('/timers', {
+            const response = await offlineManager.fetch('/timers', {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json'
@@ -678,7 +879,7 @@ class ChatIntelligence {
             }
             
             // Start the timer
-            await fetch(`/timers/${data.timer_id}/start`, {
+            await offlineManager.fetch(`/timers/${data.timer_id}/start`, {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json'
@@ -1232,31 +1433,11 @@ class VoiceAssistant {
         else {
             addMessageToChat(transcript, 'user');
             
-            fetch('/ai/chat', {
-                method: 'POST',
-                headers: {
-                    'Content-Type': 'application/json'
-                },
-                body: JSON.stringify({ message: transcript })
-            })
-            .then(response => response.json())
-            .then(data => {
-                if (data.error) {
-                    console.error('Chat error:', data.error);
-                    const errorMsg = 'Sorry, I encountered an error. Please try again.';
-                    addMessageToChat(errorMsg, 'assistant');
-                    this.speak(errorMsg);
-                } else {
-                    // Add AI response to chat
-                    addMessageToChat(data.response, 'assistant');
-                    this.speak(data.response);
-                }
-            })
-            .catch(error => {
-                console.error('Chat request error:', error);
-                const errorMsg = 'Sorry, I encountered an error. Please try again.';
-                addMessageToChat(errorMsg, 'assistant');
-                this.speak(errorMsg);
+            chatIntelligence.queryGeminiAPI(transcript)
+            .then(response => {
+                // Add AI response to chat
+                addMessageToChat(response, 'assistant');
+                this.speak(response);
             });
         }
     }
@@ -1275,59 +1456,28 @@ class HealthAnalytics {
     }
     
     init() {
+        // Analytics read the shared store and re-run whenever the data changes
+        dataStore.subscribe('medications', () => this.loadMedicationData());
+        dataStore.subscribe('appointments', () => this.loadAppointmentData());
+        dataStore.subscribe('insights', () => this.loadHealthInsights());
+        
         this.loadMedicationData();
         this.loadAppointmentData();
         this.loadHealthInsights();
     }
     
     loadMedicationData() {
-        fetch('/medications', {
-            method: 'GET',
-            headers: {
-                'Content-Type': 'application/json'
-            }
-        })
-        .then(response => response.json())
-        .then(data => {
-            this.medicationData = data;
-            this.analyzeMedicationAdherence();
-        })
-        .catch(error => {
-            console.error('Error loading medication data for analytics:', error);
-        });
+        this.medicationData = dataStore.medications;
+        this.analyzeMedicationAdherence();
     }
     
     loadAppointmentData() {
-        fetch('/appointments', {
-            method: 'GET',
-            headers: {
-                'Content-Type': 'application/json'
-            }
-        })
-        .then(response => response.json())
-        .then(data => {
-            this.appointmentData = data;
-            this.analyzeAppointmentPatterns();
-        })
-        .catch(error => {
-            console.error('Error loading appointment data for analytics:', error);
-        });
+        this.appointmentData = dataStore.appointments;
+        this.analyzeAppointmentPatterns();
     }
     
     loadHealthInsights() {
-        fetch('/insights', {
-            method: 'GET',
-            headers: {
-                'Content-Type': 'application/json'
-            }
-        })
-        .then(response => response.json())
-        .then(data => {
-            this.healthInsights = data;
-        })
-        .catch(error => {
-            console.error('Error loading health insights for analytics:', error);
-        });
+        this.healthInsights = dataStore.insights;
     }
     
     analyzeMedicationAdherence() {
@@ -1338,7 +1488,12 @@ class HealthAnalytics {
         let missed = 0;
         
         this.medicationData.forEach(med => {
-            if (med.reminders && med.reminders.length > 0) {
+            // The server sends per-medication counts instead of the full reminder history
+            if (med.reminder_stats) {
+                totalReminders += med.reminder_stats.total;
+                takenOnTime += med.reminder_stats.acknowledged;
+                missed += med.reminder_stats.missed;
+            } else if (med.reminders && med.reminders.length > 0) {
                 med.reminders.forEach(reminder => {
                     totalReminders++;
                     
@@ -1424,11 +1579,47 @@ class HealthAnalytics {
     }
 }
 
+// Changes that can be made offline, and the /sync op each request becomes.
+// Rows created offline get their idempotency key as a temporary id, which
+// later changes (and the server) use to refer to them.
+const SYNC_ROUTES = [
+    { method: 'POST', pattern: /^\/profile$/, op: 'profile.update' },
+    { method: 'POST', pattern: /^\/medications$/, op: 'medication.create', idField: 'medication_id' },
+    { method: 'PUT', pattern: /^\/medications\/([^/]+)$/, op: 'medication.update' },
+    { method: 'DELETE', pattern: /^\/medications\/([^/]+)$/, op: 'medication.delete' },
+    { method: 'POST', pattern: /^\/appointments$/, op: 'appointment.create', idField: 'appointment_id' },
+    { method: 'DELETE', pattern: /^\/appointments\/([^/]+)$/, op: 'appointment.delete' },
+    { method: 'POST', pattern: /^\/timers$/, op: 'timer.create', idField: 'timer_id' },
+    { method: 'POST', pattern: /^\/timers\/([^/]+)\/(?:start|resume)$/, op: 'timer.start' },
+    { method: 'POST', pattern: /^\/timers\/([^/]+)\/pause$/, op: 'timer.pause' },
+    { method: 'POST', pattern: /^\/timers\/([^/]+)\/reset$/, op: 'timer.reset' },
+    { method: 'POST', pattern: /^\/insights\/([^/]+)\/read$/, op: 'insight.read' }
+];
+
+// DataStore dataset changed by each kind of op
+const SYNC_KINDS = {
+    profile: 'profile',
+    medication: 'medications',
+    appointment: 'appointments',
+    timer: 'timers',
+    insight: 'insights'
+};
+
+const SYNC_BATCH_SIZE = 500; // The server's SYNC_MAX_MUTATIONS
+
 // Enhanced offline support
+// Changes made while offline go to an append-only log in IndexedDB. Before a
+// change is appended it is coalesced with the entries not yet sent: repeated
+// updates merge, and a delete of a row created offline drops the create and
+// everything queued for it. On reconnect the log is replayed in order with one
+// POST /sync, which applies it atomically and skips keys it has already seen.
 class OfflineManager {
     constructor() {
         this.isOnline = navigator.onLine;
-        this.pendingRequests = [];
+        this.log = []; // In-memory mirror of the IndexedDB log, in seq order
+        this.db = null;
+        this.ready = null;
+        this.flushing = null;
         this.initialized = false;
         
         window.addEventListener('online', this.handleOnlineStatusChange.bind(this));
@@ -1436,24 +1627,77 @@ class OfflineManager {
     }
     
     init() {
-        if (this.initialized) return;
+        if (this.initialized) return this.ready;
+        this.initialized = true;
         
-        // Check if local storage has pending requests
-        const storedRequests = localStorage.getItem('pendingRequests');
-        if (storedRequests) {
-            try {
-                this.pendingRequests = JSON.parse(storedRequests);
-            } catch (e) {
-                console.error('Error parsing stored requests:', e);
-                localStorage.removeItem('pendingRequests');
+        this.ready = this.openLog()
+            .then(() => this.migrateLegacyQueue())
+            .catch(error => {
+                // Without IndexedDB the log lives in memory for this page only
+                console.error('Offline log unavailable:', error);
+                this.db = null;
+            });
+        
+        // Replay anything left over from the last session if we're online
+        this.ready.then(() => {
+            if (this.isOnline && this.log.length > 0) {
+                this.flush();
             }
-        }
+        });
+        return this.ready;
+    }
+    
+    openLog() {
+        return new Promise((resolve, reject) => {
+            if (!window.indexedDB) {
+                reject(new Error('IndexedDB is not supported'));
+                return;
+            }
+            
+            const request = indexedDB.open('medical-assistant-offline', 1);
+            request.onupgradeneeded = () => {
+                request.result.createObjectStore('mutations', { keyPath: 'seq', autoIncrement: true });
+            };
+            request.onsuccess = () => {
+                this.db = request.result;
+                const getAll = this.db.transaction('mutations').objectStore('mutations').getAll();
+                getAll.onsuccess = () => {
+                    this.log = getAll.result;
+                    resolve();
+                };
+                getAll.onerror = () => reject(getAll.error);
+            };
+            request.onerror = () => reject(request.error);
+        });
+    }
+    
+    // Run fn(store) in a readwrite transaction; resolves when it has committed
+    write(fn) {
+        if (!this.db) return Promise.resolve();
         
-        this.initialized = true;
+        return new Promise((resolve, reject) => {
+            const tx = this.db.transaction('mutations', 'readwrite');
+            const result = fn(tx.objectStore('mutations'));
+            tx.oncomplete = () => resolve(result && result.result);
+            tx.onerror = () => reject(tx.error);
+        }).catch(error => console.error('Error writing offline log:', error));
+    }
+    
+    // Requests queued in localStorage by earlier versions become log entries
+    async migrateLegacyQueue() {
+        const storedRequests = localStorage.getItem('pendingRequests');
+        if (!storedRequests) return;
+        localStorage.removeItem('pendingRequests');
         
-        // Process any pending requests if we're online
-        if (this.isOnline && this.pendingRequests.length > 0) {
-            this.processPendingRequests();
+        try {
+            for (const requestInfo of JSON.parse(storedRequests)) {
+                const mutation = this.toMutation(requestInfo.url, requestInfo.method, requestInfo.body);
+                if (mutation) {
+                    await this.append(mutation);
+                }
+            }
+        } catch (e) {
+            console.error('Error parsing stored requests:', e);
         }
     }
     
@@ -1463,64 +1707,233 @@ class OfflineManager {
         
         if (!wasOnline && this.isOnline) {
             // Just came back online
-            console.log('Connection restored. Processing pending requests...');
+            console.log('Connection restored. Syncing offline changes...');
             
             // Show toast notification
             this.showNotification('You are back online.');
             
-            // Process any pending requests
-            this.processPendingRequests();
+            this.flush();
         } else if (wasOnline && !this.isOnline) {
             // Just went offline
-            console.log('Connection lost. Requests will be queued.');
+            console.log('Connection lost. Changes will be queued.');
             
             // Show toast notification
             this.showNotification('You are offline. Changes will be saved when your connection is restored.');
         }
     }
     
-    queueRequest(requestInfo) {
-        this.pendingRequests.push(requestInfo);
+    newKey() {
+        if (window.crypto && crypto.randomUUID) {
+            return crypto.randomUUID();
+        }
+        return `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}`;
+    }
+    
+    // Turn a request into a /sync mutation, or null if it can't be made offline
+    toMutation(url, method = 'GET', body = null) {
+        const path = url.split('?')[0];
+        
+        for (const route of SYNC_ROUTES) {
+            const match = route.method === method.toUpperCase() && path.match(route.pattern);
+            if (!match) continue;
+            
+            const mutation = { key: this.newKey(), op: route.op };
+            if (match[1] !== undefined) {
+                // Numeric ids are server rows; anything else is the key of an offline create
+                mutation.target = /^\d+$/.test(match[1]) ? parseInt(match[1], 10) : decodeURIComponent(match[1]);
+            }
+            if (body) {
+                mutation.data = typeof body === 'string' ? JSON.parse(body) : body;
+            }
+            return { mutation, route };
+        }
+        return null;
+    }
+    
+    // Entries that have not been sent yet. Sending starts at the front, so they are a suffix of the log.
+    unsent() {
+        return this.log.filter(entry => !entry.attempted);
+    }
+    
+    // Add a mutation to the log, coalescing it with the unsent entries
+    async append({ mutation }) {
+        const kind = mutation.op.split('.')[0];
+        const action = mutation.op.split('.')[1];
+        const unsent = this.unsent();
+        const targets = entry => entry.mutation.op.startsWith(`${kind}.`) && entry.mutation.target === mutation.target;
+        const localCreate = unsent.find(entry => entry.mutation.op === `${kind}.create` && entry.mutation.key === mutation.target);
+        
+        // Repeated profile updates and repeated updates of one row merge into the first
+        const merged = action === 'update' && (
+            kind === 'profile'
+                ? unsent.find(entry => entry.mutation.op === 'profile.update')
+                : localCreate || unsent.find(entry => entry.mutation.op === mutation.op && targets(entry))
+        );
+        if (merged) {
+            merged.mutation.data = { ...merged.mutation.data, ...mutation.data };
+            await this.write(store => store.put(merged));
+            return;
+        }
+        
+        // Deleting a row created offline cancels the create and everything queued for it
+        if (action === 'delete' && localCreate) {
+            await this.remove([localCreate, ...unsent.filter(targets)]);
+            return;
+        }
+        
+        // A delete or reset supersedes the unsent changes to the same row
+        if (action === 'delete' || action === 'reset') {
+            const superseded = unsent.filter(entry => targets(entry) && (action === 'delete' || /\.(start|pause|reset)$/.test(entry.mutation.op)));
+            await this.remove(superseded);
+            
+            // Resetting a timer that never reached the server leaves it as created
+            if (action === 'reset' && localCreate) return;
+        }
         
-        // Store in local storage for persistence
-        localStorage.setItem('pendingRequests', JSON.stringify(this.pendingRequests));
+        // Marking an insight read twice is the same change
+        if (action === 'read' && this.log.some(entry => entry.mutation.op === mutation.op && targets(entry))) {
+            return;
+        }
         
-        console.log('Request queued for later processing');
+        const entry = { mutation, attempted: false };
+        entry.seq = await this.write(store => store.add(entry));
+        if (entry.seq === undefined) {
+            entry.seq = (this.log.length ? this.log[this.log.length - 1].seq : 0) + 1;
+        }
+        this.log.push(entry);
     }
     
-    processPendingRequests() {
-        if (this.pendingRequests.length === 0) return;
+    async remove(entries) {
+        if (entries.length === 0) return;
         
-        console.log(`Processing ${this.pendingRequests.length} pending requests...`);
+        const seqs = new Set(entries.map(entry => entry.seq));
+        this.log = this.log.filter(entry => !seqs.has(entry.seq));
+        await this.write(store => seqs.forEach(seq => store.delete(seq)));
+    }
+    
+    // Forget every queued change, e.g. when the user logs out
+    clear() {
+        this.log = [];
+        return this.write(store => store.clear());
+    }
+    
+    // Show an offline change in the store so the page reflects it right away
+    applyLocally(mutation) {
+        const [kind, action] = mutation.op.split('.');
+        const storeKind = SYNC_KINDS[kind];
+        const data = mutation.data || {};
         
-        const requests = [...this.pendingRequests];
-        this.pendingRequests = [];
-        localStorage.removeItem('pendingRequests');
+        if (kind === 'profile') {
+            dataStore.set('profile', { ...dataStore.profile, ...data });
+            return;
+        }
         
-        requests.forEach(requestInfo => {
-            fetch(requestInfo.url, {
-                method: requestInfo.method,
-                headers: requestInfo.headers,
-                body: requestInfo.body
-            })
-            .then(response => response.json())
-            .then(data => {
-                console.log('Processed queued request:', data);
-                
-                // Call the success callback if provided
-                if (requestInfo.onSuccess) {
-                    requestInfo.onSuccess(data);
-                }
-            })
-            .catch(error => {
-                console.error('Error processing queued request:', error);
-                
-                // If still failing, re-queue
-                if (error.name !== 'AbortError') {
-                    this.queueRequest(requestInfo);
+        let rows = dataStore[storeKind];
+        const now = new Date();
+        const update = changes => {
+            rows = rows.map(row => String(row.id) === String(mutation.target) ? { ...row, ...changes(row) } : row);
+        };
+        
+        if (action === 'create') {
+            const defaults = {
+                medication: { status: 'Pending' },
+                appointment: { status: 'Scheduled' },
+                timer: { status: 'Ready', elapsed: 0, created_at: now.toISOString() }
+            };
+            rows = rows.concat([{ ...defaults[kind], ...data, id: mutation.key }]);
+        } else if (action === 'update') {
+            update(() => data);
+        } else if (action === 'delete') {
+            rows = rows.filter(row => String(row.id) !== String(mutation.target));
+        } else if (action === 'start') {
+            // Timer end times are naive UTC, like the server's
+            update(row => ({
+                status: 'Running',
+                end_time: new Date(now.getTime() + (row.duration - (row.status === 'Paused' ? row.elapsed || 0 : 0)) * 1000).toISOString().slice(0, -1)
+            }));
+        } else if (action === 'pause') {
+            update(row => ({ status: 'Paused', elapsed: row.duration - timerRemainingSeconds(row) }));
+        } else if (action === 'reset') {
+            update(() => ({ status: 'Ready', elapsed: 0, start_time: null, end_time: null }));
+        } else if (action === 'read') {
+            update(() => ({ is_read: true }));
+        }
+        
+        dataStore.set(storeKind, rows);
+    }
+    
+    // Replay the log with /sync, a batch per round trip, until it is empty or the server can't be reached
+    flush() {
+        if (!this.flushing) {
+            this.flushing = this.replay().finally(() => {
+                this.flushing = null;
+            });
+        }
+        return this.flushing;
+    }
+    
+    async replay() {
+        await this.ready;
+        const changedKinds = new Set();
+        
+        while (this.isOnline && this.log.length > 0) {
+            const batch = this.log.slice(0, SYNC_BATCH_SIZE);
+            
+            // Once sent, an entry keeps its key and is never coalesced again, so a lost
+            // response is answered from the server's record instead of applied twice
+            const unsent = batch.filter(entry => !entry.attempted);
+            unsent.forEach(entry => {
+                entry.attempted = true;
+            });
+            await this.write(store => unsent.forEach(entry => store.put(entry)));
+            
+            let response;
+            let data;
+            try {
+                response = await fetch('/sync', {
+                    method: 'POST',
+                    headers: {
+                        'Content-Type': 'application/json'
+                    },
+                    body: JSON.stringify({ mutations: batch.map(entry => entry.mutation) })
+                });
+                data = await response.json();
+            } catch (error) {
+                console.error('Error syncing offline changes:', error);
+                break;
+            }
+            
+            if (response.status === 422) {
+                // Nothing of the batch was applied; drop the change that failed and the changes queued for it
+                const failed = batch[data.index];
+                const kind = failed.mutation.op.split('.')[0];
+                await this.remove(this.log.filter(entry =>
+                    entry === failed || (failed.mutation.op.endsWith('.create') && entry.mutation.op.startsWith(`${kind}.`) && entry.mutation.target === failed.mutation.key)
+                ));
+                changedKinds.add(SYNC_KINDS[kind]);
+                this.showNotification(`An offline change could not be saved: ${data.error}`);
+                continue;
+            }
+            
+            if (!response.ok) {
+                // Not signed in, or another tab is syncing; try again on the next reconnect
+                console.error('Error syncing offline changes:', data.error);
+                break;
+            }
+            
+            batch.forEach(entry => changedKinds.add(SYNC_KINDS[entry.mutation.op.split('.')[0]]));
+            await this.remove(batch);
+        }
+        
+        // Swap the temporary rows for the server's once everything is in
+        if (this.log.length === 0) {
+            changedKinds.forEach(kind => {
+                if (kind !== 'profile') {
+                    dataStore.set(kind, dataStore[kind].filter(row => typeof row.id !== 'string'));
                 }
+                dataStore.refresh(kind);
             });
-        });
+        }
     }
     
     showNotification(message) {
@@ -1545,30 +1958,44 @@ class OfflineManager {
         }, 3000);
     }
     
-    // Enhanced fetch function that works offline
-    fetch(url, options = {}, onSuccess = null) {
-        if (!this.isOnline) {
-            // If offline, queue the request
-            const requestInfo = {
-                url,
-                method: options.method || 'GET',
-                headers: options.headers || {},
-                body: options.body || null,
-                onSuccess
-            };
-            
-            this.queueRequest(requestInfo);
-            
-            // Return a promise that resolves with a simulated response
-            return Promise.resolve({
-                ok: true,
-                status: 200,
-                json: () => Promise.resolve({ queued: true, message: 'Request queued for processing when online' })
-            });
+    // Enhanced fetch function that works offline. Changes listed in SYNC_ROUTES
+    // are queued while offline, while earlier changes are still queued (to keep
+    // their order) or when they refer to a row created offline; everything else
+    // is a regular fetch.
+    async fetch(url, options = {}) {
+        const method = options.method || 'GET';
+        const queued = this.toMutation(url, method, options.body || null);
+        
+        if (!queued) {
+            return fetch(url, options);
+        }
+        
+        await this.ready;
+        if (this.isOnline && this.log.length === 0 && typeof queued.mutation.target !== 'string') {
+            try {
+                return await fetch(url, options);
+            } catch (error) {
+                // The request never reached the server; keep the change and send it later
+                if (!(error instanceof TypeError)) throw error;
+            }
+        }
+        
+        await this.append(queued);
+        this.applyLocally(queued.mutation);
+        if (this.isOnline) {
+            this.flush();
         }
         
-        // If online, proceed with the regular fetch
-        return fetch(url, options);
+        // Return a promise that resolves with a simulated response
+        const data = { queued: true, message: 'Change saved and will be synced when online' };
+        if (queued.route.idField) {
+            data[queued.route.idField] = queued.mutation.key;
+        }
+        return {
+            ok: true,
+            status: 202,
+            json: () => Promise.resolve(data)
+        };
     }
 }
 
@@ -1898,7 +2325,7 @@ function bindAuthEvents() {
             headers: {
                 'Content-Type': 'application/json'
             },
-            body: JSON.stringify({ username, email, password })
+            body: JSON.stringify({ username, email, password, timezone: getBrowserTimezone() })
         })
         .then(response => response.json())
         .then(data => {
@@ -1940,7 +2367,7 @@ function bindProfileSetupEvents() {
             return;
         }
         
-        fetch('/profile', {
+        offlineManager.fetch('/profile', {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json'
@@ -1952,7 +2379,8 @@ function bindProfileSetupEvents() {
                 allergies,
                 medical_conditions: medicalConditions,
                 emergency_contact: emergencyContact,
-                preferred_language: language
+                preferred_language: language,
+                timezone: getBrowserTimezone()
             })
         })
         .then(response => response.json())
@@ -1990,13 +2418,17 @@ function bindMainScreenEvents() {
     
     // Logout
     document.getElementById('logout-btn').addEventListener('click', () => {
-        fetch('/logout', {
+        // Send queued offline changes while the session still exists
+        offlineManager.flush()
+        .then(() => fetch('/logout', {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json'
             }
-        })
+        }))
         .then(() => {
+            // Whatever could not be sent belongs to this user only
+            offlineManager.clear();
             localStorage.removeItem('userId');
             localStorage.removeItem('username');
             userId = null;
@@ -2024,8 +2456,9 @@ function bindMainScreenEvents() {
         const medicalConditions = document.getElementById('edit-medical-conditions').value;
         const emergencyContact = document.getElementById('edit-emergency-contact').value;
         const language = document.getElementById('edit-language').value;
+        const timezone = document.getElementById('edit-timezone').value.trim() || getBrowserTimezone();
         
-        fetch('/profile', {
+        offlineManager.fetch('/profile', {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json'
@@ -2037,7 +2470,8 @@ function bindMainScreenEvents() {
                 allergies,
                 medical_conditions: medicalConditions,
                 emergency_contact: emergencyContact,
-                preferred_language: language
+                preferred_language: language,
+                timezone
             })
         })
         .then(response => response.json())
@@ -2082,7 +2516,7 @@ function bindMedicationEvents() {
         const timeOfDay = document.getElementById('medication-time').value;
         const notes = document.getElementById('medication-notes').value;
         
-        fetch('/medications', {
+        offlineManager.fetch('/medications', {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json'
@@ -2107,9 +2541,6 @@ function bindMedicationEvents() {
                 // Reload medications
                 loadMedications();
                 
-                // Refresh ChatIntelligence local data
-                chatIntelligence.refreshLocalData();
-                
                 alert('Medication added successfully!');
             }
         })
@@ -2143,7 +2574,7 @@ function bindAppointmentEvents() {
         // Combine date and time
         const dateTime = new Date(`${date}T${time}`);
         
-        fetch('/appointments', {
+        offlineManager.fetch('/appointments', {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json'
@@ -2169,9 +2600,6 @@ function bindAppointmentEvents() {
                 // Reload appointments
                 loadAppointments();
                 
-                // Refresh ChatIntelligence local data
-                chatIntelligence.refreshLocalData();
-                
                 alert('Appointment added successfully!');
             }
         })
@@ -2207,7 +2635,7 @@ function bindTimerEvents() {
             return;
         }
         
-        fetch('/timers', {
+        offlineManager.fetch('/timers', {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json'
@@ -2229,9 +2657,6 @@ function bindTimerEvents() {
                 // Reload timers
                 loadTimers();
                 
-                // Refresh ChatIntelligence local data
-                chatIntelligence.refreshLocalData();
-                
                 alert('Timer created successfully!');
             }
         })
@@ -2288,11 +2713,22 @@ async function sendChatMessage() {
     addMessageToChat(message, 'user');
     
     try {
-        // Process message with ChatIntelligence
-        const response = await chatIntelligence.processMessage(message);
+        // Process message with ChatIntelligence, rendering streamed text as it arrives
+        let streamingMessage = null;
+        const response = await chatIntelligence.processMessage(message, text => {
+            if (!streamingMessage) {
+                streamingMessage = addMessageToChat(text, 'assistant');
+            } else {
+                setChatMessageText(streamingMessage, text);
+            }
+        });
         
         // Add AI response to chat
-        addMessageToChat(response, 'assistant');
+        if (streamingMessage) {
+            setChatMessageText(streamingMessage, response);
+        } else {
+            addMessageToChat(response, 'assistant');
+        }
         
         // Use text-to-speech for response
         if (voiceAssistant) {
@@ -2326,6 +2762,23 @@ function addMessageToChat(message, sender) {
     const contentDiv = document.createElement('div');
     contentDiv.className = 'message-content';
     
+    messageDiv.appendChild(avatarDiv);
+    messageDiv.appendChild(contentDiv);
+    
+    chatMessages.appendChild(messageDiv);
+    
+    setChatMessageText(messageDiv, message);
+    
+    return messageDiv;
+}
+
+// Function to replace the text of a chat message (used while a response streams in)
+function setChatMessageText(messageDiv, message) {
+    const chatMessages = document.getElementById('chat-messages');
+    const contentDiv = messageDiv.querySelector('.message-content');
+    
+    contentDiv.innerHTML = '';
+    
     // Split message by newlines and create paragraph for each
     const paragraphs = message.split('\n').filter(p => p.trim() !== '');
     paragraphs.forEach(paragraph => {
@@ -2334,11 +2787,6 @@ function addMessageToChat(message, sender) {
         contentDiv.appendChild(p);
     });
     
-    messageDiv.appendChild(avatarDiv);
-    messageDiv.appendChild(contentDiv);
-    
-    chatMessages.appendChild(messageDiv);
-    
     // Scroll to bottom
     chatMessages.scrollTop = chatMessages.scrollHeight;
 }
@@ -2362,20 +2810,9 @@ function showScreen(screenId) {
 
 // Main app initialization
 async function initializeApp() {
-    // Load user profile
-    loadUserProfile();
-    
-    // Load medications
-    loadMedications();
-    
-    // Load appointments
-    loadAppointments();
-    
-    // Load timers
-    loadTimers();
-    
-    // Load health insights
-    loadHealthInsights();
+    // Load profile, medications, appointments, timers and insights in one request;
+    // the page renderers draw from the store as soon as it arrives
+    await dataStore.bootstrap();
     
     // Initialize WebSocket
     initializeSocket();
@@ -2387,116 +2824,112 @@ async function initializeApp() {
     document.dispatchEvent(new Event('appInitialized'));
 }
 
+// IANA timezone of the browser, used for local reminder and insight times
+function getBrowserTimezone() {
+    try {
+        return Intl.DateTimeFormat().resolvedOptions().timeZone || 'UTC';
+    } catch (e) {
+        return 'UTC';
+    }
+}
+
 // Load user profile
 function loadUserProfile() {
-    fetch('/profile', {
-        method: 'GET',
-        headers: {
-            'Content-Type': 'application/json'
-        }
-    })
-    .then(response => response.json())
-    .then(data => {
-        // Update profile section
-        document.getElementById('profile-name').textContent = data.username;
-        document.getElementById('profile-email').textContent = data.email;
-        
-        // Update form fields
-        document.getElementById('edit-height').value = data.height || '';
-        document.getElementById('edit-weight').value = data.weight || '';
-        document.getElementById('edit-blood-type').value = data.blood_type || '';
-        document.getElementById('edit-allergies').value = data.allergies || '';
-        document.getElementById('edit-medical-conditions').value = data.medical_conditions || '';
-        document.getElementById('edit-emergency-contact').value = data.emergency_contact || '';
-        document.getElementById('edit-language').value = data.preferred_language || 'en-US';
-    })
-    .catch(error => {
-        console.error('Error loading profile:', error);
-    });
+    return dataStore.refresh('profile');
+}
+
+// Render the user profile from the store
+function renderUserProfile(data) {
+    // Update profile section
+    document.getElementById('profile-name').textContent = data.username;
+    document.getElementById('profile-email').textContent = data.email;
+    
+    // Update form fields
+    document.getElementById('edit-height').value = data.height || '';
+    document.getElementById('edit-weight').value = data.weight || '';
+    document.getElementById('edit-blood-type').value = data.blood_type || '';
+    document.getElementById('edit-allergies').value = data.allergies || '';
+    document.getElementById('edit-medical-conditions').value = data.medical_conditions || '';
+    document.getElementById('edit-emergency-contact').value = data.emergency_contact || '';
+    document.getElementById('edit-language').value = data.preferred_language || 'en-US';
+    document.getElementById('edit-timezone').value = data.timezone || getBrowserTimezone();
 }
 
 // Load medications
 function loadMedications() {
-    fetch('/medications', {
-        method: 'GET',
-        headers: {
-            'Content-Type': 'application/json'
-        }
-    })
-    .then(response => response.json())
-    .then(medications => {
-        // Update medications table
-        const tableBody = document.getElementById('medications-table-body');
-        tableBody.innerHTML = '';
-        
-        if (medications.length === 0) {
-            const emptyRow = document.createElement('tr');
-            emptyRow.innerHTML = `<td colspan="6" class="empty-list">No medications added yet</td>`;
-            tableBody.appendChild(emptyRow);
-        } else {
-            medications.forEach(med => {
-                const row = document.createElement('tr');
-                
-                row.innerHTML = `
-                    <td>${med.name}</td>
-                    <td>${med.dosage}</td>
-                    <td>${med.frequency}</td>
-                    <td>${med.time_of_day}</td>
-                    <td><span class="status-pill status-${med.status.toLowerCase()}">${med.status}</span></td>
-                    <td class="table-actions">
-                        <button class="edit-btn" data-id="${med.id}"><i class="fas fa-edit"></i></button>
-                        <button class="delete-btn" data-id="${med.id}"><i class="fas fa-trash"></i></button>
-                    </td>
-                `;
-                
-                tableBody.appendChild(row);
-            });
-            
-            // Add event listeners to edit and delete buttons
-            document.querySelectorAll('.edit-btn').forEach(btn => {
-                btn.addEventListener('click', () => {
-                    const medicationId = btn.getAttribute('data-id');
-                    // Add edit functionality here
-                    alert(`Edit medication with ID: ${medicationId}`);
-                });
-            });
+    return dataStore.refresh('medications');
+}
+
+// Render medications from the store
+function renderMedications(medications) {
+    // Update medications table
+    const tableBody = document.getElementById('medications-table-body');
+    tableBody.innerHTML = '';
+    
+    if (medications.length === 0) {
+        const emptyRow = document.createElement('tr');
+        emptyRow.innerHTML = `<td colspan="6" class="empty-list">No medications added yet</td>`;
+        tableBody.appendChild(emptyRow);
+    } else {
+        medications.forEach(med => {
+            const row = document.createElement('tr');
+            
+            row.innerHTML = `
+                <td>${med.name}</td>
+                <td>${med.dosage}</td>
+                <td>${med.frequency}</td>
+                <td>${med.time_of_day}</td>
+                <td><span class="status-pill status-${med.status.toLowerCase()}">${med.status}</span></td>
+                <td class="table-actions">
+                    <button class="edit-btn" data-id="${med.id}"><i class="fas fa-edit"></i></button>
+                    <button class="delete-btn" data-id="${med.id}"><i class="fas fa-trash"></i></button>
+                </td>
+            `;
             
-            document.querySelectorAll('.delete-btn').forEach(btn => {
-                btn.addEventListener('click', () => {
-                    const medicationId = btn.getAttribute('data-id');
-                    if (confirm('Are you sure you want to delete this medication?')) {
-                        deleteMedication(medicationId);
-                    }
-                });
-            });
-        }
-        
-        // Update dashboard card
-        const upcomingMeds = medications.filter(med => med.status === 'Pending');
-        const medList = document.getElementById('medication-list');
-        const medCount = document.getElementById('medication-count');
+            tableBody.appendChild(row);
+        });
         
-        medCount.textContent = upcomingMeds.length;
-        medList.innerHTML = '';
+        // Add event listeners to edit and delete buttons
+        document.querySelectorAll('.edit-btn').forEach(btn => {
+            btn.addEventListener('click', () => {
+                const medicationId = btn.getAttribute('data-id');
+                // Add edit functionality here
+                alert(`Edit medication with ID: ${medicationId}`);
+            });
+        });
         
-        if (upcomingMeds.length === 0) {
-            medList.innerHTML = '<li class="empty-list">No upcoming medications</li>';
-        } else {
-            upcomingMeds.slice(0, 3).forEach(med => {
-                const li = document.createElement('li');
-                li.textContent = `${med.name} (${med.dosage}) - ${med.time_of_day}`;
-                medList.appendChild(li);
+        document.querySelectorAll('.delete-btn').forEach(btn => {
+            btn.addEventListener('click', () => {
+                const medicationId = btn.getAttribute('data-id');
+                if (confirm('Are you sure you want to delete this medication?')) {
+                    deleteMedication(medicationId);
+                }
             });
-        }
-    })
-    .catch(error => {
-        console.error('Error loading medications:', error);
-    });
+        });
+    }
+    
+    // Update dashboard card
+    const upcomingMeds = medications.filter(med => med.status === 'Pending');
+    const medList = document.getElementById('medication-list');
+    const medCount = document.getElementById('medication-count');
+    
+    medCount.textContent = upcomingMeds.length;
+    medList.innerHTML = '';
+    
+    if (upcomingMeds.length === 0) {
+        medList.innerHTML = '<li class="empty-list">No upcoming medications</li>';
+    } else {
+        upcomingMeds.slice(0, 3).forEach(med => {
+            const li = document.createElement('li');
+            li.textContent = `${med.name} (${med.dosage}) - ${med.time_of_day}`;
+            medList.appendChild(li);
+        });
+    }
 }
 
 // Delete medication
 function deleteMedication(medicationId) {
-    fetch(`/medications/${medicationId}`, {
+    offlineManager.fetch(`/medications/${medicationId}`, {
         method: 'DELETE',
         headers: {
             'Content-Type': 'application/json'
@@ -2510,9 +2943,6 @@ function deleteMedication(medicationId) {
             // Reload medications
             loadMedications();
             
-            // Refresh ChatIntelligence local data
-            chatIntelligence.refreshLocalData();
-            
             alert('Medication deleted successfully!');
         }
     })
@@ -2524,96 +2954,89 @@ function deleteMedication(medicationId) {
 
 // Load appointments
 function loadAppointments() {
-    fetch('/appointments', {
-        method: 'GET',
-        headers: {
-            'Content-Type': 'application/json'
-        }
-    })
-    .then(response => response.json())
-    .then(appointments => {
-        // Update appointments table
-        const tableBody = document.getElementById('appointments-table-body');
-        tableBody.innerHTML = '';
-        
-        if (appointments.length === 0) {
-            const emptyRow = document.createElement('tr');
-            emptyRow.innerHTML = `<td colspan="7" class="empty-list">No appointments scheduled yet</td>`;
-            tableBody.appendChild(emptyRow);
-        } else {
-            appointments.forEach(appt => {
-                const date = new Date(appt.date_time);
-                const formattedDate = date.toLocaleDateString();
-                const formattedTime = date.toLocaleTimeString([], { hour: '2-digit', minute: '2-digit' });
-                
-                const row = document.createElement('tr');
-                
-                row.innerHTML = `
-                    <td>${appt.doctor_name}</td>
-                    <td>${appt.specialty || '-'}</td>
-                    <td>${appt.location}</td>
-                    <td>${formattedDate} ${formattedTime}</td>
-                    <td>${appt.purpose || '-'}</td>
-                    <td><span class="status-pill status-${appt.status.toLowerCase()}">${appt.status}</span></td>
-                    <td class="table-actions">
-                        <button class="edit-btn" data-id="${appt.id}"><i class="fas fa-edit"></i></button>
-                        <button class="delete-btn" data-id="${appt.id}"><i class="fas fa-trash"></i></button>
-                    </td>
-                `;
-                
-                tableBody.appendChild(row);
-            });
-            
-            // Add event listeners to edit and delete buttons
-            document.querySelectorAll('.edit-btn').forEach(btn => {
-                btn.addEventListener('click', () => {
-                    const appointmentId = btn.getAttribute('data-id');
-                    // Add edit functionality here
-                    alert(`Edit appointment with ID: ${appointmentId}`);
-                });
-            });
+    return dataStore.refresh('appointments');
+}
+
+// Render appointments from the store
+function renderAppointments(appointments) {
+    // Update appointments table
+    const tableBody = document.getElementById('appointments-table-body');
+    tableBody.innerHTML = '';
+    
+    if (appointments.length === 0) {
+        const emptyRow = document.createElement('tr');
+        emptyRow.innerHTML = `<td colspan="7" class="empty-list">No appointments scheduled yet</td>`;
+        tableBody.appendChild(emptyRow);
+    } else {
+        appointments.forEach(appt => {
+            const date = new Date(appt.date_time);
+            const formattedDate = date.toLocaleDateString();
+            const formattedTime = date.toLocaleTimeString([], { hour: '2-digit', minute: '2-digit' });
+            
+            const row = document.createElement('tr');
+            
+            row.innerHTML = `
+                <td>${appt.doctor_name}</td>
+                <td>${appt.specialty || '-'}</td>
+                <td>${appt.location}</td>
+                <td>${formattedDate} ${formattedTime}</td>
+                <td>${appt.purpose || '-'}</td>
+                <td><span class="status-pill status-${appt.status.toLowerCase()}">${appt.status}</span></td>
+                <td class="table-actions">
+                    <button class="edit-btn" data-id="${appt.id}"><i class="fas fa-edit"></i></button>
+                    <button class="delete-btn" data-id="${appt.id}"><i class="fas fa-trash"></i></button>
+                </td>
+            `;
             
-            document.querySelectorAll('.delete-btn').forEach(btn => {
-                btn.addEventListener('click', () => {
-                    const appointmentId = btn.getAttribute('data-id');
-                    if (confirm('Are you sure you want to delete this appointment?')) {
-                        deleteAppointment(appointmentId);
-                    }
-                });
-            });
-        }
-        
-        // Update dashboard card
-        const upcomingAppts = appointments.filter(appt => appt.status === 'Scheduled');
-        const apptList = document.getElementById('appointment-list');
-        const apptCount = document.getElementById('appointment-count');
+            tableBody.appendChild(row);
+        });
         
-        apptCount.textContent = upcomingAppts.length;
-        apptList.innerHTML = '';
+        // Add event listeners to edit and delete buttons
+        document.querySelectorAll('.edit-btn').forEach(btn => {
+            btn.addEventListener('click', () => {
+                const appointmentId = btn.getAttribute('data-id');
+                // Add edit functionality here
+                alert(`Edit appointment with ID: ${appointmentId}`);
+            });
+        });
         
-        if (upcomingAppts.length === 0) {
-            apptList.innerHTML = '<li class="empty-list">No upcoming appointments</li>';
-        } else {
-            upcomingAppts.sort((a, b) => new Date(a.date_time) - new Date(b.date_time));
-            upcomingAppts.slice(0, 3).forEach(appt => {
-                const date = new Date(appt.date_time);
-                const formattedDate = date.toLocaleDateString();
-                const formattedTime = date.toLocaleTimeString([], { hour: '2-digit', minute: '2-digit' });
-                
-                const li = document.createElement('li');
-                li.textContent = `Dr. ${appt.doctor_name} - ${formattedDate} ${formattedTime}`;
-                apptList.appendChild(li);
+        document.querySelectorAll('.delete-btn').forEach(btn => {
+            btn.addEventListener('click', () => {
+                const appointmentId = btn.getAttribute('data-id');
+                if (confirm('Are you sure you want to delete this appointment?')) {
+                    deleteAppointment(appointmentId);
+                }
             });
-        }
-    })
-    .catch(error => {
-        console.error('Error loading appointments:', error);
-    });
+        });
+    }
+    
+    // Update dashboard card
+    const upcomingAppts = appointments.filter(appt => appt.status === 'Scheduled');
+    const apptList = document.getElementById('appointment-list');
+    const apptCount = document.getElementById('appointment-count');
+    
+    apptCount.textContent = upcomingAppts.length;
+    apptList.innerHTML = '';
+    
+    if (upcomingAppts.length === 0) {
+        apptList.innerHTML = '<li class="empty-list">No upcoming appointments</li>';
+    } else {
+        upcomingAppts.sort((a, b) => new Date(a.date_time) - new Date(b.date_time));
+        upcomingAppts.slice(0, 3).forEach(appt => {
+            const date = new Date(appt.date_time);
+            const formattedDate = date.toLocaleDateString();
+            const formattedTime = date.toLocaleTimeString([], { hour: '2-digit', minute: '2-digit' });
+            
+            const li = document.createElement('li');
+            li.textContent = `Dr. ${appt.doctor_name} - ${formattedDate} ${formattedTime}`;
+            apptList.appendChild(li);
+        });
+    }
 }
 
 // Delete appointment
 function deleteAppointment(appointmentId) {
-    fetch(`/appointments/${appointmentId}`, {
+    offlineManager.fetch(`/appointments/${appointmentId}`, {
         method: 'DELETE',
         headers: {
             'Content-Type': 'application/json'
@@ -2627,9 +3050,6 @@ function deleteAppointment(appointmentId) {
             // Reload appointments
             loadAppointments();
             
-            // Refresh ChatIntelligence local data
-            chatIntelligence.refreshLocalData();
-            
             alert('Appointment deleted successfully!');
         }
     })
@@ -2641,136 +3061,156 @@ function deleteAppointment(appointmentId) {
 
 // Load timers
 function loadTimers() {
-    fetch('/timers', {
-        method: 'GET',
-        headers: {
-            'Content-Type': 'application/json'
-        }
-    })
-    .then(response => response.json())
-    .then(timers => {
-        // Update timers grid
-        const timersGrid = document.getElementById('timers-grid');
-        timersGrid.innerHTML = '';
-        
-        if (timers.length === 0) {
-            const emptyState = document.createElement('div');
-            emptyState.className = 'empty-state';
-            emptyState.innerHTML = `
-                <i class="fas fa-clock empty-icon"></i>
-                <p>No timers yet. Add a timer for your medical tasks.</p>
-            `;
-            timersGrid.appendChild(emptyState);
-        } else {
-            timers.forEach(timer => {
-                const timerCard = document.createElement('div');
-                timerCard.className = 'timer-card';
-                timerCard.id = `timer-${timer.id}`;
-                
-                let displayTime = formatTime(timer.duration);
-                let timerStatus = timer.status;
-                
-                // Create timer controls based on status
-                let controlsHtml = '';
-                if (timerStatus === 'Ready') {
-                    controlsHtml = `
-                        <button class="timer-btn start-btn" data-id="${timer.id}"><i class="fas fa-play"></i></button>
-                    `;
-                } else if (timerStatus === 'Running') {
-                    // Calculate remaining time
-                    const endTime = new Date(timer.end_time);
-                    const now = new Date();
-                    const remainingSeconds = Math.max(0, Math.floor((endTime - now) / 1000));
-                    
-                    displayTime = formatTime(remainingSeconds);
-                    
-                    controlsHtml = `
-                        <button class="timer-btn pause-btn" data-id="${timer.id}"><i class="fas fa-pause"></i></button>
-                        <button class="timer-btn reset-btn" data-id="${timer.id}"><i class="fas fa-undo"></i></button>
-                    `;
-                    
-                    // Add to active timers for updating
-                    if (!currentActiveTimers.includes(timer.id)) {
-                        currentActiveTimers.push(timer.id);
-                        updateTimer(timer.id, endTime);
-                    }
-                } else if (timerStatus === 'Paused') {
-                    controlsHtml = `
-                        <button class="timer-btn start-btn" data-id="${timer.id}"><i class="fas fa-play"></i></button>
-                        <button class="timer-btn reset-btn" data-id="${timer.id}"><i class="fas fa-undo"></i></button>
-                    `;
-                } else if (timerStatus === 'Completed') {
-                    displayTime = "00:00:00";
-                    controlsHtml = `
-                        <button class="timer-btn reset-btn" data-id="${timer.id}"><i class="fas fa-undo"></i></button>
-                    `;
-                }
-                
-                timerCard.innerHTML = `
-                    <div class="timer-name">${timer.name}</div>
-                    <div class="timer-display">${displayTime}</div>
-                    <div class="timer-status">
-                        <span class="status-pill status-${timerStatus.toLowerCase()}">${timerStatus}</span>
-                    </div>
-                    <div class="timer-controls">
-                        ${controlsHtml}
-                    </div>
+    return dataStore.refresh('timers');
+}
+
+// Render timers from the store
+function renderTimers(timers) {
+    // Update timers grid
+    const timersGrid = document.getElementById('timers-grid');
+    timersGrid.innerHTML = '';
+    
+    if (timers.length === 0) {
+        const emptyState = document.createElement('div');
+        emptyState.className = 'empty-state';
+        emptyState.innerHTML = `
+            <i class="fas fa-clock empty-icon"></i>
+            <p>No timers yet. Add a timer for your medical tasks.</p>
+        `;
+        timersGrid.appendChild(emptyState);
+    } else {
+        timers.forEach(timer => {
+            const timerCard = document.createElement('div');
+            timerCard.className = 'timer-card';
+            timerCard.id = `timer-${timer.id}`;
+            
+            let displayTime = formatTime(timerRemainingSeconds(timer));
+            let timerStatus = timer.status;
+            
+            // Create timer controls based on status
+            let controlsHtml = '';
+            if (timerStatus === 'Ready') {
+                controlsHtml = `
+                    <button class="timer-btn start-btn" data-id="${timer.id}"><i class="fas fa-play"></i></button>
                 `;
-                
-                timersGrid.appendChild(timerCard);
-            });
+            } else if (timerStatus === 'Running') {
+                controlsHtml = `
+                    <button class="timer-btn pause-btn" data-id="${timer.id}"><i class="fas fa-pause"></i></button>
+                    <button class="timer-btn reset-btn" data-id="${timer.id}"><i class="fas fa-undo"></i></button>
+                `;
+            } else if (timerStatus === 'Paused') {
+                controlsHtml = `
+                    <button class="timer-btn start-btn" data-id="${timer.id}"><i class="fas fa-play"></i></button>
+                    <button class="timer-btn reset-btn" data-id="${timer.id}"><i class="fas fa-undo"></i></button>
+                `;
+            } else if (timerStatus === 'Completed') {
+                controlsHtml = `
+                    <button class="timer-btn reset-btn" data-id="${timer.id}"><i class="fas fa-undo"></i></button>
+                `;
+            }
             
-            // Add event listeners to timer controls
-            document.querySelectorAll('.start-btn').forEach(btn => {
-                btn.addEventListener('click', () => {
-                    const timerId = btn.getAttribute('data-id');
-                    startTimer(timerId);
-                });
-            });
+            timerCard.innerHTML = `
+                <div class="timer-name">${timer.name}</div>
+                <div class="timer-display">${displayTime}</div>
+                <div class="timer-status">
+                    <span class="status-pill status-${timerStatus.toLowerCase()}">${timerStatus}</span>
+                </div>
+                <div class="timer-controls">
+                    ${controlsHtml}
+                </div>
+            `;
             
-            document.querySelectorAll('.pause-btn').forEach(btn => {
-                btn.addEventListener('click', () => {
-                    const timerId = btn.getAttribute('data-id');
-                    pauseTimer(timerId);
-                });
+            timersGrid.appendChild(timerCard);
+        });
+        
+        // Add event listeners to timer controls
+        document.querySelectorAll('.start-btn').forEach(btn => {
+            btn.addEventListener('click', () => {
+                const timerId = btn.getAttribute('data-id');
+                startTimer(timerId);
             });
-            
-            document.querySelectorAll('.reset-btn').forEach(btn => {
-                btn.addEventListener('click', () => {
-                    const timerId = btn.getAttribute('data-id');
-                    resetTimer(timerId);
-                });
+        });
+        
+        document.querySelectorAll('.pause-btn').forEach(btn => {
+            btn.addEventListener('click', () => {
+                const timerId = btn.getAttribute('data-id');
+                pauseTimer(timerId);
             });
-        }
+        });
         
-        // Update dashboard active timers
-        const activeTimers = timers.filter(timer => timer.status === 'Running');
-        const timerList = document.getElementById('timer-list');
+        document.querySelectorAll('.reset-btn').forEach(btn => {
+            btn.addEventListener('click', () => {
+                const timerId = btn.getAttribute('data-id');
+                resetTimer(timerId);
+            });
+        });
+    }
+    
+    // Update dashboard active timers
+    const activeTimers = timers.filter(timer => timer.status === 'Running');
+    const timerList = document.getElementById('timer-list');
+    
+    timerList.innerHTML = '';
+    
+    if (activeTimers.length === 0) {
+        timerList.innerHTML = '<li class="empty-list">No active timers</li>';
+    } else {
+        activeTimers.forEach(timer => {
+            const li = document.createElement('li');
+            li.dataset.timerId = timer.id;
+            li.textContent = `${timer.name} - ${formatTime(timerRemainingSeconds(timer))} remaining`;
+            timerList.appendChild(li);
+        });
+    }
+    
+    // Keep the countdowns moving while anything is running
+    if (activeTimers.length > 0 && timerTickInterval === null) {
+        timerTickInterval = setInterval(tickTimers, 500);
+    }
+}
+
+// Seconds left on a timer. The server keeps the state: running timers count down to
+// end_time (naive UTC), paused and ready ones keep duration minus the elapsed time.
+function timerRemainingSeconds(timer) {
+    if (timer.status === 'Running') {
+        const endTime = new Date(/[zZ]|[+-]\d\d:\d\d$/.test(timer.end_time) ? timer.end_time : `${timer.end_time}Z`);
+        return Math.max(0, Math.floor((endTime - new Date()) / 1000));
+    }
+    if (timer.status === 'Completed') {
+        return 0;
+    }
+    return Math.max(0, Math.floor(timer.duration - (timer.elapsed || 0)));
+}
+
+// Shared tick for every running timer. Completion itself comes from the server
+// as a timer_completed notification, so the loop only redraws.
+function tickTimers() {
+    const activeTimers = dataStore.timers.filter(timer => timer.status === 'Running');
+    
+    if (activeTimers.length === 0) {
+        clearInterval(timerTickInterval);
+        timerTickInterval = null;
+        return;
+    }
+    
+    activeTimers.forEach(timer => {
+        const remaining = formatTime(timerRemainingSeconds(timer));
         
-        timerList.innerHTML = '';
+        const timerElement = document.querySelector(`#timer-${timer.id} .timer-display`);
+        if (timerElement) {
+            timerElement.textContent = remaining;
+        }
         
-        if (activeTimers.length === 0) {
-            timerList.innerHTML = '<li class="empty-list">No active timers</li>';
-        } else {
-            activeTimers.forEach(timer => {
-                const li = document.createElement('li');
-                const endTime = new Date(timer.end_time);
-                const now = new Date();
-                const remainingSeconds = Math.max(0, Math.floor((endTime - now) / 1000));
-                
-                li.textContent = `${timer.name} - ${formatTime(remainingSeconds)} remaining`;
-                timerList.appendChild(li);
-            });
+        const timerListItem = document.querySelector(`#timer-list li[data-timer-id="${timer.id}"]`);
+        if (timerListItem) {
+            timerListItem.textContent = `${timer.name} - ${remaining} remaining`;
         }
-    })
-    .catch(error => {
-        console.error('Error loading timers:', error);
     });
 }
 
 // Timer control functions
 function startTimer(timerId) {
-    fetch(`/timers/${timerId}/start`, {
+    offlineManager.fetch(`/timers/${timerId}/start`, {
         method: 'POST',
         headers: {
             'Content-Type': 'application/json'
@@ -2783,9 +3223,6 @@ function startTimer(timerId) {
         } else {
             // Reload timers
             loadTimers();
-            
-            // Refresh ChatIntelligence local data
-            chatIntelligence.refreshLocalData();
         }
     })
     .catch(error => {
@@ -2796,7 +3233,7 @@ function startTimer(timerId) {
 
 function pauseTimer(timerId) {
     // Implement pause timer functionality
-    fetch(`/timers/${timerId}/pause`, {
+    offlineManager.fetch(`/timers/${timerId}/pause`, {
         method: 'POST',
         headers: {
             'Content-Type': 'application/json'
@@ -2809,9 +3246,6 @@ function pauseTimer(timerId) {
         } else {
             // Reload timers
             loadTimers();
-            
-            // Refresh ChatIntelligence local data
-            chatIntelligence.refreshLocalData();
         }
     })
     .catch(error => {
@@ -2822,7 +3256,7 @@ function pauseTimer(timerId) {
 
 function resetTimer(timerId) {
     // Implement reset timer functionality
-    fetch(`/timers/${timerId}/reset`, {
+    offlineManager.fetch(`/timers/${timerId}/reset`, {
         method: 'POST',
         headers: {
             'Content-Type': 'application/json'
@@ -2835,9 +3269,6 @@ function resetTimer(timerId) {
         } else {
             // Reload timers
             loadTimers();
-            
-            // Refresh ChatIntelligence local data
-            chatIntelligence.refreshLocalData();
         }
     })
     .catch(error => {
@@ -2846,41 +3277,6 @@ function resetTimer(timerId) {
     });
 }
 
-function updateTimer(timerId, endTime) {
-    const timerElement = document.querySelector(`#timer-${timerId} .timer-display`);
-    
-    if (!timerElement) return;
-    
-    const interval = setInterval(() => {
-        const now = new Date();
-        const remainingSeconds = Math.max(0, Math.floor((endTime - now) / 1000));
-        
-        timerElement.textContent = formatTime(remainingSeconds);
-        
-        // Update dashboard timer list
-        const timerListItem = Array.from(document.querySelectorAll('#timer-list li')).find(li => 
-            li.textContent.includes(document.querySelector(`#timer-${timerId} .timer-name`).textContent)
-        );
-        
-        if (timerListItem) {
-            timerListItem.textContent = `${document.querySelector(`#timer-${timerId} .timer-name`).textContent} - ${formatTime(remainingSeconds)} remaining`;
-        }
-        
-        if (remainingSeconds <= 0) {
-            clearInterval(interval);
-            
-            // Remove from active timers
-            currentActiveTimers = currentActiveTimers.filter(id => id !== timerId);
-            
-            // Reload timers to update UI
-            loadTimers();
-            
-            // Refresh ChatIntelligence local data
-            chatIntelligence.refreshLocalData();
-        }
-    }, 1000);
-}
-
 // Format time (seconds) to HH:MM:SS
 function formatTime(seconds) {
     const hours = Math.floor(seconds / 3600);
@@ -2896,72 +3292,65 @@ function formatTime(seconds) {
 
 // Load health insights
 function loadHealthInsights() {
-    fetch('/insights', {
-        method: 'GET',
-        headers: {
-            'Content-Type': 'application/json'
-        }
-    })
-    .then(response => response.json())
-    .then(insights => {
-        // Update insights grid
-        const insightsGrid = document.getElementById('insights-grid');
-        insightsGrid.innerHTML = '';
-        
-        if (insights.length === 0) {
-            const emptyState = document.createElement('div');
-            emptyState.className = 'empty-state';
-            emptyState.innerHTML = `
-                <i class="fas fa-lightbulb empty-icon"></i>
-                <p>No health insights yet. They will be generated based on your profile and activities.</p>
+    return dataStore.refresh('insights');
+}
+
+// Render health insights from the store
+function renderHealthInsights(insights) {
+    // Update insights grid
+    const insightsGrid = document.getElementById('insights-grid');
+    insightsGrid.innerHTML = '';
+    
+    if (insights.length === 0) {
+        const emptyState = document.createElement('div');
+        emptyState.className = 'empty-state';
+        emptyState.innerHTML = `
+            <i class="fas fa-lightbulb empty-icon"></i>
+            <p>No health insights yet. They will be generated based on your profile and activities.</p>
+        `;
+        insightsGrid.appendChild(emptyState);
+    } else {
+        insights.forEach(insight => {
+            const date = new Date(insight.generated_at);
+            const formattedDate = date.toLocaleDateString();
+            const formattedTime = date.toLocaleTimeString([], { hour: '2-digit', minute: '2-digit' });
+            
+            const card = document.createElement('div');
+            card.className = `insight-card${insight.is_read ? '' : ' unread'}`;
+            card.dataset.id = insight.id;
+            
+            card.innerHTML = `
+                <div class="insight-type">${insight.type}</div>
+                <div class="insight-content">${insight.content}</div>
+                <div class="insight-date">${formattedDate} ${formattedTime}</div>
             `;
-            insightsGrid.appendChild(emptyState);
-        } else {
-            insights.forEach(insight => {
-                const date = new Date(insight.generated_at);
-                const formattedDate = date.toLocaleDateString();
-                const formattedTime = date.toLocaleTimeString([], { hour: '2-digit', minute: '2-digit' });
-                
-                const card = document.createElement('div');
-                card.className = `insight-card${insight.is_read ? '' : ' unread'}`;
-                card.dataset.id = insight.id;
-                
-                card.innerHTML = `
-                    <div class="insight-type">${insight.type}</div>
-                    <div class="insight-content">${insight.content}</div>
-                    <div class="insight-date">${formattedDate} ${formattedTime}</div>
-                `;
-                
-                card.addEventListener('click', () => {
-                    markInsightAsRead(insight.id);
-                });
-                
-                insightsGrid.appendChild(card);
-            });
-        }
-        
-        // Update dashboard insights
-        const insightList = document.getElementById('insight-list');
-        insightList.innerHTML = '';
-        
-        if (insights.length === 0) {
-            insightList.innerHTML = '<li class="empty-list">No health insights yet</li>';
-        } else {
-            insights.slice(0, 3).forEach(insight => {
-                const li = document.createElement('li');
-                li.textContent = truncateText(insight.content, 100);
-                insightList.appendChild(li);
+            
+            card.addEventListener('click', () => {
+                markInsightAsRead(insight.id);
             });
-        }
-    })
-    .catch(error => {
-        console.error('Error loading insights:', error);
-    });
+            
+            insightsGrid.appendChild(card);
+        });
+    }
+    
+    // Update dashboard insights
+    const insightList = document.getElementById('insight-list');
+    insightList.innerHTML = '';
+    
+    if (insights.length === 0) {
+        insightList.innerHTML = '<li class="empty-list">No health insights yet</li>';
+    } else {
+        insights.slice(0, 3).forEach(insight => {
+            const li = document.createElement('li');
+            li.textContent = truncateText(insight.content, 100);
+            insightList.appendChild(li);
+        });
+    }
 }
 
 // Mark insight as read
 function markInsightAsRead(insightId) {
-    fetch(`/insights/${insightId}/read`, {
+    offlineManager.fetch(`/insights/${insightId}/read`, {
         method: 'POST',
         headers: {
             'Content-Type': 'application/json'
@@ -2976,8 +3365,8 @@ function markInsightAsRead(insightId) {
                 insightCard.classList.remove('unread');
             }
             
-            // Refresh ChatIntelligence local data
-            chatIntelligence.refreshLocalData();
+            // Refresh the shared store (dashboard list and ChatIntelligence)
+            loadHealthInsights();
         }
     })
     .catch(error => {
@@ -2992,50 +3381,79 @@ function initializeSocket() {
     socket.on('connect', () => {
         console.log('Connected to WebSocket');
         
-        // Join user-specific channel
-        socket.emit('join_user_channel', { user_id: userId });
+        // Join the logged-in user's room (the server takes the user from the session)
+        socket.emit('join_user_channel', {});
+        
+        // Replay changes made offline in one /sync request
+        offlineManager.flush();
+        
+        // Catch up on timer changes pushed while disconnected
+        if (dataStore.loaded) {
+            loadTimers();
+        }
+    });
+    
+    // Timers started, paused or reset in any tab or device
+    socket.on('timer_update', (timer) => {
+        dataStore.set('timers', dataStore.merge('timers', [timer], []));
     });
     
-    socket.on(`notification_${userId}`, (notification) => {
-        // Handle notification
-        console.log('New notification:', notification);
+    // Events are sent only to this user's room, so no per-user event names are needed
+    socket.on('notification', (payload) => {
+        // Reminders that fall due together arrive as a single batch payload
+        const notifications = payload.type === 'notification_batch' ? payload.notifications : [payload];
+        const types = new Set();
         
-        // Create notification item
-        addNotification(notification);
+        notifications.forEach(notification => {
+            // Handle notification
+            console.log('New notification:', notification);
+            
+            // Create notification item
+            addNotification(notification);
+            
+            types.add(notification.type);
+        });
         
         // Update notification count
         updateNotificationCount();
         
         // If it's a timer completion, update timers
-        if (notification.type === 'timer_completed') {
+        if (types.has('timer_completed')) {
             loadTimers();
-            
-            // Refresh ChatIntelligence local data
-            chatIntelligence.refreshLocalData();
         }
         
         // If it's a health insight, update insights
-        if (notification.type === 'health_insight') {
+        if (types.has('health_insight')) {
             loadHealthInsights();
-            
-            // Refresh ChatIntelligence local data
-            chatIntelligence.refreshLocalData();
         }
         
         // If it's a medication reminder, update medications
-        if (notification.type === 'medication_reminder') {
+        if (types.has('medication_reminder')) {
             loadMedications();
-            
-            // Refresh ChatIntelligence local data
-            chatIntelligence.refreshLocalData();
         }
         
         // If it's an appointment reminder, update appointments
-        if (notification.type === 'appointment_reminder') {
+        if (types.has('appointment_reminder')) {
             loadAppointments();
-            
-            // Refresh ChatIntelligence local data
-            chatIntelligence.refreshLocalData();
+        }
+    });
+    
+    socket.on('chat_chunk', (chunk) => {
+        const handler = chatJobChunkHandlers.get(chunk.job_id);
+        
+        if (handler) {
+            handler(chunk.text);
+        }
+    });
+    
+    socket.on('chat_response', (result) => {
+        const resolve = chatJobWaiters.get(result.job_id);
+        
+        if (resolve) {
+            chatJobWaiters.delete(result.job_id);
+            resolve(result);
+        } else {
+            chatJobResults.set(result.job_id, result);
         }
     });
     
@@ -3122,9 +3540,6 @@ function handleMedicationReminder(medicationId, reminderId) {
         
         // Reload medications
         loadMedications();
-        
-        // Refresh ChatIntelligence local data
-        chatIntelligence.refreshLocalData();
     }
 }
 
@@ -0,0 +1,60 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ['DATABASE_URL'] = 'sqlite://'  # One in-memory database shared by the whole session
+os.environ['TTS_CACHE_DIR'] = tempfile.mkdtemp(prefix='tts-cache-')  # Keep synthesized test audio out of instance/
+
+from tests import fakes
+
+fakes.install()
+
+import app as app_module
+from flask_migrate import upgrade
+
+
+@pytest.fixture(scope='session')
+def app():
+    app_module.app.config['TESTING'] = True
+    with app_module.app.app_context():
+        upgrade()
+    return app_module.app
+
+
+@pytest.fixture(autouse=True)
+def clean_state(app, monkeypatch):
+    """Give every test empty tables, empty caches and a well-behaved fake model"""
+    monkeypatch.setattr(app_module, 'prompt_context_cache', app_module.PromptContextCache(100))
+    monkeypatch.setattr(app_module, 'response_cache', app_module.ResponseCache(
+        app_module.CHAT_CACHE_THRESHOLD, app_module.CHAT_CACHE_TTL, app_module.CHAT_CACHE_MAX_ITEMS
+    ))
+    fakes.FakeGenerativeModel.reset()
+    
+    with app.app_context():
+        yield
+        app_module.db.session.rollback()
+        for table in reversed(app_module.db.metadata.sorted_tables):
+            app_module.db.session.execute(table.delete())
+        app_module.db.session.commit()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def register(client, username='patient', timezone=None):
+    """Register and log in a user through the API and return its id"""
+    client.post('/register', json={'username': username, 'email': f'{username}@example.com', 'password': 'secret123'})
+    response = client.post('/login', json={'username': username, 'password': 'secret123'})
+    if timezone:
+        client.post('/profile', json={'timezone': timezone})
+    return response.get_json()['user_id']
+
+
+@pytest.fixture
+def user_id(client):
+    return register(client)
@@ -0,0 +1,90 @@
+"""Offline stand-ins for the Gemini and Cloud Text-to-Speech clients.
+
+install() puts them in sys.modules before app is imported, so tests and
+benchmarks never reach the real APIs. The fake model records every prompt
+and can be slowed down or blocked to exercise the chat worker pool.
+"""
+import sys
+import time
+import types
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+    
+    def __iter__(self):
+        # Streaming yields the reply word by word
+        words = self.text.split(' ')
+        for word in words[:-1]:
+            yield FakeResponse(word + ' ')
+        yield FakeResponse(words[-1])
+
+
+class FakeGenerativeModel:
+    prompts = []  # Every prompt sent to any model
+    reply = 'This is general health information. Please consult your doctor.'
+    latency = 0.0  # Seconds each call takes
+    construct_latency = 0.0  # Seconds each client construction takes
+    gate = None  # A threading.Event that calls wait on, when set by a test
+    
+    def __init__(self, model_name, **kwargs):
+        time.sleep(self.construct_latency)
+        self.model_name = model_name
+    
+    def generate_content(self, prompt, stream=False, **kwargs):
+        FakeGenerativeModel.prompts.append(prompt)
+        if FakeGenerativeModel.gate is not None:
+            FakeGenerativeModel.gate.wait(10)
+        time.sleep(self.latency)
+        return FakeResponse(self.reply)
+    
+    @classmethod
+    def reset(cls):
+        cls.prompts = []
+        cls.latency = 0.0
+        cls.construct_latency = 0.0
+        cls.gate = None
+
+
+class FakeTextToSpeechClient:
+    construct_latency = 0.0
+    
+    def __init__(self):
+        time.sleep(self.construct_latency)
+    
+    def synthesize_speech(self, input=None, voice=None, audio_config=None):
+        return types.SimpleNamespace(audio_content=f'AUDIO:{input.text}'.encode())
+
+
+def _options(**kwargs):
+    return types.SimpleNamespace(**kwargs)
+
+
+def install():
+    """Register the fake google.generativeai and google.cloud.texttospeech modules"""
+    genai = types.ModuleType('google.generativeai')
+    genai.configure = lambda **kwargs: None
+    genai.GenerativeModel = FakeGenerativeModel
+    
+    tts = types.ModuleType('google.cloud.texttospeech')
+    tts.TextToSpeechClient = FakeTextToSpeechClient
+    tts.SynthesisInput = _options
+    tts.VoiceSelectionParams = _options
+    tts.AudioConfig = _options
+    tts.SsmlVoiceGender = types.SimpleNamespace(NEUTRAL=0)
+    tts.AudioEncoding = types.SimpleNamespace(MP3=2)
+    
+    google = sys.modules.get('google') or types.ModuleType('google')
+    cloud = sys.modules.get('google.cloud') or types.ModuleType('google.cloud')
+    google.generativeai = genai
+    google.cloud = cloud
+    cloud.texttospeech = tts
+    sys.modules.update({
+        'google': google,
+        'google.cloud': cloud,
+        'google.generativeai': genai,
+        'google.cloud.texttospeech': tts
+    })
+
+
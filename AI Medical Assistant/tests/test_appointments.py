@@ -0,0 +1,30 @@
+from datetime import datetime
+
+import pytest
+
+from app import Appointment, AppointmentReminder
+
+
+def add_appointment(client, date_time):
+    return client.post('/appointments', json={
+        'doctor_name': 'Smith',
+        'specialty': 'Cardiologist',
+        'location': '123 Medical Center',
+        'date_time': date_time,
+        'purpose': 'Annual checkup'
+    })
+
+
+@pytest.mark.parametrize('date_time', ['2030-11-01T10:00:00+02:00', '2030-11-01T08:00:00Z', '2030-11-01T08:00:00'])
+def test_date_time_is_stored_as_naive_utc(client, user_id, date_time):
+    assert add_appointment(client, date_time).status_code == 200
+    
+    appointment = Appointment.query.one()
+    assert appointment.date_time == datetime(2030, 11, 1, 8, 0)
+    reminders = AppointmentReminder.query.filter_by(appointment_id=appointment.id).order_by(AppointmentReminder.reminder_time)
+    assert [reminder.reminder_time for reminder in reminders] == [datetime(2030, 10, 31, 8, 0), datetime(2030, 11, 1, 7, 0)]
+
+
+def test_unreadable_date_time_is_rejected(client, user_id):
+    assert add_appointment(client, 'sometime soon').status_code == 400
+    assert Appointment.query.count() == 0
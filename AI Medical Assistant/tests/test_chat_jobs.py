@@ -0,0 +1,125 @@
+import threading
+import time
+
+import pytest
+
+import app as app_module
+from tests.conftest import register
+from tests.fakes import FakeGenerativeModel
+
+
+@pytest.fixture
+def chat_jobs(monkeypatch):
+    """Swap in a small queue: one worker, three pending jobs, two per user"""
+    queue = app_module.ChatJobQueue(max_workers=1, max_pending=3, max_per_user=2)
+    monkeypatch.setattr(app_module, 'chat_jobs', queue)
+    yield queue
+    FakeGenerativeModel.gate = None
+    wait_until_idle(queue)
+    queue._executor.shutdown(wait=True)
+
+
+@pytest.fixture
+def gate():
+    """Hold every model call until the test releases it"""
+    FakeGenerativeModel.gate = threading.Event()
+    yield FakeGenerativeModel.gate
+    FakeGenerativeModel.gate.set()
+
+
+def wait_until_idle(queue, timeout=10):
+    deadline = time.monotonic() + timeout
+    while queue.stats()['pending']:
+        assert time.monotonic() < deadline, 'chat jobs did not finish'
+        time.sleep(0.01)
+
+
+def login(app, username):
+    client = app.test_client()
+    register(client, username)
+    return client
+
+
+def ask(client, message, route='/ai/chat'):
+    return client.post(route, json={'message': message})
+
+
+def test_chat_job_result_can_be_polled(client, user_id, chat_jobs):
+    response = ask(client, 'What are the side effects of my medications?')
+    
+    assert response.status_code == 202
+    job_id = response.get_json()['job_id']
+    wait_until_idle(chat_jobs)
+    
+    result = client.get(f'/ai/jobs/{job_id}').get_json()
+    assert result['status'] == 'done'
+    assert result['response'] == FakeGenerativeModel.reply
+
+
+def test_voice_job_result_has_audio(client, user_id, chat_jobs):
+    job_id = ask(client, 'Should I take my pills with food?', '/ai/voice').get_json()['job_id']
+    wait_until_idle(chat_jobs)
+    
+    result = client.get(f'/ai/jobs/{job_id}').get_json()
+    assert result['audio_url'].startswith('/ai/audio/')
+    assert client.get(result['audio_url']).data == f'AUDIO:{FakeGenerativeModel.reply}'.encode()
+
+
+def test_jobs_are_private_to_their_user(app, chat_jobs):
+    owner = login(app, 'owner')
+    other = login(app, 'other')
+    job_id = ask(owner, 'How do I lower my cholesterol?').get_json()['job_id']
+    wait_until_idle(chat_jobs)
+    
+    assert other.get(f'/ai/jobs/{job_id}').status_code == 404
+    assert owner.get(f'/ai/jobs/{job_id}').status_code == 200
+
+
+def test_per_user_limit_returns_429_with_retry_after(app, chat_jobs, gate):
+    busy = login(app, 'busy')
+    assert ask(busy, 'Tips for managing asthma').status_code == 202
+    assert ask(busy, 'What is a healthy blood pressure?').status_code == 202
+    
+    response = ask(busy, 'Why do I need to take metformin?')
+    
+    assert response.status_code == 429
+    retry_after = response.get_json()['retry_after']
+    assert retry_after >= 1
+    assert response.headers['Retry-After'] == str(retry_after)
+    
+    # Another user still has room in the global queue
+    assert ask(login(app, 'patient'), 'Is it safe to skip a dose?').status_code == 202
+
+
+def test_global_limit_rejects_every_user(app, chat_jobs, gate):
+    for username in ('first', 'second', 'third'):
+        assert ask(login(app, username), f'Hello from {username}').status_code == 202
+    
+    response = ask(login(app, 'fourth'), 'Hello from fourth')
+    
+    assert response.status_code == 429
+    assert 'Retry-After' in response.headers
+    assert chat_jobs.stats()['pending'] == 3
+    assert chat_jobs.stats()['rejected'] == 1
+
+
+def test_slots_free_up_when_jobs_finish(app, chat_jobs, gate):
+    busy = login(app, 'busy')
+    ask(busy, 'Tips for managing asthma')
+    ask(busy, 'What is a healthy blood pressure?')
+    assert ask(busy, 'Why do I need to take metformin?').status_code == 429
+    
+    gate.set()
+    wait_until_idle(chat_jobs)
+    
+    assert ask(busy, 'Why do I need to take metformin?').status_code == 202
+    assert chat_jobs.stats()['completed'] == 2
+
+
+def test_retry_after_grows_with_the_backlog(chat_jobs):
+    chat_jobs._avg_seconds = 4.0
+    
+    assert chat_jobs.retry_after() == 4
+    chat_jobs._pending = 3
+    assert chat_jobs.retry_after() == 12
+    chat_jobs._pending = 0
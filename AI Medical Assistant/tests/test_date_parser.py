@@ -0,0 +1,183 @@
+import random
+import re
+import string
+from datetime import datetime, timedelta
+
+import pytest
+import pytz
+
+import app as app_module
+from app import parse_natural_language_date, utc_to_local
+
+NOW = datetime(2026, 10, 17, 10, 0)  # A Saturday, 10:00 UTC
+TIMEZONES = ['UTC', 'America/New_York', 'Europe/Berlin', 'Asia/Kolkata', 'Australia/Sydney', 'Pacific/Apia']
+WEEKDAYS = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
+CASES = 300  # Random cases per property and timezone
+
+
+def legacy_parse(text, now):
+    """The parser this one replaced, kept to check that the inputs it understood still mean the same"""
+    if 'tomorrow' in text.lower():
+        return now + timedelta(days=1)
+    elif 'today' in text.lower():
+        return now
+    elif re.search(r'in (\d+) days?', text.lower()):
+        return now + timedelta(days=int(re.search(r'in (\d+) days?', text.lower()).group(1)))
+    elif re.search(r'in (\d+) hours?', text.lower()):
+        return now + timedelta(hours=int(re.search(r'in (\d+) hours?', text.lower()).group(1)))
+    elif re.search(r'(\d+)(am|pm)', text.lower()):
+        match = re.search(r'(\d+)(am|pm)', text.lower())
+        hour = int(match.group(1))
+        if match.group(2) == 'pm' and hour < 12:
+            hour += 12
+        return now.replace(hour=hour, minute=0, second=0, microsecond=0)
+    return now
+
+
+def parse(text, timezone='UTC', now=NOW):
+    return parse_natural_language_date(text, pytz.timezone(timezone), now)
+
+
+def random_now(rng):
+    return datetime(2026, 1, 1) + timedelta(seconds=rng.randrange(3 * 365 * 86400))
+
+
+def random_time(rng):
+    """Return ((hour, minute), text) for a clock time in one of the accepted spellings"""
+    hour, minute = rng.randrange(24), rng.randrange(60)
+    style = rng.choice(['12h', '24h', 'at'])
+    if style == '12h':
+        return (hour, minute), f"{hour % 12 or 12}:{minute:02d} {'am' if hour < 12 else 'pm'}"
+    if style == '24h':
+        return (hour, minute), f'{hour:02d}:{minute:02d}'
+    return (hour, 0), f'at {hour}'
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('tomorrow at 2:30pm', ('2026-10-18T14:30:00', None, None, '2:30 PM')),
+    ('every Monday at 9', ('2026-10-19T09:00:00', 'weekly', 'weekly on Monday', '9:00 AM')),
+    ('in 3 days at 8am', ('2026-10-20T08:00:00', None, None, '8:00 AM')),
+    ('next Monday', ('2026-10-19T10:00:00', None, None, None)),
+    ('saturday at 8am and 8pm', ('2026-10-17T20:00:00', None, None, '8:00 AM, 8:00 PM')),
+    ('tonight', ('2026-10-17T21:00:00', None, None, '9:00 PM')),
+    ('in 2 hours', ('2026-10-17T12:00:00', None, None, None)),
+    ('at 9am', ('2026-10-18T09:00:00', None, None, '9:00 AM')),
+    ('noon', ('2026-10-17T12:00:00', None, None, '12:00 PM')),
+    ('every morning', ('2026-10-18T08:00:00', 'daily', 'daily', '8:00 AM')),
+    ('daily at 8:00 AM, 8:00 PM', ('2026-10-17T20:00:00', 'daily', 'daily', '8:00 AM, 8:00 PM')),
+    ('mondays and thursdays at 7pm', ('2026-10-19T19:00:00', 'weekly', 'weekly on Monday, Thursday', '7:00 PM')),
+    ('May 10', ('2027-05-10T10:00:00', None, None, None)),
+    ('10th of december at 3pm', ('2026-12-10T15:00:00', None, None, '3:00 PM')),
+    ('2026-11-02 14:30', ('2026-11-02T14:30:00', None, None, '2:30 PM')),
+    ('weekly', ('2026-10-24T10:00:00', 'weekly', 'weekly on Saturday', None)),
+    ('in a week', ('2026-10-24T10:00:00', None, None, None)),
+    ('day after tomorrow at 9 a.m.', ('2026-10-19T09:00:00', None, None, '9:00 AM')),
+])
+def test_examples(text, expected):
+    result = parse(text)
+    
+    assert (result['when'].isoformat(), result['recurrence'], result['frequency'], result['time_of_day']) == expected
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('tomorrow at 2:30pm', '2026-10-18T18:30:00'),
+    ('every Monday at 9', '2026-10-19T13:00:00'),
+    ('tonight', '2026-10-18T01:00:00'),
+    ('at 9am', '2026-10-17T13:00:00'),
+    ('10th of december at 3pm', '2026-12-10T20:00:00'),  # After the switch back to EST
+])
+def test_times_are_read_in_the_users_timezone(text, expected):
+    assert parse(text, 'America/New_York')['when'].isoformat() == expected
+
+
+@pytest.mark.parametrize('text', ['hello there', 'take 2 pills', 'every 2 days', '', 'at', '99:99'])
+def test_unrecognized_text_returns_none(text):
+    assert parse(text) is None
+
+
+@pytest.mark.parametrize('text', ['today', 'Tomorrow', 'in 1 day', 'in 12 days', 'in 3 hours', 'see you in 5 days'])
+@pytest.mark.parametrize('now', [NOW, datetime(2027, 3, 1, 23, 45), datetime(2026, 12, 31, 0, 5)])
+def test_legacy_inputs_are_unchanged(text, now):
+    assert parse(text, now=now)['when'] == legacy_parse(text, now)
+
+
+@pytest.mark.parametrize('text', ['2pm', '11am', '9pm'])
+def test_legacy_clock_times_match_when_still_ahead(text):
+    morning = datetime(2026, 10, 17, 1, 0)
+    
+    assert parse(text, now=morning)['when'] == legacy_parse(text, morning)
+
+
+def test_past_clock_times_move_to_tomorrow():
+    # The old parser returned today's 9am even after it had passed
+    assert legacy_parse('9am', NOW) == datetime(2026, 10, 17, 9, 0)
+    assert parse('9am')['when'] == datetime(2026, 10, 18, 9, 0)
+
+
+@pytest.mark.parametrize('timezone', TIMEZONES)
+def test_offset_days_land_on_the_local_date_and_time(timezone):
+    rng = random.Random(f'offset {timezone}')
+    tz = pytz.timezone(timezone)
+    for _ in range(CASES):
+        now = random_now(rng)
+        days = rng.randrange(60)
+        (hour, minute), time_text = random_time(rng)
+        
+        when = utc_to_local(parse(f'in {days} days {time_text}', timezone, now)['when'], tz)
+        
+        assert when.date() == utc_to_local(now, tz).date() + timedelta(days=days), (days, time_text, now)
+        assert (when.hour, when.minute) == (hour, minute), (days, time_text, now)
+
+
+@pytest.mark.parametrize('timezone', TIMEZONES)
+def test_weekly_schedules_start_on_a_listed_day_within_a_week(timezone):
+    rng = random.Random(f'weekly {timezone}')
+    tz = pytz.timezone(timezone)
+    for _ in range(CASES):
+        now = random_now(rng)
+        days = sorted(rng.sample(range(7), rng.randrange(1, 4)))
+        (hour, minute), time_text = random_time(rng)
+        text = 'every ' + ' and '.join(WEEKDAYS[day] for day in days) + ' ' + time_text
+        
+        result = parse(text, timezone, now)
+        
+        assert result['recurrence'] == 'weekly', text
+        assert now < result['when'] <= now + timedelta(days=7, hours=2), (text, now)
+        assert utc_to_local(result['when'], tz).weekday() in days, (text, now)
+        assert app_module.parse_dose_times(result['time_of_day']) == [(hour, minute)], text
+
+
+@pytest.mark.parametrize('timezone', TIMEZONES)
+def test_bare_times_are_the_next_occurrence(timezone):
+    rng = random.Random(f'bare {timezone}')
+    for _ in range(CASES):
+        now = random_now(rng)
+        _, time_text = random_time(rng)
+        
+        assert now < parse(time_text, timezone, now)['when'] <= now + timedelta(hours=25), (time_text, now)
+
+
+@pytest.mark.parametrize('timezone', TIMEZONES)
+def test_relative_days_land_on_the_expected_local_date(timezone):
+    rng = random.Random(f'relative {timezone}')
+    tz = pytz.timezone(timezone)
+    for _ in range(CASES):
+        now = random_now(rng)
+        today = utc_to_local(now, tz).date()
+        _, time_text = random_time(rng)
+        weekday = rng.randrange(7)
+        
+        tomorrow = utc_to_local(parse(f'tomorrow {time_text}', timezone, now)['when'], tz)
+        assert tomorrow.date() == today + timedelta(days=1), (time_text, now)
+        
+        next_day = utc_to_local(parse(f'next {WEEKDAYS[weekday]} {time_text}', timezone, now)['when'], tz)
+        assert next_day.weekday() == weekday, (weekday, time_text, now)
+        assert 0 < (next_day.date() - today).days <= 7, (weekday, time_text, now)
+
+
+def test_random_text_never_raises():
+    rng = random.Random('junk')
+    alphabet = string.ascii_lowercase + string.digits + ' :.-@'
+    for _ in range(CASES * len(TIMEZONES)):
+        text = ''.join(rng.choice(alphabet) for _ in range(rng.randrange(40)))
+        parse(text, rng.choice(TIMEZONES), random_now(rng))
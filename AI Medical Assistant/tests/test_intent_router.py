@@ -0,0 +1,157 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+import app as app_module
+from tests.conftest import register
+from tests.fakes import FakeGenerativeModel
+
+# Questions the router answers from the database, with the intent they ask for
+ROUTED_QUESTIONS = [
+    ("What meds do I take today?", 'todays_doses'),
+    ("what medications do i have to take today", 'todays_doses'),
+    ("Which pills should I take this morning?", 'todays_doses'),
+    ("my meds today", 'todays_doses'),
+    ("medications for today", 'todays_doses'),
+    ("What's my medication schedule?", 'todays_doses'),
+    ("what is my dose schedule for today", 'todays_doses'),
+    ("When should I take my medications?", 'todays_doses'),
+    ("Do I have any meds left to take today?", 'todays_doses'),
+    ("Which medications are due today?", 'todays_doses'),
+    ("Can you tell me what meds do I take today?", 'todays_doses'),
+    ("please tell me which doses are left for today", 'todays_doses'),
+    ("What doses do I have tonight", 'todays_doses'),
+    ("When is my next appointment?", 'next_appointment'),
+    ("when's my next doctor's appointment", 'next_appointment'),
+    ("What is my next appointment", 'next_appointment'),
+    ("What are my upcoming appointments?", 'next_appointment'),
+    ("next appointment", 'next_appointment'),
+    ("Do I have any appointments coming up?", 'next_appointment'),
+    ("do i have an appointment this week", 'next_appointment'),
+    ("When do I see the doctor next?", 'next_appointment'),
+    ("upcoming doctor visits", 'next_appointment'),
+    ("When is my next checkup", 'next_appointment'),
+    ("What's the status of my timer?", 'timer_status'),
+    ("timer status", 'timer_status'),
+    ("my timers", 'timer_status'),
+    ("How much time is left on my timer?", 'timer_status'),
+    ("how long left on the timer", 'timer_status'),
+    ("Is my timer still running?", 'timer_status'),
+    ("Are the timers done", 'timer_status'),
+    ("any running timers", 'timer_status'),
+    ("Do I have any active timers?", 'timer_status'),
+    ("What's my adherence?", 'adherence'),
+    ("what is my medication adherence rate this week", 'adherence'),
+    ("Have I been taking my meds?", 'adherence'),
+    ("Did I take all my medications today?", 'adherence'),
+    ("have i taken my pills regularly", 'adherence'),
+    ("How many doses did I miss?", 'adherence'),
+    ("how many doses have i missed this week", 'adherence'),
+    ("Did I miss any doses?", 'adherence'),
+    ("Have I skipped any medications lately", 'adherence'),
+    ("How am I doing with my medications?", 'adherence'),
+    ("How have I been doing on my meds recently?", 'adherence'),
+]
+
+# Open-ended questions that must still reach the model, including phrasings
+# close to the routed forms
+OPEN_QUESTIONS = [
+    "What are my medications for today",
+    "Hey, can you tell me what medications I take today",
+    "Remind me when my next appointment is",
+    "What are the side effects of my medications?",
+    "Can I take ibuprofen with my meds today?",
+    "Should I take my pills with food?",
+    "What should I ask the doctor at my next appointment?",
+    "I have a headache, what should I do?",
+    "Tips for managing asthma",
+    "What is a healthy blood pressure?",
+    "Why do I need to take metformin?",
+    "Is it safe to skip a dose?",
+    "What happens if I miss a dose of my medication?",
+    "Set a timer for 10 minutes",
+    "How long should I wait between doses?",
+    "what meds do i take for my migraine",
+    "When is the best time to take vitamin D?",
+    "my appointment got cancelled what should I do",
+    "Explain my medication schedule for a trip to Japan",
+    "How do I lower my cholesterol?",
+    "Are my medications safe during pregnancy?",
+    "Do I have any drug interactions?",
+    "What timer should I use for inhaler spacing?",
+    "How is my health overall?",
+    "Remind me to drink water",
+    "Can you summarize our last conversation?",
+    "Is it normal to feel dizzy after my pills?",
+    'what meds help with sleep?',
+    'Which medications interact with alcohol?',
+    'should I take my pills before or after breakfast?',
+    'when is the best time to see a doctor for a cough',
+    'How long does a flu last?',
+    'did I take too much ibuprofen?',
+    'what is the timer for boiling an egg',
+    'is my blood pressure ok',
+    'my meds make me tired',
+    'how many doses of the vaccine do I need?',
+]
+
+
+@pytest.mark.parametrize('question,intent', ROUTED_QUESTIONS)
+def test_data_questions_are_routed(question, intent):
+    assert app_module.intent_router.classify(question) == intent
+
+
+@pytest.mark.parametrize('question', OPEN_QUESTIONS)
+def test_open_questions_go_to_the_model(question):
+    assert app_module.intent_router.classify(question) is None
+
+
+def test_routed_answer_skips_the_model_and_is_saved(client, user_id):
+    response_text = app_module.generate_ai_response('When is my next appointment?', user_id)
+    
+    assert response_text == 'You have no upcoming appointments.'
+    assert FakeGenerativeModel.prompts == []
+    conversation = app_module.Conversation.query.filter_by(user_id=user_id).one()
+    assert conversation.response == response_text
+
+
+def test_open_question_calls_the_model(client, user_id):
+    response_text = app_module.generate_ai_response('What are the side effects of my medications?', user_id)
+    
+    assert response_text == FakeGenerativeModel.reply
+    assert len(FakeGenerativeModel.prompts) == 1
+
+
+def test_next_appointment_is_shown_in_the_users_timezone(client):
+    user_id = register(client, timezone='Europe/Berlin')
+    # The browser sends toISOString(), i.e. UTC; 12:30 UTC is 14:30 in Berlin in summer
+    client.post('/appointments', json={
+        'doctor_name': 'Smith',
+        'specialty': 'Cardiologist',
+        'location': '123 Medical Center',
+        'date_time': '2030-07-01T12:30:00.000Z',
+        'purpose': 'Annual checkup'
+    })
+    
+    response_text = app_module.intent_router.answer(user_id, 'When is my next appointment?')
+    
+    assert response_text == (
+        'Your next appointment is with Dr. Smith (Cardiologist) on Monday, July 01 at 02:30 PM '
+        'at 123 Medical Center. Purpose: Annual checkup.'
+    )
+
+
+def test_todays_doses_are_listed_in_the_users_timezone(client):
+    user_id = register(client, timezone='America/New_York')
+    client.post('/medications', json={
+        'name': 'Metformin',
+        'dosage': '500mg',
+        'frequency': 'daily',
+        'time_of_day': '11:59 PM',
+        'start_date': (datetime.utcnow() - timedelta(days=2)).isoformat()
+    })
+    
+    response_text = app_module.intent_router.answer(user_id, 'What meds do I take today?')
+    
+    # 11:59 PM in New York falls on the next UTC day
+    assert '11:59 PM - Metformin 500mg' in response_text
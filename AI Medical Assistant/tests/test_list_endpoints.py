@@ -0,0 +1,95 @@
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+
+import app as app_module
+
+
+@contextmanager
+def count_queries():
+    """Count the SQL statements executed inside the block"""
+    statements = []
+    
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    
+    event.listen(app_module.db.engine, 'before_cursor_execute', record)
+    try:
+        yield statements
+    finally:
+        event.remove(app_module.db.engine, 'before_cursor_execute', record)
+
+
+def add_medications(client, count):
+    for i in range(count):
+        client.post('/medications', json={
+            'name': f'Medication {i}',
+            'dosage': '10mg',
+            'frequency': 'daily',
+            'time_of_day': '8:00 AM, 1:00 PM, 9:00 PM'
+        })
+
+
+def add_appointments(client, count):
+    for i in range(count):
+        client.post('/appointments', json={
+            'doctor_name': f'Doctor {i}',
+            'location': 'Clinic',
+            'date_time': (datetime.utcnow() + timedelta(days=i + 2)).isoformat()
+        })
+
+
+def queries_for(client, url):
+    with count_queries() as statements:
+        response = client.get(url)
+    assert response.status_code == 200
+    return len(statements), response.get_json()
+
+
+@pytest.mark.parametrize('url', [
+    '/medications',
+    '/medications?reminders=upcoming&window=24',
+    '/medications?reminders=none'
+])
+def test_medication_list_query_count_does_not_grow_with_rows(client, user_id, url):
+    add_medications(client, 2)
+    few, rows = queries_for(client, url)
+    
+    add_medications(client, 20)
+    many, rows = queries_for(client, url)
+    
+    assert len(rows) == 22
+    assert many == few
+    if 'reminders=none' not in url:
+        assert all(row['reminders'] for row in rows)
+
+
+@pytest.mark.parametrize('url', [
+    '/appointments',
+    '/appointments?reminders=upcoming&window=72'
+])
+def test_appointment_list_query_count_does_not_grow_with_rows(client, user_id, url):
+    add_appointments(client, 2)
+    few, rows = queries_for(client, url)
+    
+    add_appointments(client, 20)
+    many, rows = queries_for(client, url)
+    
+    assert len(rows) == 22
+    assert many == few
+    assert all('reminders' in row for row in rows)
+
+
+def test_upcoming_window_filters_reminders(client, user_id):
+    add_appointments(client, 1)  # Reminders 1 day and 1 hour before, i.e. 24 and 47 hours from now
+    
+    rows = client.get('/appointments?reminders=upcoming&window=30').get_json()
+    
+    assert len(rows[0]['reminders']) == 1
+
+
+def test_invalid_reminder_options_are_rejected(client, user_id):
+    assert client.get('/medications?reminders=bad').status_code == 400
+    assert client.get('/appointments?reminders=upcoming&window=x').status_code == 400
@@ -0,0 +1,73 @@
+from datetime import datetime, timedelta
+
+import app as app_module
+from app import Medication, MedicationReminder
+
+
+def add_medication(client, **fields):
+    medication = {'name': 'Metformin', 'dosage': '500mg', 'frequency': 'daily', 'time_of_day': '8:00 AM'}
+    medication.update(fields)
+    response = client.post('/medications', json=medication)
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()['medication_id']
+
+
+def reminder_times(medication_id):
+    return [
+        reminder.scheduled_time
+        for reminder in MedicationReminder.query.filter_by(medication_id=medication_id).order_by(MedicationReminder.scheduled_time)
+    ]
+
+
+def test_weekly_medications_keep_their_reminders_past_the_first_week(client, user_id):
+    now = datetime.utcnow()
+    medication_id = add_medication(client, frequency='weekly on Monday, Thursday')
+    
+    # The scheduler extends the horizon hourly; run it daily for two weeks
+    for day in range(1, 15):
+        app_module.materialize_reminders(now + timedelta(days=day))
+    
+    times = reminder_times(medication_id)
+    assert times[-1] > now + timedelta(days=7)
+    assert {time.weekday() for time in times} == {0, 3}
+    assert all((time.hour, time.minute) == (8, 0) for time in times)
+    assert len(times) == len(set(times))
+    assert app_module.db.session.get(Medication, medication_id).materialized_until == now + timedelta(days=14) + app_module.REMINDER_HORIZON
+
+
+def test_unscheduled_medications_get_no_reminders(client, user_id):
+    now = datetime.utcnow()
+    medication_id = add_medication(client, frequency='as needed')
+    
+    app_module.materialize_reminders(now + timedelta(days=3))
+    
+    assert reminder_times(medication_id) == []
+
+
+def test_dates_with_a_utc_offset_are_stored_as_naive_utc(client, user_id):
+    medication_id = add_medication(client, start_date='2030-01-01T08:00:00Z', end_date='2030-02-01T10:00:00+02:00')
+    
+    medication = app_module.db.session.get(Medication, medication_id)
+    assert medication.start_date == datetime(2030, 1, 1, 8, 0)
+    assert medication.end_date == datetime(2030, 2, 1, 8, 0)
+
+
+def test_update_accepts_dates_with_a_utc_offset(client, user_id):
+    medication_id = add_medication(client)
+    
+    response = client.put(f'/medications/{medication_id}', json={'start_date': '2030-01-01T00:00:00-05:00'})
+    
+    assert response.status_code == 200
+    assert app_module.db.session.get(Medication, medication_id).start_date == datetime(2030, 1, 1, 5, 0)
+    assert reminder_times(medication_id) == []  # Starts after the current horizon
+
+
+def test_bulk_import_accepts_dates_with_a_utc_offset(client, user_id):
+    response = client.post('/medications/bulk', json=[
+        {'name': 'Metformin', 'dosage': '500mg', 'frequency': 'daily', 'time_of_day': '8:00 AM', 'start_date': '2020-01-01T00:00:00Z'},
+        {'name': 'Lisinopril', 'dosage': '10mg', 'frequency': 'daily', 'time_of_day': '9:00 PM', 'end_date': '2099-01-01T00:00:00+00:00'},
+    ])
+    
+    assert response.status_code == 200, response.get_json()
+    assert response.get_json()['created'] == 2
+    assert MedicationReminder.query.count() >= 2
@@ -0,0 +1,28 @@
+import pytest
+
+import app as app_module
+from tests.conftest import register
+
+
+def test_requires_a_session(client):
+    assert client.get('/metrics').status_code == 401
+    
+    register(client)
+    response = client.get('/metrics')
+    
+    assert response.status_code == 200
+    assert {'clients', 'audio_cache', 'response_cache'} <= set(response.get_json())
+
+
+@pytest.mark.parametrize('authorization, status', [
+    (None, 401),
+    ('Bearer wrong', 401),
+    ('s3cret', 401),
+    ('Bearer s3cret', 200),
+])
+def test_token_replaces_the_session_check(client, monkeypatch, authorization, status):
+    monkeypatch.setattr(app_module, 'METRICS_TOKEN', 's3cret')
+    register(client)  # A session alone is not enough once a token is configured
+    headers = {'Authorization': authorization} if authorization else {}
+    
+    assert client.get('/metrics', headers=headers).status_code == status
@@ -0,0 +1,157 @@
+import pytest
+
+import app as app_module
+from tests.conftest import register
+from tests.fakes import FakeGenerativeModel
+
+CACHED_QUESTION = 'What are the side effects of metformin?'
+
+# Rewordings of CACHED_QUESTION that should be answered from the cache
+PARAPHRASES = [
+    'What are the side effects of metformin?',
+    'metformin side effects?',
+    'Side-effects of Metformin',
+    'what are metformin side effects',
+    'What are the side effects of Metformin',
+    'metformin: side effects',
+]
+
+# Questions that share words with CACHED_QUESTION but need their own answer
+DIFFERENT_QUESTIONS = [
+    'can I take ibuprofen with metformin',
+    'can I take metformin',
+    'metformin dosage',
+    'side effects of lisinopril',
+    'What are the side effects of insulin?',
+    'how long do metformin side effects last',
+    'What is metformin used for?',
+    'side effects',
+]
+
+
+@pytest.fixture
+def cache():
+    cache = app_module.ResponseCache(app_module.CHAT_CACHE_THRESHOLD, 3600, 100)
+    cache.store('scope', CACHED_QUESTION, 'cached answer')
+    return cache
+
+
+@pytest.fixture
+def cache_enabled(monkeypatch):
+    monkeypatch.setattr(app_module, 'CHAT_CACHE_ENABLED', True)
+
+
+@pytest.mark.parametrize('question', PARAPHRASES)
+def test_paraphrases_hit(cache, question):
+    assert cache.lookup('scope', question) == 'cached answer'
+
+
+@pytest.mark.parametrize('question', DIFFERENT_QUESTIONS)
+def test_different_questions_miss(cache, question):
+    assert cache.lookup('scope', question) is None
+
+
+def test_other_scopes_miss(cache):
+    assert cache.lookup('other scope', CACHED_QUESTION) is None
+
+
+def test_hits_and_misses_are_counted(cache):
+    cache.lookup('scope', PARAPHRASES[1])
+    cache.lookup('scope', DIFFERENT_QUESTIONS[0])
+    cache.lookup('scope', DIFFERENT_QUESTIONS[1])
+    
+    assert cache.stats()['hits'] == 1
+    assert cache.stats()['misses'] == 2
+    assert cache.stats()['hit_rate'] == 0.333
+
+
+def test_expired_entries_miss():
+    cache = app_module.ResponseCache(app_module.CHAT_CACHE_THRESHOLD, 0, 100)
+    cache.store('scope', CACHED_QUESTION, 'cached answer')
+    
+    assert cache.lookup('scope', CACHED_QUESTION) is None
+    assert cache.stats()['entries'] == 0
+
+
+def test_oldest_entries_are_evicted():
+    cache = app_module.ResponseCache(app_module.CHAT_CACHE_THRESHOLD, 3600, 2)
+    for i in range(5):
+        cache.store('scope', f'question number{i}', str(i))
+    
+    assert cache.stats()['entries'] == 2
+    assert set(cache._index) == {('scope', 'question'), ('scope', 'number3'), ('scope', 'number4')}
+    assert cache.lookup('scope', 'question number4') == '4'
+    assert cache.lookup('scope', 'question number0') is None
+
+
+def test_scope_ignores_case_and_whitespace():
+    patient = app_module.User(allergies='Penicillin', medical_conditions='Diabetes')
+    same = app_module.User(allergies=' penicillin ', medical_conditions='diabetes')
+    
+    assert app_module.chat_cache_scope(patient) == app_module.chat_cache_scope(same)
+
+
+@pytest.mark.parametrize('field', ['allergies', 'medical_conditions'])
+def test_scope_depends_on_medical_fields(field):
+    patient = app_module.User(allergies='Penicillin', medical_conditions='Diabetes')
+    other = app_module.User(allergies='Penicillin', medical_conditions='Diabetes')
+    setattr(other, field, 'None')
+    
+    assert app_module.chat_cache_scope(patient) != app_module.chat_cache_scope(other)
+
+
+def patient(app, username, **profile):
+    client = app.test_client()
+    user_id = register(client, username)
+    client.post('/profile', json=profile)
+    return user_id
+
+
+def test_answers_are_shared_between_identical_profiles(app, cache_enabled):
+    first = patient(app, 'first', allergies='Penicillin', medical_conditions='Diabetes')
+    second = patient(app, 'second', allergies='penicillin', medical_conditions='Diabetes ')
+    
+    app_module.generate_ai_response(CACHED_QUESTION, first)
+    response_text = app_module.generate_ai_response('metformin side effects?', second)
+    
+    assert response_text == FakeGenerativeModel.reply
+    assert len(FakeGenerativeModel.prompts) == 1
+
+
+@pytest.mark.parametrize('profile', [
+    {'allergies': 'Sulfa', 'medical_conditions': 'Diabetes'},
+    {'allergies': 'Penicillin', 'medical_conditions': 'Kidney disease'},
+])
+def test_answers_are_not_shared_across_profiles(app, cache_enabled, profile):
+    first = patient(app, 'first', allergies='Penicillin', medical_conditions='Diabetes')
+    second = patient(app, 'second', **profile)
+    
+    app_module.generate_ai_response(CACHED_QUESTION, first)
+    app_module.generate_ai_response(CACHED_QUESTION, second)
+    
+    assert len(FakeGenerativeModel.prompts) == 2
+
+
+def test_profile_change_moves_the_user_to_a_new_scope(app, client, cache_enabled):
+    user_id = register(client)
+    app_module.generate_ai_response(CACHED_QUESTION, user_id)
+    
+    client.post('/profile', json={'allergies': 'Metformin'})
+    app_module.generate_ai_response(CACHED_QUESTION, user_id)
+    
+    assert len(FakeGenerativeModel.prompts) == 2
+
+
+def test_follow_up_questions_skip_the_cache(client, user_id, cache_enabled):
+    app_module.generate_ai_response('What are the side effects of this?', user_id)
+    app_module.generate_ai_response('What are the side effects of this?', user_id)
+    
+    assert len(FakeGenerativeModel.prompts) == 2
+    assert app_module.response_cache.stats()['entries'] == 0
+
+
+def test_cache_is_off_by_default(client, user_id):
+    app_module.generate_ai_response(CACHED_QUESTION, user_id)
+    app_module.generate_ai_response(CACHED_QUESTION, user_id)
+    
+    assert len(FakeGenerativeModel.prompts) == 2
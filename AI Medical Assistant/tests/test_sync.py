@@ -0,0 +1,43 @@
+import pytest
+
+from app import Timer, User
+
+
+def sync(client, *mutations):
+    return client.post('/sync', json={'mutations': list(mutations)})
+
+
+def create_timer(key):
+    return {'key': key, 'op': 'timer.create', 'data': {'name': 'Tea', 'duration': 180}}
+
+
+def test_batch_is_applied_once(client, user_id):
+    mutations = [create_timer('create-1'), {'key': 'start-1', 'op': 'timer.start', 'target': 'create-1'}]
+    
+    first = sync(client, *mutations)
+    replay = sync(client, *mutations)
+    
+    assert first.status_code == 200
+    assert Timer.query.one().status == 'Running'
+    assert all(result['duplicate'] for result in replay.get_json()['results'])
+
+
+@pytest.mark.parametrize('mutation', [
+    {'key': 'profile-1', 'op': 'profile.update', 'data': {'timezone': ['Europe/Berlin']}},
+    {'key': 'profile-1', 'op': 'profile.update', 'data': {'timezone': 'Mars/Olympus'}},
+    {'key': 'profile-1', 'op': 'profile.update', 'data': ['timezone']},
+    {'key': 'profile-1', 'op': ['profile.update']},
+    {'key': 'medication-1', 'op': 'medication.create', 'data': {'name': 'Metformin', 'dosage': '500mg', 'frequency': 'daily', 'time_of_day': '8:00 AM', 'start_date': 20300101}},
+])
+def test_invalid_mutation_rejects_the_whole_batch(client, user_id, mutation):
+    response = sync(client, create_timer('create-1'), mutation)
+    
+    assert response.status_code == 422
+    assert response.get_json()['index'] == 1
+    assert response.get_json()['key'] == mutation['key']
+    assert Timer.query.count() == 0
+    assert User.query.one().timezone == 'UTC'
+
+
+def test_profile_rejects_a_timezone_that_is_not_a_string(client, user_id):
+    assert client.post('/profile', json={'timezone': ['Europe/Berlin']}).status_code == 400